@@ -2,7 +2,10 @@ from flask import Flask, render_template, jsonify, request
 import pandas as pd
 import os
 import json
-from datetime import datetime
+
+from utils.simulation_utils import parse_time_to_seconds
+from utils.timetable_index import TimetableIndex
+from utils.position_engine import PositionEngine, STATUS_MOVING
 
 app = Flask(__name__)
 
@@ -20,6 +23,10 @@ with open(line_path, encoding="utf-8") as f:
 # 역 좌표 딕셔너리 (시뮬레이션용)
 station_dict = {row['역명']: (row['위도'], row['경도']) for _, row in df_station.iterrows()}
 
+# 시간표 인덱스 + 위치 계산 엔진 (시작 시 한 번만 생성)
+timetable_index = TimetableIndex(df_timetable)
+engine = PositionEngine(timetable_index, station_dict)
+
 # ✅ 메인 페이지
 @app.route("/")
 def index():
@@ -48,45 +55,30 @@ def simulation_data():
     if not req_time:
         return jsonify([])
 
-    try:
-        t_now = datetime.strptime(req_time, "%H:%M:%S")
-    except:
+    t_now = parse_time_to_seconds(req_time)
+    if t_now is None:
         return jsonify([])
 
-    # ✅ 🔥 메모리 줄이기: 사전 필터링
-    df_active = df_timetable[
-        (df_timetable['LEFTTIME'] < req_time) & 
-        (df_timetable['NEXT_ARRIVETIME'] > req_time)
+    # ✅ 인덱스로 운행 구간 조회 후 이동 중인 열차만 사용
+    frame = engine.compute(t_now, timetable_index.active(t_now))
+    moving = frame["status"] == STATUS_MOVING
+    idx = frame["idx"][moving]
+
+    active_trains = [
+        {
+            'train_no': train_no,
+            'line': line,
+            'from': from_station,
+            'to': to_station,
+            'progress': progress  # 이걸 같이 넘겨줘야 JS에서 쓸 수 있어
+        }
+        for train_no, line, from_station, to_station, progress in zip(
+            timetable_index.train_no[idx], timetable_index.line_num[idx],
+            timetable_index.station_nm[idx], timetable_index.next_station[idx],
+            frame["progress"][moving].tolist(),
+        )
     ]
 
-    active_trains = []
-
-    for _, row in df_active.iterrows():
-        try:
-            t1 = datetime.strptime(row['LEFTTIME'], "%H:%M:%S")
-            t2 = datetime.strptime(row['NEXT_ARRIVETIME'], "%H:%M:%S")
-            progress = (t_now - t1).total_seconds() / (t2 - t1).total_seconds()
-            progress = max(0, min(1, progress))  # 🔧 안전하게 제한
-
-            lat1, lon1 = station_dict.get(row['STATION_NM'], (None, None))
-            lat2, lon2 = station_dict.get(row['NEXT_STATION'], (None, None))
-
-            if lat1 is not None and lat2 is not None:
-                lat = lat1 + (lat2 - lat1) * progress
-                lon = lon1 + (lon2 - lon1) * progress
-
-                active_trains.append({
-                    'train_no': row['TRAIN_NO'],
-                    'line': row['LINE_NUM'],
-                    'from': row['STATION_NM'],
-                    'to': row['NEXT_STATION'],
-                    'progress': progress  # 이걸 같이 넘겨줘야 JS에서 쓸 수 있어
-                })
-
-        except Exception as e:
-            print("Error during simulation row:", e)
-            continue
-
     return jsonify(active_trains)
 
 if __name__ == "__main__":
@@ -6,6 +6,9 @@ import json
 import sqlite3
 from datetime import datetime
 
+from utils.simulation_utils import parse_time_to_seconds
+from utils.timetable_db import TimetableDB
+
 app = Flask(__name__)
 
 # 📂 파일 경로
@@ -21,6 +24,12 @@ with open(line_path, encoding="utf-8") as f:
 # 📍 역 좌표 딕셔너리
 station_dict = {row['역명']: (row['위도'], row['경도']) for _, row in df_station.iterrows()}
 
+# 🗃️ 마이그레이션된 DB 는 스레드별 읽기 전용 연결 + 인덱스 조회 (python -m utils.timetable_db migrate)
+try:
+    timetable_db = TimetableDB(db_path)
+except (sqlite3.Error, ValueError):
+    timetable_db = None
+
 @app.route("/")
 def index():
     return render_template("index_ver_3.html")
@@ -49,25 +58,30 @@ def simulation_data():
     except:
         return jsonify([])
 
-    # ✅ SQL 쿼리로 데이터 가져오기
-    conn = sqlite3.connect(db_path)
-    query = """
-        SELECT TRAIN_NO, LINE_NUM, STATION_NM, ARRIVETIME, LEFTTIME,
-               NEXT_STATION, NEXT_ARRIVETIME, WEEK_TAG, INOUT_TAG
-        FROM preprocessed_timetable
-        WHERE ARRIVETIME <= ? AND NEXT_ARRIVETIME >= ?
-    """
-    params = [req_time, req_time]
-    df_active = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-
-    # ✅ 필터 적용
-    if selected_week != "전체":
-        df_active = df_active[df_active['WEEK_TAG'] == selected_week]
-    if selected_direction != "전체":
-        df_active = df_active[df_active['INOUT_TAG'] == selected_direction]
-    if selected_line != "전체":
-        df_active = df_active[df_active['LINE_NUM'] == selected_line]
+    # ✅ SQL 쿼리로 데이터 가져오기 (마이그레이션된 DB 면 필터까지 SQL 에서 처리)
+    if timetable_db is not None:
+        df_active = timetable_db.active(
+            parse_time_to_seconds(req_time), selected_week, selected_direction, selected_line
+        )
+    else:
+        conn = sqlite3.connect(db_path)
+        query = """
+            SELECT TRAIN_NO, LINE_NUM, STATION_NM, ARRIVETIME, LEFTTIME,
+                   NEXT_STATION, NEXT_ARRIVETIME, WEEK_TAG, INOUT_TAG
+            FROM preprocessed_timetable
+            WHERE ARRIVETIME <= ? AND NEXT_ARRIVETIME >= ?
+        """
+        params = [req_time, req_time]
+        df_active = pd.read_sql_query(query, conn, params=params)
+        conn.close()
+
+        # ✅ 필터 적용
+        if selected_week != "전체":
+            df_active = df_active[df_active['WEEK_TAG'] == selected_week]
+        if selected_direction != "전체":
+            df_active = df_active[df_active['INOUT_TAG'] == selected_direction]
+        if selected_line != "전체":
+            df_active = df_active[df_active['LINE_NUM'] == selected_line]
 
     active_trains = []
     for _, row in df_active.iterrows():
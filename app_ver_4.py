@@ -1,147 +1,864 @@
-from flask import Flask, render_template, jsonify, request
+from flask import Flask, render_template, jsonify, request, Response, stream_with_context, g
 import pandas as pd
+import numpy as np
 import os
 import json
-from datetime import datetime, timedelta
-import sqlite3
 import ast
+import functools
+import hashlib
+import logging
+import threading
+import time
+import uuid
+
+from utils.simulation_utils import WEATHER_DELAY, format_time, parse_time_to_seconds
+from utils.timetable_index import TimetableIndex
+from utils.shared_timetable import attach
+from utils.position_engine import PositionEngine
+from utils.track_geometry import TrackGeometry
+from utils.station_registry import StationRegistry
+from utils.simulation_clock import Simulation
+from utils.delay_propagation import DelayNetwork, DelayState
+from utils.frame_stream import DeltaEncoder, format_sse
+from utils.frame_codec import BINARY_MIMETYPE, encode_frame, frame_dictionary, wants_binary
+from utils.frame_cache import FrameCache, frame_key
+from utils.frame_store import FrameStore
+from utils.spatial_index import StationGrid, WeatherRegions, parse_region_ids
+from utils.static_payload import StaticPayload
+from utils.analytics import TimetableAnalytics
+from utils.congestion_model import CongestionModel
+from utils.segment_keyframes import geometry_payload, segment_keyframes
+from utils.arrival_index import NEXT_ARRIVALS_MAX, ArrivalIndex
+from utils.metrics import (
+    PROFILE_SLOW_MS, PROMETHEUS_MIMETYPE, TRAIN_COUNT_BUCKETS, MetricsRegistry, SlowFrameProfiler, StageTimer
+)
 
 app = Flask(__name__)
+logger = logging.getLogger(__name__)
 
 # 📁 경로 설정 db는 sql 처리
 station_path = os.path.join("data", "station.csv")
 line_path = os.path.join("data", "line_orders.json")
 db_path = os.path.join("data", "preprocessed_timetable.db")
+timetable_store_path = os.environ.get("TIMETABLE_STORE", os.path.join("data", "timetable_store"))
+frame_store_path = os.path.join("data", "frame_store")
 
 # 📄 정적 데이터 로딩
 df_station = pd.read_csv(station_path, encoding='utf-8')
 with open(line_path, encoding="utf-8") as f:
     line_orders = json.load(f)
 
-# 위경도 딕셔너리
-station_dict = {row['역명']: (row['위도'], row['경도']) for _, row in df_station.iterrows()}
+# 🚉 역 등록소 ((호선, 역명) → 역 id, 이름 변형 정규화)
+station_registry = StationRegistry.from_dataframe(df_station)
+
+# 🗺️ 역 좌표 격자 인덱스 (등록소의 역 id/좌표 그대로) + 날씨 지역 등록소
+station_grid = StationGrid.from_registry(station_registry)
+weather_regions = WeatherRegions(station_grid)
+
+# 🗂️ 시간표 인덱스 (서버 시작 시 한 번만 로딩, 요청마다 DB 접속하지 않음)
+# python -m utils.shared_timetable (또는 utils.timetable_store) 로 만든 store 가 있으면 읽기 전용 mmap 으로 바로 열고,
+# 없거나 store 를 만든 뒤 DB 가 바뀌었으면 DB 에서 읽음 - 세대 방식 store 면 CURRENT 세대를 열고 이 프로세스가 끝날 때까지 그 세대를 씀
+try:
+    timetable_generation, timetable = attach(timetable_store_path, db_path)
+except (OSError, ValueError):
+    timetable_generation, timetable = None, TimetableIndex.from_sqlite(db_path)
+engine = PositionEngine(timetable, station_registry)
+engine.use_geometry(TrackGeometry(engine, line_orders, station_registry))
+if engine.unmatched:
+    logger.warning(
+        "station.csv 에서 찾지 못한 역 %d개 (시간표 %d행): %s",
+        len(engine.unmatched), sum(rows for _, _, rows in engine.unmatched),
+        ", ".join(f"{line} {name}" for line, name, _ in engine.unmatched[:20]),
+    )
+frame_dict = frame_dictionary(engine)
+
+# 📨 정적 응답은 미리 직렬화 + gzip 해두고 ETag 로 재검증 (원본 파일이 바뀌면 다시 만듦, df_station 은 그대로 둠)
+def _stations_body():
+    df = pd.read_csv(station_path, encoding='utf-8')
+    df['호선명'] = df['호선'].astype(str) + '호선'
+    return app.json.dumps(df.to_dict(orient="records")).encode("utf-8")
+
+def _lines_body():
+    with open(line_path, encoding="utf-8") as f:
+        return app.json.dumps(json.load(f)).encode("utf-8")
+
+static_payloads = {
+    "stations": StaticPayload(_stations_body, [station_path]),
+    "lines": StaticPayload(_lines_body, [line_path]),
+    "frame_dictionary": StaticPayload(lambda: app.json.dumps(frame_dict).encode("utf-8")),
+    "track_geometry": StaticPayload(lambda: app.json.dumps(geometry_payload(engine.geometry)).encode("utf-8")),
+}
+
+# 🔗 지연 전파 그래프 (열차 운행 순서 + 역별 뒤따르는 열차) - 시나리오 단계별 지연 상태는 캐시
+delay_network = DelayNetwork(timetable, engine)
+delay_states = FrameCache(maxsize=16, ttl_sec=None)
+# (앞 단계 key, 적용 시각) → 마지막으로 계산한 단계 key (역 지연만 다른 새 단계는 이 상태에서 달라진 역만 전파)
+recent_scenarios = FrameCache(maxsize=64, ttl_sec=None)
+
+# 🚦 출퇴근 시간 기반 자동 혼잡도 ((요일, 역, 30분) 정차 시간 증가 표 → 구간별 값은 시작 시 한 번만 gather)
+congestion_model = CongestionModel(timetable)
+no_station_delay = np.zeros(len(engine.station_names), dtype=np.int32)
+no_dwell_delay = np.zeros_like(congestion_model.segment_dwell)
+
+# 🕰️ (호선, 역, 방향, 요일) 별 도착 시각 정렬 배열 - "다음 열차" 조회는 이진 탐색으로
+arrival_index = ArrivalIndex(delay_network)
+
+# 📊 시간표 집계 (구간별 시/정차 시간/배차 간격 배열은 시작 시 한 번만 계산, 결과는 시나리오별 캐시)
+analytics = TimetableAnalytics(delay_network)
+analytics_cache = FrameCache(maxsize=256, ttl_sec=None)
+
+# 📦 미리 계산해둔 기본 시나리오 프레임 (python -m utils.frame_store 로 생성, 없으면 직접 계산)
+frame_store = FrameStore.open(frame_store_path, timetable)
+
+# 🧊 프레임 캐시 (같은 시각/필터/날씨 조합은 한 번만 계산)
+frame_cache = FrameCache()
+FRAME_CACHE_WARM = (9 * 3600, 9 * 3600 + 300)  # 기본 화면(09:00 시작, 날씨 없음) 5분
+
+# 📈 지표 (/metrics, Prometheus text 형식) - 요청/프레임 단계별 시간 히스토그램 + 열차/누락 행 카운터
+metrics = MetricsRegistry()
+request_seconds = metrics.histogram(
+    "subway_request_seconds", "요청 처리 시간 (스트리밍 응답은 응답 시작까지)", ("endpoint", "status")
+)
+# 🔬 느린 프레임 샘플링 프로파일러 (기본 꺼짐 - FRAME_PROFILE=1 로 켜거나,
+#    FRAME_PROFILE_API=1 로 띄웠을 때만 POST /api/profiler 로 켜고 끔)
+FRAME_PROFILE_API = os.environ.get("FRAME_PROFILE_API") == "1"
+frame_profiler = SlowFrameProfiler(
+    os.environ.get("FRAME_PROFILE_DIR", "profiles"),
+    slow_ms=float(os.environ.get("FRAME_PROFILE_SLOW_MS", PROFILE_SLOW_MS)),
+    enabled=os.environ.get("FRAME_PROFILE") == "1",
+)
+stages = StageTimer(
+    metrics.histogram("subway_frame_stage_seconds", "프레임 계산 단계별 시간", ("stage",)), frame_profiler
+)
+frame_trains = metrics.histogram("subway_frame_active_trains", "계산한 프레임의 열차 수", buckets=TRAIN_COUNT_BUCKETS)
+rows_skipped = metrics.counter(
+    "subway_frame_rows_skipped_total", "운행 중인 구간 중 프레임에서 빠진 수 (no_coords: 역 좌표 없음)", ("reason",)
+)
+bad_params = metrics.counter("subway_bad_params_total", "해석하지 못해 기본값으로 처리한 파라미터", ("param",))
+metrics.gauge("subway_timetable_rows", "시간표 인덱스 구간 수", fn=lambda: len(timetable))
+metrics.gauge("subway_timetable_generation", "이 worker 가 쓰는 timetable store 세대 (db: DB 에서 직접 읽음)",
+              ("generation",), fn=lambda: {(timetable_generation or "db",): 1})
+metrics.gauge("subway_timetable_rows_dropped", "시각이 없거나 잘못되어 로딩 때 제외한 행 수",
+              fn=lambda: timetable.dropped_rows)
+metrics.gauge("subway_unmatched_stations", "station.csv 에서 좌표를 찾지 못한 (호선, 역) 수",
+              fn=lambda: len(engine.unmatched))
+metrics.gauge("subway_unmatched_station_rows", "좌표를 찾지 못한 역의 시간표 행 수",
+              fn=lambda: sum(rows for _, _, rows in engine.unmatched))
+metrics.gauge("subway_simulations", "서버 시뮬레이션 실행 수", fn=lambda: len(simulations))
+
+_caches = {"frame": frame_cache, "delay_state": delay_states, "analytics": analytics_cache}
+
+def _cache_stat(field):
+    return lambda: {(name,): cache.stats()[field] for name, cache in _caches.items()}
+
+metrics.gauge("subway_cache_items", "캐시 항목 수", ("cache",), fn=_cache_stat("size"))
+for _field in ("hits", "misses", "evictions", "coalesced"):
+    metrics.counter(f"subway_cache_{_field}_total", f"캐시 {_field}", ("cache",), fn=_cache_stat(_field))
+
+# ⏩ simulation_range 한 번에 계산하는 최대 프레임 수
+RANGE_MAX_FRAMES = 600
+
+# 🎞️ /api/segments 한 번에 받을 수 있는 최대 시뮬레이션 시간 (초)
+SEGMENT_WINDOW_MAX_SEC = 3600
+
+# 🕒 서버 시뮬레이션 실행 목록 (id 를 공유하면 여러 뷰어가 같은 실행을 봄)
+SIMULATION_IDLE_SEC = 600
+STREAM_INTERVAL_SEC = 1
+simulations = {}
+simulation_seen = {}
+simulations_lock = threading.Lock()
+
+@app.before_request
+def _start_request_timer():
+    g.request_start = time.perf_counter()
+
+@app.after_request
+def _record_status(response):
+    g.response_status = response.status_code
+    return response
+
+@app.teardown_request
+def _observe_request(error):
+    """
+    요청 시간 기록 - after_request 가 건너뛰는 처리되지 않은 예외(디버그 모드 등)도 500 으로 남도록 teardown 에서 기록
+    """
+    start = g.pop("request_start", None)
+    if start is not None:
+        status = 500 if error is not None else g.pop("response_status", 500)
+        request_seconds.observe(time.perf_counter() - start, endpoint=request.endpoint or "unknown", status=status)
 
 @app.route("/")
 def index():
     return render_template("index_ver_4.html")
 
+def _static_response(name):
+    status, headers, body = static_payloads[name].current().respond(
+        request.headers.get("If-None-Match"), request.headers.get("Accept-Encoding")
+    )
+    return Response(body, status=status, headers=headers)
+
 @app.route("/api/stations")
 def stations():
-    df_station['호선명'] = df_station['호선'].astype(str) + '호선'
-    return jsonify(df_station.to_dict(orient="records"))
+    return _static_response("stations")
 
 @app.route("/api/lines")
 def lines():
-    return jsonify(line_orders)
+    return _static_response("lines")
 
-@app.route("/api/simulation_data")
-def simulation_data():
-    req_time = request.args.get("time")
-    selected_week = request.args.get("weekday", "3")
-    selected_direction = request.args.get("direction", "전체")
-    selected_line = request.args.get("line", "전체")
-    congested_stations_json = request.args.get("congested", "[]")
-    congestion_level = request.args.get("weather", "none")
-
-    # 현재 시각
+@app.route("/api/frame_dictionary")
+def frame_dictionary_data():
+    return _static_response("frame_dictionary")
+
+@app.route("/api/track_geometry")
+def track_geometry_data():
+    return _static_response("track_geometry")
+
+def _binary_response(frame, t_sec, total_delay=None):
+    return Response(
+        encode_frame(engine, frame, t_sec, frame_dict["version"], total_delay),
+        mimetype=BINARY_MIMETYPE,
+    )
+
+def congestion_delays():
+    """
+    자동 혼잡도만 하루 전체에 반영한 DelayState (처음 요청할 때 한 번 전파하고 계속 재사용)
+    """
+    return scenario_delays([(None, no_station_delay, True)])
+
+def _derive_delays(parent_key, parent, step, key):
+    """
+    앞 단계 상태에 단계 하나 (적용 시각, 역별 정차 지연, 자동 혼잡도) 를 적용 시각 이후로 얹은 DelayState
+    같은 앞 단계/적용 시각으로 최근에 계산한 상태가 남아 있으면 그 상태를 복사해서 달라진 역/구간만 다시 전파
+    """
+    since, station_delay, congestion = step
+    sibling_key = recent_scenarios.get((parent_key, since))
+    sibling = delay_states.get(sibling_key) if sibling_key is not None else None
+    state = (parent if sibling is None else sibling).copy()
+    state.update(
+        station_delay, from_sec=since, dwell_delay=congestion_model.segment_dwell if congestion else no_dwell_delay
+    )
+    recent_scenarios.put((parent_key, since), key)
+    return state
+
+def _step_digest(step):
+    since, station_delay, congestion = step
+    return f"{since}:{congestion}:".encode("utf-8") + station_delay.tobytes()
+
+def scenario_delays(steps):
+    """
+    지연 시나리오 단계 [(적용 시각, 역별 정차 지연, 자동 혼잡도 여부), ...] → 전파가 끝난 DelayState
+    - 단계마다 앞 단계 상태를 복사해서 적용 시각 이후에 도착하는 구간부터 전파
+      (서버 시뮬레이션이 그 시각에 지연을 바꾸는 것과 같은 결과, 적용 시각이 None 이면 하루 전체)
+    - 단계별 상태를 캐시하므로 지역을 하나 더 그리면 그 지역의 역만 전파
+    """
+    parent_key = "base"
+    state = delay_states.get_or_compute(parent_key, lambda: DelayState(delay_network))
+    for step in steps:
+        key = hashlib.sha1(parent_key.encode("utf-8") + b":" + _step_digest(step)).hexdigest()
+        state = delay_states.get_or_compute(key, functools.partial(_derive_delays, parent_key, state, step, key))
+        parent_key = key
+    return state
+
+def scenario_key(steps):
+    """
+    지연 시나리오 단계 → 캐시 key 용 해시 (단계가 없으면 "")
+    """
+    if not steps:
+        return ""
+    digest = hashlib.sha1()
+    for step in steps:
+        digest.update(_step_digest(step))
+    return digest.hexdigest()
+
+def _applied(since, t):
+    """
+    since 에 적용한 지연이 단계 시각 t 에 적용되어 있는지 (None 은 하루 전체 = 가장 이른 시각)
+    """
+    return since is None or (t is not None and since <= t)
+
+def scenario_steps(congested_stations, delay_buffer, regions=(), congestion=False, since=None):
+    """
+    혼잡역/날씨 또는 날씨 지역 + 자동 혼잡도 → 지연 시나리오 단계 [(적용 시각, 역별 정차 지연, 자동 혼잡도 여부), ...]
+    (적용 시각 순, 지연이 없으면 [])
+    regions: 지역 dict 목록 - 있으면 혼잡역/날씨 대신 사용
+    since: _parse_since() 결과 - 지역/혼잡역/자동 혼잡도를 적용한 시각 (없으면 하루 전체)
+    """
+    since = since or {}
+    if regions:
+        region_since = [(region, since.get(region["id"])) for region in regions]
+        times = {t for _, t in region_since}
+    else:
+        times = {since.get("")}
+    if congestion:
+        times.add(since.get("congestion"))
+
+    steps = []
+    previous = (no_station_delay, False)
+    for t in sorted(times, key=lambda t: -1 if t is None else t):
+        if regions:
+            station_delay = engine.region_delay([region for region, applied in region_since if _applied(applied, t)])
+        elif _applied(since.get(""), t):
+            station_delay = engine.congested_mask(congested_stations).astype(np.int32) * delay_buffer
+        else:
+            station_delay = no_station_delay
+        on = congestion and _applied(since.get("congestion"), t)
+        # 앞 단계와 같으면 (지연 없는 처음 단계 포함) 건너뜀
+        if on == previous[1] and np.array_equal(station_delay, previous[0]):
+            continue
+        steps.append((t, station_delay, on))
+        previous = (station_delay, on)
+    return steps
+
+def encode_frame_body(frame, t_now, fmt="json"):
+    with stages.span("encode"):
+        if fmt == "bin":
+            return encode_frame(engine, frame, t_now, frame_dict["version"])
+        return app.json.dumps(engine.to_records(frame), separators=(",", ":")).encode("utf-8")
+
+def positions(t_sec, idx, delay=None, offset=None):
+    """
+    engine.compute + 지표 기록 (열차 수, 운행 중인데 프레임에서 빠진 구간 수)
+    """
+    with stages.span("positions"):
+        frame = engine.compute(t_sec, idx, delay=delay, offset=offset)
+    no_coords, inactive = engine.skipped_rows(idx, frame)
+    if no_coords:
+        rows_skipped.inc(no_coords, reason="no_coords")
+    if inactive:
+        rows_skipped.inc(inactive, reason="inactive")
+    frame_trains.observe(len(frame["idx"]))
+    return frame
+
+def stored_frame(t_sec, week, direction, line):
+    with stages.span("store"):
+        frame = frame_store.frame(t_sec, week, direction=direction, line=line)
+    frame_trains.observe(len(frame["idx"]))
+    return frame
+
+def compute_frame_body(t_now, week, direction, line, congested_stations, delay_buffer, fmt="json", regions=(),
+                       congestion=False, since=None):
+    """
+    simulation_data 응답 본문(bytes) 계산 - JSON 또는 바이너리 프레임
+    regions: 등록된 날씨 지역 목록 (있으면 혼잡역/날씨 대신 사용)
+    congestion: 출퇴근 시간 기반 자동 혼잡도 적용 여부
+    since: 지역/혼잡역/자동 혼잡도 적용 시각 (_parse_since() 결과, 없으면 하루 전체)
+    지연이 있으면 하류 구간과 뒤따르는 열차까지 전파된 지연으로 위치 계산 (미리 전파해둔 배열을 gather)
+    """
+    with stages.span("scenario"):
+        steps = scenario_steps(congested_stations, delay_buffer, regions, congestion, since)
+    if not steps:
+        if frame_store is not None and frame_store.has(week):
+            frame = stored_frame(t_now, week, direction, line)
+        else:
+            with stages.span("select"):
+                idx = timetable.active(t_now, week=week, direction=direction, line=line)
+            frame = positions(t_now, idx)
+    else:
+        with stages.span("delay"):
+            state = scenario_delays(steps)
+        with stages.span("select"):
+            idx, offset, delay = state.active(t_now, week, direction, line)
+        frame = positions(t_now, idx, delay=delay, offset=offset)
+    return encode_frame_body(frame, t_now, fmt)
+
+def compute_frame_range(t_start, t_end, step, week, direction, line, steps):
+    """
+    t_start ~ t_end 프레임을 step 간격으로 차례로 계산 → (t, frame) yield
+    steps: scenario_steps() 결과
+    시각마다 따로 조회하지 않고 겹치는 구간 목록을 한 번만 훑음
+    """
+    if not steps:
+        if frame_store is not None and frame_store.has(week):
+            for t_sec in range(t_start, t_end + 1, step):
+                yield t_sec, stored_frame(t_sec, week, direction, line)
+            return
+        for t_sec, idx in timetable.sweep(t_start, t_end, step, week, direction, line):
+            yield t_sec, positions(t_sec, idx)
+        return
+    with stages.span("delay"):
+        state = scenario_delays(steps)
+    for t_sec, idx, offset, delay in state.sweep(t_start, t_end, step, week, direction, line):
+        yield t_sec, positions(t_sec, idx, delay=delay, offset=offset)
+
+def compute_segment_window(t_start, t_end, week, direction, line, steps):
+    """
+    [t_start, t_end] 와 운행 시간이 겹치는 구간 keyframe → 응답 본문(bytes)
+    steps: scenario_steps() 결과
+    """
+    if not steps:
+        with stages.span("select"):
+            idx = timetable.overlapping(t_start, t_end, week, direction, line)
+        offset = depart_delay = None
+    else:
+        with stages.span("delay"):
+            state = scenario_delays(steps)
+        with stages.span("select"):
+            idx, offset, delay = state.overlapping(t_start, t_end, week, direction, line)
+        depart_delay = offset + delay
+    with stages.span("encode"):
+        body = {
+            "start": t_start,
+            "end": t_end,
+            "dict_version": frame_dict["version"],
+            "segments": segment_keyframes(engine, idx, offset, depart_delay),
+        }
+        return app.json.dumps(body, separators=(",", ":")).encode("utf-8")
+
+def warm_frame_cache(start_sec, end_sec, week="3", direction="전체", line="전체"):
+    """
+    날씨 없는 기본 시나리오 프레임을 미리 계산해서 캐시에 넣어둠 (만료 없음)
+    """
+    for t_sec in range(start_sec, end_sec):
+        key = frame_key(t_sec, week, direction, line, 0, ())
+        frame_cache.put(key, compute_frame_body(t_sec, week, direction, line, (), 0), ttl=None)
+
+_warm_started = False
+_warm_lock = threading.Lock()
+
+def start_frame_cache_warmer():
+    """
+    FRAME_CACHE_WARM 구간 미리 계산을 백그라운드 스레드로 시작 (서버 진입점에서 한 번 호출, 여러 번 불러도 한 번만)
+    import 만 하는 곳 (CLI, 테스트, prefork master) 에서는 스레드를 띄우지 않음
+    """
+    global _warm_started
+    with _warm_lock:
+        if _warm_started:
+            return
+        _warm_started = True
+    threading.Thread(target=warm_frame_cache, args=FRAME_CACHE_WARM, daemon=True).start()
+
+@app.route("/api/weather_regions", methods=["POST"])
+def register_weather_region():
+    """
+    날씨 지역 등록 (bbox: [남, 서, 북, 동] 또는 polygon: [[위도, 경도], ...]) → 지역 id
+    """
+    params = request.get_json(silent=True) or {}
     try:
-        t_now = datetime.strptime(req_time, "%H:%M:%S")
-    except:
-        return jsonify([])
+        region = weather_regions.register(
+            params.get("weather", "none"), bbox=params.get("bbox"), polygon=params.get("polygon")
+        )
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    return jsonify({**region, "stations": sorted(region["stations"])})
+
+@app.route("/api/weather_regions/<region_id>")
+def weather_region(region_id):
+    region = weather_regions.get(region_id)
+    if region is None:
+        return jsonify({"error": "unknown region"}), 404
+    return jsonify({**region, "stations": sorted(region["stations"])})
+
+@app.route("/api/analytics/<metric>")
+def analytics_data(metric):
+    """
+    trains_per_hour: 역별 시간당 열차 수 / headways: 호선·방향별 배차 간격 분포
+    dwell: 정차 시간 백분위 / delay: 날씨·혼잡 시나리오(weather, congested, regions, congestion)의 역별 지연 합계
+    """
+    week, direction, line, congested_stations, delay_buffer, _, regions, _, congestion, since = _frame_params(
+        request.args
+    )
+    if metric == "delay":
+        steps = scenario_steps(congested_stations, delay_buffer, regions, congestion, since)
+        scenario = scenario_key(steps)
+        compute = lambda: analytics.station_delays(scenario_delays(steps), week, direction, line)
+    elif metric in ("trains_per_hour", "headways", "dwell"):
+        scenario = None
+        method = {"trains_per_hour": analytics.trains_per_hour, "headways": analytics.headways,
+                  "dwell": analytics.dwell_times}[metric]
+        compute = lambda: method(week, direction, line)
+    else:
+        return jsonify({"error": "unknown metric"}), 404
+
+    result = analytics_cache.get_or_compute((metric, week, direction, line, scenario), compute)
+    return jsonify(result)
+
+@app.route("/api/congestion/<station>")
+def congestion_profile(station):
+    """
+    자동 혼잡도 표에서 역 하나의 시간대별 정차 시간 증가 (weekday 요일 기준)
+    """
+    profile = congestion_model.station_profile(station, request.args.get("weekday", "3"))
+    if profile is None:
+        return jsonify({"error": "unknown station or weekday"}), 404
+    return jsonify(profile)
+
+def _arrival_params(args):
+    """
+    다음 열차 조회 공통 파라미터 → ((시각, n, 요일, 방향, 지연 상태), None) 또는 (None, 오류 메시지)
+    시각이 없거나 잘못됐거나 시간표에 없는 요일이면 오류 (400)
+    지연 상태: 날씨 지역(regions)/혼잡역+날씨/자동 혼잡도가 있으면 전파가 끝난 DelayState, 없으면 None
+    """
+    t_sec = parse_time_to_seconds(args.get("time") or "")
+    if t_sec is None:
+        return None, "time 은 HH:MM:SS"
+    try:
+        n = min(max(int(args.get("n", 5)), 1), NEXT_ARRIVALS_MAX)
+    except ValueError:
+        n = 5
+    week, direction, _, congested_stations, delay_buffer, _, regions, _, congestion, since = _frame_params(args)
+    if week not in timetable.week_lookup:
+        return None, "unknown weekday"
+    steps = scenario_steps(congested_stations, delay_buffer, regions, congestion, since)
+    state = scenario_delays(steps) if steps else None
+    return (t_sec, n, week, direction, state), None
+
+@app.route("/api/stations/<name>/next")
+def station_next_arrivals(name):
+    """
+    역 하나에 time 이후 도착하는 열차 n 대 (예상 도착 순, 날씨 지역/자동 혼잡도 지연 반영)
+    weekday, direction, line(없으면 모든 호선) 필터
+    """
+    station_id = arrival_index.station_id(name)
+    if station_id is None:
+        return jsonify({"error": "unknown station"}), 404
+    params, error = _arrival_params(request.args)
+    if error is not None:
+        return jsonify({"error": error}), 400
+    t_sec, n, week, direction, state = params
+
+    line = request.args.get("line", "전체")
+    line_code = None if line == "전체" else arrival_index.line_code(line)
+    if line != "전체" and line_code is None:
+        return jsonify({"error": "unknown line"}), 404
+    events, expected = arrival_index.next_arrivals(station_id, t_sec, n, week, direction, line_code, state)
+    return jsonify({
+        "station": engine.station_names[station_id],
+        "time": format_time(t_sec),
+        "arrivals": arrival_index.records(events, expected),
+    })
+
+@app.route("/api/lines/<line>/next")
+def line_next_arrivals(line):
+    """
+    호선의 모든 역 (노선 순서) 에 대해 time 이후 도착 n 대 - 전광판용 일괄 조회
+    """
+    line_code = arrival_index.line_code(line)
+    if line_code is None:
+        return jsonify({"error": "unknown line"}), 404
+    params, error = _arrival_params(request.args)
+    if error is not None:
+        return jsonify({"error": error}), 400
+    t_sec, n, week, direction, state = params
+
+    stations = []
+    for station_id in arrival_index.stations_on_line(line_code, line_orders):
+        events, expected = arrival_index.next_arrivals(station_id, t_sec, n, week, direction, line_code, state)
+        stations.append({
+            "station": engine.station_names[station_id],
+            "arrivals": arrival_index.records(events, expected),
+        })
+    return jsonify({"line": timetable.line_names[line_code], "time": format_time(t_sec), "stations": stations})
+
+@app.route("/api/cache_stats")
+def cache_stats():
+    return jsonify(frame_cache.stats())
+
+@app.route("/metrics")
+def metrics_text():
+    return Response(metrics.render(), content_type=PROMETHEUS_MIMETYPE)
+
+@app.route("/api/profiler", methods=["GET", "POST"])
+def profiler_settings():
+    """
+    느린 프레임 프로파일러 상태 / 켜고 끄기 (POST {"enabled": true, "slow_ms": 50})
+    slow_ms 이상 걸린 simulation_data 프레임 계산마다 FRAME_PROFILE_DIR 에 collapsed 스택 파일 저장
+    디스크에 파일을 쓰는 기능이라 FRAME_PROFILE_API=1 로 띄운 서버에서만 열림 (아니면 404)
+    """
+    if not FRAME_PROFILE_API:
+        return jsonify({"error": "profiler API 꺼짐 (FRAME_PROFILE_API=1)"}), 404
+    if request.method == "POST":
+        params = request.get_json(silent=True) or {}
+        try:
+            frame_profiler.configure(params.get("enabled"), params.get("slow_ms"))
+        except (TypeError, ValueError) as e:
+            return jsonify({"error": str(e)}), 400
+    return jsonify(frame_profiler.status())
+
+def _parse_time_list(value, param):
+    times = [parse_time_to_seconds(item.strip()) if item.strip() else None for item in value.split(",")]
+    if any(t is None for t in times):
+        bad_params.inc(param=param)
+    return times
+
+def _parse_since(args):
+    """
+    지연을 적용한 시각 → {지역 id: 초, "": 혼잡역/날씨, "congestion": 자동 혼잡도} (없거나 잘못된 값은 빠짐 = 하루 전체)
+    since=HH:MM:SS,... 는 regions 와 같은 순서 (regions 가 없으면 첫 값이 혼잡역/날씨), congestion_since=HH:MM:SS
+    """
+    since = {}
+    if args.get("since"):
+        region_ids = [rid.strip() for rid in (args.get("regions") or "").split(",") if rid.strip()] or [""]
+        since.update(zip(region_ids, _parse_time_list(args["since"], "since")))
+    if args.get("congestion_since"):
+        since["congestion"] = _parse_time_list(args["congestion_since"], "congestion_since")[0]
+    return {key: t for key, t in since.items() if t is not None}
+
+def _frame_params(args, accept=None):
+    """
+    simulation_data / simulation_range 공통 파라미터
+    → (요일, 방향, 호선, 혼잡역, 정차 지연, 지역 id, 지역, 형식, 자동 혼잡도 여부, 적용 시각)
+    args: 쿼리 파라미터 (request.args 또는 dict), accept: Accept 헤더
+    적용 시각: _parse_since() 결과
+    """
+    selected_week = args.get("weekday", "3")
+    selected_direction = args.get("direction", "전체")
+    selected_line = args.get("line", "전체")
 
     # 혼잡역 파싱
     try:
-        congested_stations = set(ast.literal_eval(congested_stations_json))
-    except:
+        congested_stations = set(ast.literal_eval(args.get("congested", "[]")))
+    except Exception:
+        bad_params.inc(param="congested")
         congested_stations = set()
 
     # 날씨 영향에 따른 정차시간 증가 (초)
-    weather_delay = {
-        "none": 0,
-        "약함": 5,
-        "보통": 10,
-        "강함": 20
-    }
-    delay_buffer = weather_delay.get(congestion_level, 0)
-
-    # 📦 DB 쿼리
-    conn = sqlite3.connect(db_path)
-    query = """
-        SELECT TRAIN_NO, LINE_NUM, STATION_NM, ARRIVETIME, LEFTTIME, 
-               NEXT_STATION, NEXT_ARRIVETIME, WEEK_TAG, INOUT_TAG
-        FROM preprocessed_timetable
-        WHERE ARRIVETIME <= ? AND NEXT_ARRIVETIME >= ?
-    """
-    params = [req_time, req_time]
-    df = pd.read_sql_query(query, conn, params=params)
-    conn.close()
-
-    # 🔍 필터링
-    if selected_week != "전체":
-        df = df[df['WEEK_TAG'] == selected_week]
-    if selected_direction != "전체":
-        df = df[df['INOUT_TAG'] == selected_direction]
-    if selected_line != "전체":
-        df = df[df['LINE_NUM'] == selected_line]
-
-    active_trains = []
-    for _, row in df.iterrows():
-        try:
-            train_no = row['TRAIN_NO']
-            line = row['LINE_NUM']
-            from_station = row['STATION_NM']
-            to_station = row['NEXT_STATION']
-
-            lat1, lon1 = station_dict.get(from_station, (None, None))
-            lat2, lon2 = station_dict.get(to_station, (None, None))
-            if lat1 is None:
-                continue
-
-            # 시간 계산
-            t_arrive = datetime.strptime(row['ARRIVETIME'], "%H:%M:%S")
-            t_depart = datetime.strptime(row['LEFTTIME'], "%H:%M:%S")
-            t_next_arrive = datetime.strptime(row['NEXT_ARRIVETIME'], "%H:%M:%S") if pd.notna(row['NEXT_ARRIVETIME']) else None
-
-            delay_applied = 0
-            if from_station in congested_stations and delay_buffer > 0:
-                delay_applied = delay_buffer
-                t_depart += timedelta(seconds=delay_applied)
-
-            # 상태 및 위치 계산
-            if t_arrive <= t_now < t_depart:
-                status = "stopped"
-                progress = 0
-                lat, lon = lat1, lon1
-            elif t_depart <= t_now and t_next_arrive:
-                status = "moving"
-                total_time = (t_next_arrive - t_depart).total_seconds()
-                passed_time = (t_now - t_depart).total_seconds()
-                progress = max(0, min(1, passed_time / total_time))
-                lat = lat1 + (lat2 - lat1) * progress
-                lon = lon1 + (lon2 - lon1) * progress
-            elif pd.isna(row['NEXT_ARRIVETIME']):
-                status = "terminal"
-                progress = 0
-                lat, lon = lat1, lon1
+    weather = args.get("weather", "none")
+    if weather not in WEATHER_DELAY:
+        bad_params.inc(param="weather")
+    delay_buffer = WEATHER_DELAY.get(weather, 0)
+
+    # 🗺️ 등록된 날씨 지역 (regions=id1,id2 - 혼잡역 목록 대신 사용)
+    region_ids = parse_region_ids(args.get("regions"))
+    regions = weather_regions.resolve(region_ids)
+
+    fmt = "bin" if wants_binary(args.get("format"), accept) else "json"
+
+    # 🚦 congestion=auto 면 출퇴근 시간 기반 자동 혼잡도 적용
+    congestion = args.get("congestion") == "auto"
+
+    # ⏱️ 지역/혼잡역/자동 혼잡도를 적용한 시각 - 그 뒤에 도착하는 구간부터 지연 (없으면 하루 전체)
+    since = _parse_since(args)
+    return (selected_week, selected_direction, selected_line, congested_stations, delay_buffer, region_ids, regions,
+            fmt, congestion, since)
+
+def frame_request(args, accept=None):
+    """
+    simulation_data 요청 → (캐시 key, 계산 함수, mimetype) - 시각이 없거나 잘못되면 None
+    Flask 라우트와 ASGI 모드(asgi_ver_4)가 같이 사용
+    """
+    req_time = args.get("time")
+
+    # 현재 시각 (초)
+    t_now = parse_time_to_seconds(req_time) if req_time else None
+    if t_now is None:
+        return None
+
+    week, direction, line, congested_stations, delay_buffer, region_ids, regions, fmt, congestion, since = \
+        _frame_params(args, accept)
+    key = frame_key(
+        t_now, week, direction, line, delay_buffer, congested_stations, fmt, region_ids, congestion, since
+    )
+
+    def compute():
+        # 프로파일러가 켜져 있으면 느린 프레임 계산만 파일로 남음
+        with frame_profiler.profile(f"simulation_data time={req_time} weekday={week} line={line} fmt={fmt}"):
+            return compute_frame_body(
+                t_now, week, direction, line, congested_stations, delay_buffer, fmt, regions, congestion, since
+            )
+
+    return key, compute, BINARY_MIMETYPE if fmt == "bin" else "application/json"
+
+@app.route("/api/simulation_data")
+def simulation_data():
+    frame_req = frame_request(request.args, request.headers.get("Accept"))
+    if frame_req is None:
+        return jsonify([])
+
+    # 🧊 캐시 조회 → 없으면 인덱스 조회 + 배열 연산으로 계산 (같은 key 를 계산 중이면 그 결과를 기다림)
+    key, compute, mimetype = frame_req
+    return Response(frame_cache.get_or_compute(key, compute), mimetype=mimetype)
+
+@app.route("/api/simulation_range")
+def simulation_range():
+    """
+    start ~ end 프레임을 step 간격으로 한 번에 계산해서 만들어지는 대로 스트리밍 (chunked)
+    - JSON: 줄마다 {"time_sec": t, "trains": [...]} (NDJSON)
+    - 바이너리: 프레임을 이어 붙임 (각 헤더의 count 로 다음 프레임 위치를 알 수 있음)
+    """
+    t_start = parse_time_to_seconds(request.args.get("start") or "")
+    t_end = parse_time_to_seconds(request.args.get("end") or "")
+    try:
+        step = max(int(request.args.get("step", 1)), 1)
+    except ValueError:
+        step = 1
+    if t_start is None or t_end is None or t_end < t_start:
+        return jsonify({"error": "start/end 는 HH:MM:SS 이고 start <= end 여야 함"}), 400
+    if (t_end - t_start) // step + 1 > RANGE_MAX_FRAMES:
+        return jsonify({"error": f"한 번에 최대 {RANGE_MAX_FRAMES} 프레임"}), 400
+
+    week, direction, line, congested_stations, delay_buffer, _, regions, fmt, congestion, since = _frame_params(
+        request.args, request.headers.get("Accept")
+    )
+    steps = scenario_steps(congested_stations, delay_buffer, regions, congestion, since)
+
+    def generate():
+        for t_sec, frame in compute_frame_range(t_start, t_end, step, week, direction, line, steps):
+            body = encode_frame_body(frame, t_sec, fmt)
+            if fmt == "bin":
+                yield body
             else:
-                continue
-
-            active_trains.append({
-                "train_no": train_no,
-                "line": line,
-                "from": from_station,
-                "to": to_station if pd.notna(to_station) else from_station,
-                "progress": progress,
-                "status": status,
-                "lat": lat,
-                "lon": lon,
-                "delay": delay_applied  # 현재 프레임 기준 delay만 전송
-            })
-
-        except Exception:
-            continue
+                yield b'{"time_sec":%d,"trains":%s}\n' % (t_sec, body)
+
+    mimetype = BINARY_MIMETYPE if fmt == "bin" else "application/x-ndjson"
+    return Response(stream_with_context(generate()), mimetype=mimetype)
+
+@app.route("/api/segments")
+def segments():
+    """
+    start ~ end 와 운행 시간이 겹치는 구간 keyframe (도착/출발/다음역 도착 시각 + 선로 형상 id, 지연 반영)
+    클라이언트는 창 안에서는 서버 요청 없이 requestAnimationFrame 으로 위치를 보간하고, 창 끝이 가까워지면 다음 창을 받음
+    train/line/from/to 는 /api/frame_dictionary, geom 은 /api/track_geometry 의 id
+    """
+    t_start = parse_time_to_seconds(request.args.get("start") or "")
+    t_end = parse_time_to_seconds(request.args.get("end") or "")
+    if t_start is None or t_end is None or t_end < t_start:
+        return jsonify({"error": "start/end 는 HH:MM:SS 이고 start <= end 여야 함"}), 400
+    if t_end - t_start > SEGMENT_WINDOW_MAX_SEC:
+        return jsonify({"error": f"한 번에 최대 {SEGMENT_WINDOW_MAX_SEC}초"}), 400
+
+    week, direction, line, congested_stations, delay_buffer, _, regions, _, congestion, since = _frame_params(
+        request.args
+    )
+    steps = scenario_steps(congested_stations, delay_buffer, regions, congestion, since)
+    key = ("segments", t_start, t_end, week, direction, line, scenario_key(steps))
+    body = frame_cache.get_or_compute(
+        key, lambda: compute_segment_window(t_start, t_end, week, direction, line, steps)
+    )
+    return Response(body, mimetype="application/json")
+
+def _get_simulation(sim_id):
+    with simulations_lock:
+        sim = simulations.get(sim_id)
+        if sim is not None:
+            simulation_seen[sim_id] = time.monotonic()
+    return sim
+
+def _expire_simulations():
+    """
+    한동안 아무도 보지 않은 실행 정리
+    """
+    now = time.monotonic()
+    with simulations_lock:
+        for sim_id in [k for k, seen in simulation_seen.items() if now - seen > SIMULATION_IDLE_SEC]:
+            simulations.pop(sim_id, None)
+            simulation_seen.pop(sim_id, None)
+
+def _control_error(params):
+    """
+    잘못된 제어 값이 있으면 오류 메시지 (없으면 None) - 적용하기 전에 확인해서 400 으로 응답
+    """
+    if "speed" in params:
+        try:
+            speed = int(params["speed"])
+        except (TypeError, ValueError):
+            speed = 0
+        if isinstance(params["speed"], bool) or speed <= 0:
+            bad_params.inc(param="speed")
+            return "invalid speed"
+    if "time" in params and parse_time_to_seconds(str(params["time"])) is None:
+        bad_params.inc(param="time")
+        return "invalid time"
+    return None
+
+def _apply_controls(sim, params):
+    # 실행 중이면 흐른 시간만큼 먼저 진행 - 지연 변경은 sim.t 이후 구간에만 적용되므로 멈춰 있던 sim.t 를 쓰면 안 됨
+    sim.sync()
+    if "congestion" in params:
+        auto = params["congestion"] == "auto"
+        sim.set_congestion(congestion_model.segment_dwell if auto else no_dwell_delay)
+    if "regions" in params:
+        sim.set_regions(weather_regions.resolve(parse_region_ids(params["regions"])))
+    elif "weather" in params or "congested" in params:
+        sim.set_weather(params.get("congested", []), params.get("weather", "none"))
+    if "time" in params:
+        # 클라이언트가 앞서 재생한 시각으로 따라잡기 (되감기는 지원하지 않음)
+        t_sec = parse_time_to_seconds(str(params["time"]))
+        if t_sec > sim.t:
+            sim.advance_to(t_sec)
+    if "speed" in params:
+        sim.set_speed(int(params["speed"]))
+    if "running" in params:
+        sim.set_running(bool(params["running"]))
+
+@app.route("/api/simulation", methods=["POST"])
+def create_simulation():
+    params = request.get_json(silent=True) or {}
+    error = _control_error(params)
+    if error is not None:
+        return jsonify({"error": error}), 400
+    start_sec = parse_time_to_seconds(str(params.get("time", "09:00:00")))
+
+    _expire_simulations()
+    sim = Simulation(
+        timetable, engine, delay_network, start_sec,
+        week=params.get("weekday", "3"),
+        direction=params.get("direction", "전체"),
+        line=params.get("line", "전체"),
+        delays=congestion_delays() if params.get("congestion") == "auto" else None,
+    )
+    _apply_controls(sim, params)
+
+    sim_id = uuid.uuid4().hex
+    with simulations_lock:
+        simulations[sim_id] = sim
+        simulation_seen[sim_id] = time.monotonic()
+    return jsonify({"id": sim_id, **sim.frame()})
+
+@app.route("/api/simulation/<sim_id>")
+def simulation_frame(sim_id):
+    sim = _get_simulation(sim_id)
+    if sim is None:
+        return jsonify({"error": "unknown simulation"}), 404
+    sim.sync()
+    if wants_binary(request.args.get("format"), request.headers.get("Accept")):
+        frame = sim.frame_arrays()
+        return _binary_response(frame, frame["time_sec"], frame["total_delay"])
+    return jsonify(sim.frame())
+
+@app.route("/api/simulation/<sim_id>/stream")
+def simulation_stream(sim_id):
+    """
+    SSE 로 프레임 push (주기적으로 keyframe, 그 사이에는 변경분만)
+    """
+    if _get_simulation(sim_id) is None:
+        return jsonify({"error": "unknown simulation"}), 404
+
+    def generate():
+        encoder = DeltaEncoder()
+        while True:
+            sim = _get_simulation(sim_id)
+            if sim is None:
+                yield format_sse({}, event="end")
+                return
+            sim.sync()
+            yield format_sse(encoder.encode(sim.frame()))
+            time.sleep(STREAM_INTERVAL_SEC)
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.route("/api/simulation/<sim_id>/control", methods=["POST"])
+def simulation_control(sim_id):
+    sim = _get_simulation(sim_id)
+    if sim is None:
+        return jsonify({"error": "unknown simulation"}), 404
+    params = request.get_json(silent=True) or {}
+    error = _control_error(params)
+    if error is not None:
+        return jsonify({"error": error}), 400
+    _apply_controls(sim, params)
+    return jsonify(sim.frame())
 
-    return jsonify(active_trains)
+@app.route("/api/simulation/<sim_id>", methods=["DELETE"])
+def delete_simulation(sim_id):
+    with simulations_lock:
+        simulations.pop(sim_id, None)
+        simulation_seen.pop(sim_id, None)
+    return jsonify({"ok": True})
 
 if __name__ == "__main__":
+    start_frame_cache_warmer()
     app.run(host="0.0.0.0", port=10000, debug=True)
@@ -0,0 +1,107 @@
+"""
+app_ver_4 ASGI 서빙 모드 (동시 접속 뷰어가 많을 때)
+
+    uvicorn asgi_ver_4:app --host 0.0.0.0 --port 10000
+
+- /api/stations, /api/lines, /api/frame_dictionary, /api/track_geometry: 미리 직렬화/gzip 해둔 본문을 이벤트 루프에서 바로 응답
+  (ETag 가 맞으면 304)
+- /api/simulation_data: 프레임 계산은 스레드 풀에서 (시각, 필터) 당 한 번만 하고, 같은 프레임을 요청한
+  동시 요청은 같은 Future 를 await (single-flight)
+- /api/simulation/<id>/stream: SSE 루프는 이벤트 루프에서 돌고 프레임 계산만 스레드 풀 사용
+  (뷰어 수만큼 스레드가 잠들어 있지 않음, 같은 실행의 프레임은 Simulation.frame() 이 한 번만 계산)
+- 나머지 경로는 Flask 앱을 스레드 풀에서 그대로 호출 (/metrics 포함)
+- 여기서 직접 응답하는 경로도 Flask 와 같은 요청 시간 히스토그램(subway_request_seconds)에 기록
+"""
+import asyncio
+import functools
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import app_ver_4 as web
+from utils.asgi_bridge import AsyncFrontend, WsgiBridge, response
+from utils.frame_stream import DeltaEncoder, format_sse
+
+# 프레임 계산용 스레드 수 (numpy 연산이 대부분 GIL 을 놓으므로 코어 수 정도)
+COMPUTE_WORKERS = int(os.environ.get("COMPUTE_WORKERS", min(8, os.cpu_count() or 1)))
+# Flask 로 넘기는 요청용 스레드 수
+WSGI_WORKERS = int(os.environ.get("WSGI_WORKERS", 32))
+
+compute_pool = ThreadPoolExecutor(max_workers=COMPUTE_WORKERS, thread_name_prefix="frame")
+wsgi_pool = ThreadPoolExecutor(max_workers=WSGI_WORKERS, thread_name_prefix="wsgi")
+
+app = AsyncFrontend(WsgiBridge(web.app, wsgi_pool))
+web.start_frame_cache_warmer()
+
+
+def _timed(endpoint):
+    """
+    핸들러 처리 시간을 Flask 라우트와 같은 endpoint 이름으로 기록 (스트리밍 응답은 응답 시작까지)
+    """
+    def decorator(handler):
+        @functools.wraps(handler)
+        async def wrapper(request, **params):
+            start = time.perf_counter()
+            status = 500
+            try:
+                result = await handler(request, **params)
+                status = result[0]
+                return result
+            finally:
+                web.request_seconds.observe(time.perf_counter() - start, endpoint=endpoint, status=status)
+        return wrapper
+    return decorator
+
+
+def _static_route(path, name, endpoint):
+    async def handler(request):
+        return web.static_payloads[name].current().respond(
+            request.headers.get("if-none-match"), request.headers.get("accept-encoding")
+        )
+    app.route(path)(_timed(endpoint)(handler))
+
+
+_static_route("/api/stations", "stations", "stations")
+_static_route("/api/lines", "lines", "lines")
+_static_route("/api/frame_dictionary", "frame_dictionary", "frame_dictionary_data")
+_static_route("/api/track_geometry", "track_geometry", "track_geometry_data")
+
+
+@app.route("/api/simulation_data")
+@_timed("simulation_data")
+async def simulation_data(request):
+    frame_req = web.frame_request(request.args, request.headers.get("accept"))
+    if frame_req is None:
+        return response(b"[]")
+    key, compute, mimetype = frame_req
+    body = await asyncio.wrap_future(web.frame_cache.submit(key, compute, compute_pool))
+    return response(body, mimetype)
+
+
+def _sync_frame(sim):
+    sim.sync()
+    return sim.frame()
+
+
+@app.route("/api/simulation/<sim_id>/stream")
+@_timed("simulation_stream")
+async def simulation_stream(request, sim_id):
+    if web._get_simulation(sim_id) is None:
+        return response(b'{"error":"unknown simulation"}', status=404)
+    loop = asyncio.get_running_loop()
+
+    async def generate():
+        encoder = DeltaEncoder()
+        while True:
+            sim = web._get_simulation(sim_id)
+            if sim is None:
+                yield format_sse({}, event="end").encode("utf-8")
+                return
+            frame = await loop.run_in_executor(compute_pool, _sync_frame, sim)
+            yield format_sse(encoder.encode(frame)).encode("utf-8")
+            await asyncio.sleep(web.STREAM_INTERVAL_SEC)
+
+    return response(
+        generate(), "text/event-stream",
+        headers=[("cache-control", "no-cache"), ("x-accel-buffering", "no")],
+    )
@@ -0,0 +1,54 @@
+"""
+bench.run 결과 JSON 두 개 비교 (지연/시간/메모리/크기는 작을수록, req_per_sec 는 클수록 좋음)
+
+    python -m bench.compare bench/results/old.json bench/results/new.json
+"""
+import argparse
+import json
+
+# 비교하는 항목 (마지막 key 이름)
+METRICS = ("import_sec", "rss_mb", "peak_rss_mb", "bytes", "gzip_bytes", "mean_ms", "p50_ms", "p95_ms", "req_per_sec")
+HIGHER_IS_BETTER = {"req_per_sec"}
+
+
+def flatten(report, prefix=""):
+    """
+    {"apps": {...}} → {"app_ver_4.latency.peak.json.cold.p50_ms": 1.2, ...} (METRICS 항목만)
+    """
+    items = {}
+    for key, value in report.items():
+        path = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            items.update(flatten(value, path))
+        elif key in METRICS and isinstance(value, (int, float)):
+            items[path] = value
+    return items
+
+
+def main():
+    parser = argparse.ArgumentParser(description="벤치마크 결과 비교")
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=0.05, help="이 비율 이상 바뀐 항목만 표시")
+    args = parser.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+    print(f"base {base['meta'].get('git')}  →  new {new['meta'].get('git')}")
+
+    base_items, new_items = flatten(base["apps"]), flatten(new["apps"])
+    for path in sorted(base_items.keys() & new_items.keys()):
+        old_value, new_value = base_items[path], new_items[path]
+        if old_value == 0:
+            continue
+        change = (new_value - old_value) / old_value
+        if abs(change) < args.threshold:
+            continue
+        better = change > 0 if path.rsplit(".", 1)[-1] in HIGHER_IS_BETTER else change < 0
+        print(f"{'✅' if better else '❌'} {path}: {old_value} → {new_value} ({change:+.1%})")
+
+
+if __name__ == "__main__":
+    main()
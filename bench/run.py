@@ -0,0 +1,228 @@
+"""
+simulation_data 성능 벤치마크 - 결과는 JSON (커밋 간 비교용)
+
+    python -m bench.run --out bench/results/$(git rev-parse --short HEAD).json
+    python -m bench.run --apps app_ver_2,app_ver_4 --clients 1,8,32 --duration 5
+
+1. 합성 하루치 시간표 생성 (bench.synthetic_timetable, seed 고정)
+2. 앱 로딩 방식별로 별도 프로세스에서 시작 시간/메모리, 응답 크기, 피크/비피크 프레임 지연 측정
+   - app_ver_2: CSV 를 dtype=str DataFrame 으로 로딩 / app_ver_3, app_ver_4: SQLite
+   - app_ver_4+store: python -m utils.timetable_store 로 만든 컬럼형 store 를 mmap 으로 로딩
+3. 앱마다 스레드 서버를 띄우고 동시 클라이언트 N 명으로 처리량 측정
+   - distinct: 요청마다 다른 시각 / shared_tick: 모든 클라이언트가 같은 시각(1초마다 진행)을 요청
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from bench.synthetic_timetable import write_data_dir
+from bench.worker import summarize
+from utils.simulation_utils import format_time
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 이름 → (모듈, data 디렉토리 종류)
+STRATEGIES = {
+    "app_ver_2": ("app_ver_2", "base"),
+    "app_ver_3": ("app_ver_3", "base"),
+    "app_ver_4": ("app_ver_4", "base"),
+    "app_ver_4+store": ("app_ver_4", "store"),
+}
+DEFAULT_APPS = "app_ver_2,app_ver_3,app_ver_4,app_ver_4+store"
+
+# 처리량 측정 시 요청 시각 범위 (평일 출근 시간)
+THROUGHPUT_START_SEC = 8 * 3600
+
+
+def _env():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = REPO_ROOT + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def _last_json_line(output):
+    for line in reversed(output.strip().splitlines()):
+        if line.startswith("{"):
+            return json.loads(line)
+    raise ValueError(f"worker 출력에 JSON 이 없음: {output[-500:]}")
+
+
+def prepare_data(work_dir, seed):
+    """
+    base: 합성 CSV + SQLite / store: base 파일 링크 + 컬럼형 timetable store → 행 수
+    """
+    base = os.path.join(work_dir, "base")
+    rows = write_data_dir(
+        base, os.path.join(REPO_ROOT, "data", "line_orders.json"), os.path.join(REPO_ROOT, "data", "station.csv"), seed
+    )
+    store = os.path.join(work_dir, "store", "data")
+    os.makedirs(store, exist_ok=True)
+    for name in os.listdir(os.path.join(base, "data")):
+        target = os.path.join(store, name)
+        if not os.path.exists(target):
+            os.symlink(os.path.join(base, "data", name), target)
+    subprocess.run(
+        [sys.executable, "-m", "utils.timetable_store", "--db", os.path.join("data", "preprocessed_timetable.db")],
+        cwd=os.path.dirname(store), env=_env(), check=True, stdout=subprocess.DEVNULL,
+    )
+    return rows
+
+
+def profile_app(module, cwd, samples):
+    proc = subprocess.run(
+        [sys.executable, "-m", "bench.worker", "profile", module, "--samples", str(samples)],
+        cwd=cwd, env=_env(), capture_output=True, text=True, check=True,
+    )
+    return _last_json_line(proc.stdout)
+
+
+def _client_loop(port, next_time, deadline, latencies, errors):
+    while time.perf_counter() < deadline:
+        url = f"/api/simulation_data?time={format_time(next_time())}"
+        start = time.perf_counter()
+        try:
+            conn = http.client.HTTPConnection("127.0.0.1", port, timeout=60)
+            conn.request("GET", url)
+            response = conn.getresponse()
+            response.read()
+            conn.close()
+            if response.status != 200:
+                raise RuntimeError(response.status)
+        except Exception:
+            errors.append(1)
+            continue
+        latencies.append((time.perf_counter() - start) * 1000)
+
+
+def throughput(module, cwd, clients_list, duration):
+    """
+    스레드 서버 하나에 동시 클라이언트 N 명이 duration 초 동안 요청 → 시나리오별 req/s, 지연
+    """
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "bench.worker", "serve", module],
+        cwd=cwd, env=_env(), stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    try:
+        port = None
+        for line in proc.stdout:
+            if line.startswith("{"):
+                port = json.loads(line)["port"]
+                break
+        if port is None:
+            raise RuntimeError(f"{module} 서버 시작 실패")
+
+        results = {}
+        for scenario in ("distinct", "shared_tick"):
+            for n_clients in clients_list:
+                counter = iter(range(10 ** 9))
+                lock = threading.Lock()
+                began = time.perf_counter()
+
+                def next_time():
+                    if scenario == "shared_tick":
+                        return THROUGHPUT_START_SEC + int(time.perf_counter() - began)
+                    with lock:
+                        return THROUGHPUT_START_SEC + next(counter) * 3
+
+                latencies, errors = [], []
+                deadline = began + duration
+                threads = [
+                    threading.Thread(target=_client_loop, args=(port, next_time, deadline, latencies, errors))
+                    for _ in range(n_clients)
+                ]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+                elapsed = time.perf_counter() - began
+                entry = {"requests": len(latencies), "errors": len(errors),
+                         "req_per_sec": round(len(latencies) / elapsed, 2)}
+                if latencies:
+                    entry.update(summarize(latencies))
+                results.setdefault(scenario, {})[str(n_clients)] = entry
+        return results
+    finally:
+        proc.terminate()
+        proc.wait(timeout=30)
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="simulation_data 성능 벤치마크 (결과 JSON)")
+    parser.add_argument("--apps", default=DEFAULT_APPS, help=f"쉼표로 구분 ({', '.join(STRATEGIES)})")
+    parser.add_argument("--out", help="결과 JSON 파일 (없으면 stdout)")
+    parser.add_argument("--work-dir", help="합성 데이터 위치 (없으면 임시 디렉토리)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--samples", type=int, default=30, help="프레임 지연 측정 횟수")
+    parser.add_argument("--clients", default="1,8,32", help="동시 클라이언트 수 목록")
+    parser.add_argument("--duration", type=float, default=5.0, help="처리량 측정 시간 (초, 시나리오별)")
+    parser.add_argument("--skip-throughput", action="store_true")
+    args = parser.parse_args()
+
+    apps = [name.strip() for name in args.apps.split(",") if name.strip()]
+    unknown = [name for name in apps if name not in STRATEGIES]
+    if unknown:
+        parser.error(f"알 수 없는 앱: {', '.join(unknown)}")
+    clients_list = [int(n) for n in args.clients.split(",")]
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="subway_bench_")
+    start = time.perf_counter()
+    rows = prepare_data(work_dir, args.seed)
+    print(f"🧪 합성 시간표 {rows}행 ({time.perf_counter() - start:.1f}초) → {work_dir}", file=sys.stderr)
+
+    report = {
+        "meta": {
+            "git": git_revision(),
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "timetable_rows": rows,
+            "samples": args.samples,
+            "clients": clients_list,
+            "duration_sec": args.duration,
+        },
+        "apps": {},
+    }
+    for name in apps:
+        module, data_kind = STRATEGIES[name]
+        cwd = os.path.join(work_dir, data_kind)
+        print(f"⏱️ {name}", file=sys.stderr)
+        result = profile_app(module, cwd, args.samples)
+        if not args.skip_throughput:
+            result["throughput"] = throughput(module, cwd, clients_list, args.duration)
+        report["apps"][name] = result
+
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.out:
+        os.makedirs(os.path.dirname(os.path.abspath(args.out)), exist_ok=True)
+        with open(args.out, "w", encoding="utf-8") as f:
+            f.write(output + "\n")
+        print(f"📄 {args.out}", file=sys.stderr)
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
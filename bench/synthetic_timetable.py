@@ -0,0 +1,149 @@
+"""
+벤치마크용 하루치 합성 시간표 생성 (line_orders.json 노선 + station.csv 좌표 기반)
+
+    python -m bench.synthetic_timetable --out /tmp/bench_data
+
+- 노선마다 양 끝에서 05:30 ~ 24:00 사이 시간대별 배차 간격으로 열차 출발 (평일 출퇴근 시간은 촘촘하게)
+- 역 사이 운행 시간은 두 역 좌표 거리 / 평균 속도, 정차 시간은 20~40초 (출퇴근 시간 +10초)
+- 요일(WEEK_TAG 3/2/1), 방향(INOUT_TAG 1/2) 별로 모두 생성 → preprocessed_timetable.csv / .db 와 같은 컬럼
+- seed 가 같으면 항상 같은 시간표 (커밋 간 비교용)
+"""
+import argparse
+import json
+import math
+import os
+import random
+import shutil
+import sqlite3
+
+import pandas as pd
+
+from utils.simulation_utils import format_time
+from utils.station_registry import StationRegistry, line_number
+from utils.timetable_index import TIMETABLE_COLUMNS
+
+SERVICE_START_SEC = 5 * 3600 + 30 * 60
+SERVICE_END_SEC = 24 * 3600
+
+# 평균 운행 속도 (km/h) / 역 사이 최소 운행 시간 (초)
+AVERAGE_SPEED_KMH = 33.0
+MIN_RUN_SEC = 60
+
+# 평일 시간대별 배차 간격 (시작 시각(시), 간격(초)) - 토요일/공휴일은 배율을 곱함
+WEEKDAY_HEADWAYS = ((5.5, 480), (7.0, 180), (9.5, 360), (17.5, 210), (20.0, 480), (23.0, 720))
+WEEK_HEADWAY_SCALE = {"3": 1.0, "2": 1.3, "1": 1.5}
+# 지선(역 수가 적은 노선)은 배차 간격을 늘림
+BRANCH_STATIONS = 10
+BRANCH_HEADWAY_SCALE = 2.0
+
+
+def headway_at(t_sec, week):
+    hours = t_sec / 3600
+    headway = WEEKDAY_HEADWAYS[0][1]
+    for start, value in WEEKDAY_HEADWAYS:
+        if hours >= start:
+            headway = value
+    return headway * WEEK_HEADWAY_SCALE.get(week, 1.0)
+
+
+def is_rush(t_sec, week):
+    return week == "3" and (7 * 3600 <= t_sec < 9.5 * 3600 or 17.5 * 3600 <= t_sec < 20 * 3600)
+
+
+def _distance_km(a, b):
+    if a is None or b is None:
+        return None
+    lat1, lon1, lat2, lon2 = map(math.radians, (a[0], a[1], b[0], b[1]))
+    h = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 6371.0 * 2 * math.asin(math.sqrt(h))
+
+
+def generate(line_orders, df_station, seed=0, weeks=("3", "2", "1")):
+    """
+    합성 시간표 DataFrame (TIMETABLE_COLUMNS, 모든 값은 문자열)
+    """
+    rnd = random.Random(seed)
+    registry = StationRegistry.from_dataframe(df_station)
+    rows = []
+
+    for route_index, (route_name, stations) in enumerate(line_orders.items()):
+        line = line_number(route_name)
+        line_num = f"{line:02d}호선"
+        coords = [registry.get(name, line=line) for name in stations]
+        # 좌표를 못 찾은 구간은 2분으로 가정
+        run_sec = []
+        for a, b in zip(coords[:-1], coords[1:]):
+            km = _distance_km(a, b)
+            run_sec.append(max(MIN_RUN_SEC, round(km / AVERAGE_SPEED_KMH * 3600)) if km is not None else 120)
+        branch_scale = BRANCH_HEADWAY_SCALE if len(stations) <= BRANCH_STATIONS else 1.0
+
+        for week in weeks:
+            for inout in ("1", "2"):
+                order = list(range(len(stations))) if inout == "1" else list(range(len(stations)))[::-1]
+                t_start = SERVICE_START_SEC + rnd.randint(0, 120)
+                train = 0
+                while t_start < SERVICE_END_SEC:
+                    train += 1
+                    train_no = f"{line}{inout}{route_index:02d}{train:03d}"
+                    t = t_start
+                    for k, i in enumerate(order):
+                        dwell = rnd.randint(20, 40) + (10 if is_rush(t, week) else 0)
+                        depart = t + dwell
+                        if k + 1 < len(order):
+                            j = order[k + 1]
+                            run = run_sec[min(i, j)] + rnd.randint(-10, 10)
+                            next_station, next_arrive = stations[j], depart + run
+                        else:
+                            next_station, next_arrive = None, None
+                        rows.append((
+                            train_no, line_num, stations[i], format_time(t), format_time(depart),
+                            next_station, format_time(next_arrive) if next_arrive is not None else None,
+                            week, inout,
+                        ))
+                        if next_arrive is not None:
+                            t = next_arrive
+                    t_start += round(headway_at(t_start, week) * branch_scale)
+
+    return pd.DataFrame(rows, columns=TIMETABLE_COLUMNS)
+
+
+def write_data_dir(out_dir, line_orders_path, station_path, seed=0):
+    """
+    out_dir/data 에 station.csv, line_orders.json (복사) + preprocessed_timetable.csv / .db (합성) 생성
+    → 앱을 out_dir 에서 실행하면 그대로 읽힘. 시간표 행 수 반환
+    """
+    data_dir = os.path.join(out_dir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    shutil.copyfile(station_path, os.path.join(data_dir, "station.csv"))
+    shutil.copyfile(line_orders_path, os.path.join(data_dir, "line_orders.json"))
+
+    with open(line_orders_path, encoding="utf-8") as f:
+        line_orders = json.load(f)
+    df = generate(line_orders, pd.read_csv(station_path, encoding="utf-8"), seed=seed)
+
+    df.to_csv(os.path.join(data_dir, "preprocessed_timetable.csv"), index=False, encoding="utf-8-sig")
+    db_path = os.path.join(data_dir, "preprocessed_timetable.db")
+    if os.path.exists(db_path):
+        os.remove(db_path)
+    conn = sqlite3.connect(db_path)
+    try:
+        df.to_sql("preprocessed_timetable", conn, index=False)
+    finally:
+        conn.close()
+    return len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="벤치마크용 합성 시간표 생성")
+    parser.add_argument("--out", required=True, help="data/ 디렉토리를 만들 위치")
+    parser.add_argument("--lines", default=os.path.join("data", "line_orders.json"))
+    parser.add_argument("--stations", default=os.path.join("data", "station.csv"))
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rows = write_data_dir(args.out, args.lines, args.stations, args.seed)
+    print(f"🧪 합성 시간표 {rows}행 → {os.path.join(args.out, 'data')}")
+
+
+if __name__ == "__main__":
+    main()
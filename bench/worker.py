@@ -0,0 +1,185 @@
+"""
+벤치마크 대상 앱 하나를 별도 프로세스에서 측정 (bench.run 이 data/ 가 있는 디렉토리에서 실행)
+
+    python -m bench.worker profile app_ver_4 --samples 30
+    python -m bench.worker serve app_ver_4
+
+- profile: import(= 데이터 로딩) 시간과 메모리, 응답 크기, 피크/비피크 프레임 지연을 JSON 한 줄로 출력
+- serve: werkzeug 스레드 서버를 빈 포트로 띄우고 {"port": ...} 를 출력한 뒤 계속 실행
+"""
+import argparse
+import gzip
+import importlib
+import json
+import resource
+import statistics
+import sys
+import threading
+import time
+
+from utils.simulation_utils import format_time, parse_time_to_seconds
+
+# 측정 시각 (피크: 평일 출근 시간, 비피크: 낮)
+FRAME_TIMES = {"peak": "08:15:00", "offpeak": "14:00:00"}
+# 같은 프레임을 반복 계산하지 않도록 샘플마다 시각을 이만큼 옮김 (초)
+SAMPLE_STEP_SEC = 7
+
+
+def _proc_status_mb(field):
+    """
+    /proc/self/status 의 kB 항목 → MB (없으면 None)
+    """
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith(field + ":"):
+                    return int(line.split()[1]) / 1e3
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def rss_mb():
+    """
+    현재 RSS (MB) - /proc 가 없으면 최대 RSS
+    """
+    value = _proc_status_mb("VmRSS")
+    return value if value is not None else peak_rss_mb()
+
+
+def peak_rss_mb():
+    """
+    최대 RSS (MB) - Linux 의 ru_maxrss 는 exec 전 부모 프로세스 값을 이어받으므로 VmHWM 우선
+    """
+    value = _proc_status_mb("VmHWM")
+    if value is not None:
+        return value
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 1e6 if sys.platform == "darwin" else peak / 1e3
+
+
+def summarize(samples_ms):
+    ordered = sorted(samples_ms)
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered), 3),
+        "p50_ms": round(ordered[len(ordered) // 2], 3),
+        "p95_ms": round(ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))], 3),
+        "max_ms": round(ordered[-1], 3),
+    }
+
+
+def _start_server_hooks(module):
+    """
+    서버 진입점이 하는 준비 작업 (app_ver_4 는 캐시 예열 스레드) 을 똑같이 시작 - 없는 버전은 그대로
+    """
+    start_warmer = getattr(module, "start_frame_cache_warmer", None)
+    if start_warmer is not None:
+        start_warmer()
+
+
+def _wait_background_threads(timeout=120):
+    """
+    서버 준비 때 시작한 백그라운드 작업(캐시 예열 등)이 끝날 때까지 대기 - 지연 측정에 섞이지 않게
+    """
+    deadline = time.monotonic() + timeout
+    for thread in threading.enumerate():
+        if thread is not threading.main_thread():
+            thread.join(max(0.0, deadline - time.monotonic()))
+
+
+def _get(client, url, headers=None):
+    start = time.perf_counter()
+    response = client.get(url, headers=headers or {})
+    elapsed = (time.perf_counter() - start) * 1000
+    if response.status_code != 200:
+        raise RuntimeError(f"{url} → {response.status_code}")
+    return elapsed, response.data
+
+
+def frame_latency(client, time_str, samples, fmt=None):
+    """
+    time_str 부터 SAMPLE_STEP_SEC 씩 옮겨가며 매번 새 프레임을 계산할 때의 지연 + 같은 프레임 반복(캐시) 지연
+    """
+    t0 = parse_time_to_seconds(time_str)
+    suffix = "&format=bin" if fmt == "bin" else ""
+    cold, trains = [], []
+    for i in range(samples):
+        elapsed, body = _get(client, f"/api/simulation_data?time={format_time(t0 + i * SAMPLE_STEP_SEC)}{suffix}")
+        cold.append(elapsed)
+        if fmt != "bin":
+            trains.append(len(json.loads(body)))
+    warm = [_get(client, f"/api/simulation_data?time={time_str}{suffix}")[0] for _ in range(samples)]
+    result = {"cold": summarize(cold), "repeat": summarize(warm)}
+    if trains:
+        result["trains_mean"] = round(statistics.fmean(trains), 1)
+    return result
+
+
+def payload_sizes(client, formats):
+    sizes = {}
+    for name, url in (("stations", "/api/stations"), ("lines", "/api/lines")):
+        body = _get(client, url)[1]
+        sizes[name] = {"bytes": len(body), "gzip_bytes": len(gzip.compress(body))}
+    for fmt in formats:
+        suffix = "&format=bin" if fmt == "bin" else ""
+        body = _get(client, f"/api/simulation_data?time={FRAME_TIMES['peak']}{suffix}")[1]
+        sizes[f"frame_{fmt}"] = {"bytes": len(body), "gzip_bytes": len(gzip.compress(body))}
+    return sizes
+
+
+def profile(module_name, samples):
+    rss_before = rss_mb()
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    startup_sec = time.perf_counter() - start
+    result = {
+        "startup": {
+            "import_sec": round(startup_sec, 3),
+            "rss_mb": round(rss_mb(), 1),
+            "rss_delta_mb": round(rss_mb() - rss_before, 1),
+            "peak_rss_mb": round(peak_rss_mb(), 1),
+        }
+    }
+    _start_server_hooks(module)
+    _wait_background_threads()
+
+    client = module.app.test_client()
+    formats = ["json"]
+    if "/api/frame_dictionary" in {rule.rule for rule in module.app.url_map.iter_rules()}:
+        formats.append("bin")
+    result["payload"] = payload_sizes(client, formats)
+    result["latency"] = {
+        label: {fmt: frame_latency(client, time_str, samples, fmt) for fmt in formats}
+        for label, time_str in FRAME_TIMES.items()
+    }
+    result["peak_rss_mb_after"] = round(peak_rss_mb(), 1)
+    return result
+
+
+def serve(module_name):
+    from werkzeug.serving import make_server
+
+    module = importlib.import_module(module_name)
+    _start_server_hooks(module)
+    _wait_background_threads()
+    server = make_server("127.0.0.1", 0, module.app, threaded=True)
+    print(json.dumps({"port": server.server_port}), flush=True)
+    server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="벤치마크 대상 앱 측정 (bench.run 에서 실행)")
+    parser.add_argument("mode", choices=["profile", "serve"])
+    parser.add_argument("module")
+    parser.add_argument("--samples", type=int, default=30)
+    args = parser.parse_args()
+
+    if args.mode == "serve":
+        serve(args.module)
+        return
+    print(json.dumps(profile(args.module, args.samples)), flush=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+"""
+app_ver_4 멀티 프로세스 서빙 모드 (POSIX, 코어 하나에 worker 하나)
+
+    python serve_ver_4.py --workers 4 --port 10000 --watch
+
+- master: 시간표 store 세대를 준비하고 (없거나 원본 DB 가 더 새로우면 python -m utils.shared_timetable 로 새 세대 발행),
+  listening socket 하나를 연 뒤 worker 를 fork - 연결은 커널이 worker 사이에 나눠줌
+- worker: fork 후에 app_ver_4 를 import → CURRENT 세대를 읽기 전용 mmap 으로 열어서 사용
+  시간표/역 좌표 배열은 worker 수와 상관없이 OS 페이지 캐시에 한 벌 (numpy/pandas/flask 모듈도 master 에서 미리 import 해서 공유)
+  시간표로부터 만드는 파생 배열(PositionEngine, DelayNetwork 등)도 처음 만든 worker 가 세대 디렉토리(derived/)에 저장하고
+  나머지 worker 는 mmap 으로 열기만 함 (utils/derived_arrays.py) - 프레임/시나리오 캐시만 worker 마다 따로 가짐
+- 무중단 교체: SIGHUP (또는 --watch 로 원본 DB / CURRENT 변경 감지) → 필요하면 새 세대 발행 →
+  worker 를 하나씩 새로 띄워서 준비되면 (새 세대를 연 뒤) 이전 worker 를 종료
+  항상 accept 하는 worker 가 남아 있으므로 요청이 끊기지 않고, worker 하나는 처음 연 세대 하나만 봄
+- 종료되는 worker 는 새 연결을 받지 않고, 처리 중인 요청을 WORKER_GRACE_SEC 까지 기다린 뒤 끝냄
+  (SSE 스트림은 끊기고 EventSource 가 다른 worker 로 다시 연결)
+- worker 가 비정상 종료하면 master 가 다시 띄움
+- worker 마다 따로 가지는 상태 (여러 worker 로 돌릴 때 주의)
+  서버 시뮬레이션(/api/simulation/*)은 만든 worker 에만 있으므로 같은 worker 로 붙는 sticky 라우팅이 필요함
+  /api/profiler 와 /metrics 도 요청을 받은 worker 하나의 값만 보여줌 (전체를 보려면 worker 마다 따로 모아야 함)
+- 날씨 지역 id 는 날씨 강도 + 영역을 담고 있어서 (utils/spatial_index.py) 등록하지 않은 worker 도 id 만으로 같은 지역을
+  다시 계산함 - 프레임/구간/도착 API 는 어느 worker 가 받아도 같은 응답
+"""
+import argparse
+import importlib
+import os
+import select
+import signal
+import socket
+import subprocess
+import sys
+import threading
+import time
+import traceback
+
+from utils.shared_timetable import current_generation, generation_meta
+from utils.static_payload import SOURCE_CHECK_SEC
+
+# worker 가 import 하는 무거운 모듈 - master 에서 미리 올려두면 fork 한 worker 들이 같은 메모리를 씀
+PRELOAD_MODULES = ("numpy", "pandas", "flask", "werkzeug.serving")
+
+# worker 가 준비(app_ver_4 import + 세대 attach)될 때까지 기다리는 최대 시간 (초)
+WORKER_START_TIMEOUT_SEC = 120
+# 종료 신호를 받은 worker 가 처리 중인 요청을 기다리는 최대 시간 (초)
+WORKER_GRACE_SEC = 10
+# master 루프 간격 (초)
+MASTER_TICK_SEC = 0.5
+LISTEN_BACKLOG = 1024
+
+
+class _InflightCounter:
+    """
+    처리 중인 요청 수 (응답 본문을 다 보내거나 닫을 때까지를 한 요청으로 셈)
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _done(self):
+        with self._lock:
+            self.count -= 1
+
+    def __call__(self, environ, start_response):
+        from werkzeug.wsgi import ClosingIterator
+
+        with self._lock:
+            self.count += 1
+        try:
+            body = self.app(environ, start_response)
+        except BaseException:
+            self._done()
+            raise
+        return ClosingIterator(body, [self._done])
+
+
+def run_worker(sock, ready_fd, host, port, root):
+    """
+    fork 된 worker 본체 - app_ver_4 를 import 하고 master 의 socket 에서 요청 처리 (반환하지 않음)
+    """
+    signal.signal(signal.SIGHUP, signal.SIG_IGN)
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    stopping = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopping.set())
+
+    os.environ["TIMETABLE_STORE"] = root
+    from werkzeug.serving import make_server
+
+    import app_ver_4 as web
+
+    web.start_frame_cache_warmer()
+    app = _InflightCounter(web.app)
+    server = make_server(host, port, app, threaded=True, fd=sock.fileno())
+    sock.close()
+    os.write(ready_fd, (web.timetable_generation or "").encode("utf-8") + b"\n")
+    os.close(ready_fd)
+
+    serving = threading.Thread(target=server.serve_forever, kwargs={"poll_interval": MASTER_TICK_SEC}, daemon=True)
+    serving.start()
+    stopping.wait()
+    server.shutdown()
+    deadline = time.monotonic() + WORKER_GRACE_SEC
+    while app.count > 0 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    server.server_close()
+    os._exit(0)
+
+
+class Master:
+    """
+    listening socket + worker 프로세스 관리 (fork, 재시작, 세대 교체)
+    """
+
+    def __init__(self, sock, host, port, n_workers, source, stations, root, watch=False):
+        self.sock = sock
+        self.host = host
+        self.port = port
+        self.n_workers = n_workers
+        self.source = source
+        self.stations = stations
+        self.root = root
+        self.watch = watch
+        # worker pid → 그 worker 가 연 세대 이름 ("" 이면 세대 방식 store 가 아님)
+        self.workers = {}
+        # 마지막으로 worker 를 맞춘 CURRENT 세대 (--watch 는 이 값이 바뀌었을 때만 교체)
+        self.generation = None
+        # 발행에 실패한 원본 수정 시각 (원본이 다시 바뀔 때까지 재시도하지 않음)
+        self.failed_mtime = None
+        self.reload_requested = False
+        self.stopping = False
+
+    # --- 세대 ---
+
+    def needs_publish(self):
+        """
+        원본이 있고, 발행한 세대가 없거나 원본이 그 뒤에 바뀌었으면 True
+        """
+        if not self.source or not os.path.exists(self.source):
+            return False
+        mtime = os.path.getmtime(self.source)
+        if mtime == self.failed_mtime:
+            return False
+        meta = generation_meta(self.root)
+        return meta is None or (meta.get("source_mtime") or 0) < mtime
+
+    def publish(self):
+        """
+        새 세대 발행 (별도 프로세스에서 빌드 - master 메모리에 빌드 중간 결과가 남지 않음)
+        """
+        source_arg = "--db" if self.source.endswith(".db") else "--csv"
+        command = [sys.executable, "-m", "utils.shared_timetable", source_arg, self.source,
+                   "--stations", self.stations, "--root", self.root]
+        print(f"🔨 새 시간표 세대 발행: {self.source}", flush=True)
+        mtime = os.path.getmtime(self.source)
+        if subprocess.run(command).returncode != 0:
+            self.failed_mtime = mtime
+            return False
+        return True
+
+    def stale_workers(self):
+        """
+        CURRENT 와 다른 세대를 쓰는 worker pid 목록
+        """
+        current = current_generation(self.root) or ""
+        return [pid for pid, generation in self.workers.items() if generation != current]
+
+    # --- worker ---
+
+    def spawn(self):
+        """
+        worker 하나를 띄우고 준비될 때까지 기다림 → pid (준비되지 못하면 None)
+        """
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            try:
+                run_worker(self.sock, write_fd, self.host, self.port, self.root)
+            except BaseException:
+                traceback.print_exc()
+            finally:
+                os._exit(1)
+        os.close(write_fd)
+        generation = None
+        try:
+            ready, _, _ = select.select([read_fd], [], [], WORKER_START_TIMEOUT_SEC)
+            if ready:
+                line = os.read(read_fd, 1024)
+                if line.endswith(b"\n"):
+                    generation = line.decode("utf-8").strip()
+        finally:
+            os.close(read_fd)
+        if generation is None:
+            self.stop_worker(pid, signal.SIGKILL)
+            return None
+        self.workers[pid] = generation
+        print(f"👷 worker {pid} 준비 (세대 {generation or '-'})", flush=True)
+        return pid
+
+    def stop_worker(self, pid, signum=signal.SIGTERM):
+        """
+        worker 종료 후 회수 (WORKER_GRACE_SEC 안에 끝나지 않으면 SIGKILL)
+        """
+        self.workers.pop(pid, None)
+        try:
+            os.kill(pid, signum)
+        except ProcessLookupError:
+            pass
+        deadline = time.monotonic() + WORKER_GRACE_SEC + 5
+        while True:
+            try:
+                done, _ = os.waitpid(pid, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if done:
+                return
+            if time.monotonic() > deadline:
+                os.kill(pid, signal.SIGKILL)
+                os.waitpid(pid, 0)
+                return
+            time.sleep(0.05)
+
+    def reap(self):
+        """
+        비정상 종료한 worker 회수 후 다시 띄움
+        """
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            if self.workers.pop(pid, None) is not None and not self.stopping:
+                print(f"⚠️ worker {pid} 종료 (status {status}) - 다시 띄움", flush=True)
+                self.spawn()
+
+    def roll(self):
+        """
+        이전 세대 worker 를 하나씩 교체 (새 worker 가 준비된 뒤에 이전 worker 종료)
+        """
+        self.generation = current_generation(self.root)
+        for old_pid in self.stale_workers():
+            if self.stopping:
+                return
+            if self.spawn() is None:
+                print("⚠️ 새 worker 가 준비되지 못함 - 교체 중단, 이전 worker 유지", flush=True)
+                return
+            self.stop_worker(old_pid)
+        print(f"🔁 worker 교체 완료 (세대 {self.generation or '-'})", flush=True)
+
+    def reload(self):
+        if self.needs_publish() and not self.publish():
+            print("⚠️ 세대 발행 실패 - 현재 세대 유지", flush=True)
+            return
+        self.roll()
+
+    # --- 실행 ---
+
+    def _request_reload(self, signum, frame):
+        self.reload_requested = True
+
+    def _request_stop(self, signum, frame):
+        self.stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGHUP, self._request_reload)
+        signal.signal(signal.SIGTERM, self._request_stop)
+        signal.signal(signal.SIGINT, self._request_stop)
+
+        if self.needs_publish():
+            self.publish()
+        self.generation = current_generation(self.root)
+        for _ in range(self.n_workers):
+            if self.spawn() is None:
+                print("❌ worker 를 띄우지 못함", file=sys.stderr, flush=True)
+                self.stopping = True
+                break
+        else:
+            print(f"🚇 http://{self.host}:{self.port} worker {self.n_workers}개", flush=True)
+
+        last_check = time.monotonic()
+        while not self.stopping:
+            time.sleep(MASTER_TICK_SEC)
+            self.reap()
+            if self.watch and time.monotonic() - last_check >= SOURCE_CHECK_SEC:
+                last_check = time.monotonic()
+                self.reload_requested |= self.needs_publish() or current_generation(self.root) != self.generation
+            if self.reload_requested:
+                self.reload_requested = False
+                self.reload()
+
+        # 모두에게 먼저 알리고 (동시에 마무리) 하나씩 회수
+        for pid in list(self.workers):
+            os.kill(pid, signal.SIGTERM)
+        for pid in list(self.workers):
+            self.stop_worker(pid)
+        self.sock.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="app_ver_4 를 여러 worker 프로세스로 서빙 (시간표 store 공유)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=10000)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("WORKERS", os.cpu_count() or 1)))
+    parser.add_argument("--db", default=os.path.join("data", "preprocessed_timetable.db"),
+                        help="세대를 발행할 원본 (.db 가 아니면 CSV 로 읽음)")
+    parser.add_argument("--stations", default=os.path.join("data", "station.csv"))
+    parser.add_argument("--root", default=os.path.join("data", "timetable_store"))
+    parser.add_argument("--watch", action="store_true", help="원본 DB / CURRENT 가 바뀌면 자동으로 worker 교체")
+    args = parser.parse_args()
+    if not hasattr(os, "fork"):
+        parser.error("fork 를 지원하는 OS 에서만 사용 가능 (Windows 는 app_ver_4.py / asgi_ver_4.py 사용)")
+
+    for name in PRELOAD_MODULES:
+        importlib.import_module(name)
+    sock = socket.create_server((args.host, args.port), backlog=LISTEN_BACKLOG)
+    Master(sock, args.host, args.port, max(args.workers, 1), args.db, args.stations, args.root, args.watch).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,14 +13,14 @@ const map = L.map('map').setView([37.5665, 126.9780], 11);
 L.tileLayer('https://{s}.tile.openstreetmap.org/{z}/{x}/{y}.png', { maxZoom: 18 }).addTo(map);
 
 let stationMarkers = {};
-let trainMarkers = {};
-let trainStatusMap = {};  // 이전 상태 저장
-let delayMap = {};        // 누적 지연 저장
-let simInterval = null;
-let currentSimTimeSec = 9 * 3600;
+let simId = null;         // 서버 시뮬레이션 id (?sim=<id> 로 다른 뷰어가 같은 실행을 봄)
+let simStream = null;     // 공유 실행 프레임 구독 (SSE)
+let trainState = {};      // keyframe + delta 로 복원한 열차 상태 (공유 실행 보기)
+let currentSimTimeSec = 9 * 3600;  // 로컬 재생 중에는 소수 초까지 진행
 let speedMultiplier = 1;
-let congestedStations = new Set();
-let weatherLevel = "none";
+let weatherRegions = [];   // 서버에 등록한 날씨 지역 { id, since } (since: 재생 중에 그린 시각, 재생 전이면 null = 하루 전체)
+let congestionSince = null;  // 자동 혼잡도를 켠 시각 (재생 전에 켰으면 null = 하루 전체)
+let weatherLevel = "none";   // 다음에 그릴 지역의 날씨 강도
 
 const timeLabel = document.getElementById("timeLabel");
 const speedSelect = document.getElementById("speed-select");
@@ -30,24 +30,146 @@ const directionSelect = document.getElementById("direction-select");
 const weekdaySelect = document.getElementById("weekday-select");
 const lineSelect = document.getElementById("line-select");
 const weatherSelect = document.getElementById("weather-select");
+const congestionToggle = document.getElementById("congestion-toggle");
 
 function secondsToTimeString(seconds) {
+  seconds = Math.floor(seconds);
   const h = String(Math.floor(seconds / 3600)).padStart(2, "0");
   const m = String(Math.floor((seconds % 3600) / 60)).padStart(2, "0");
   const s = String(seconds % 60).padStart(2, "0");
   return `${h}:${m}:${s}`;
 }
 
-function animateMove(marker, fromLatLng, toLatLng, duration = 1000) {
-  const start = performance.now();
-  function step(timestamp) {
-    const progress = Math.min((timestamp - start) / duration, 1);
-    const lat = fromLatLng.lat + (toLatLng.lat - fromLatLng.lat) * progress;
-    const lng = fromLatLng.lng + (toLatLng.lng - fromLatLng.lng) * progress;
-    marker.setLatLng([lat, lng]);
-    if (progress < 1) requestAnimationFrame(step);
+function trainColor(line) {
+  return lineColors[`${parseInt(line)}호선`] || 'gray';
+}
+
+function trainPopupText(train) {
+  return `
+      🚆 ${parseInt(train.line)}호선<br>
+      열차번호: ${train.train_no}<br>
+      다음역: ${train.to}<br>
+      ⏱️ 누적 지연: ${parseInt(train.total_delay || 0)}초
+    `;
+}
+
+// 🎨 열차는 canvas 하나에 한 번에 그림 (열차마다 marker/DOM 을 만들지 않음)
+// 클릭/hover 는 그린 위치 목록에서 가장 가까운 열차를 찾아서 처리 (hit-test)
+const TRAIN_RADIUS_PX = 6;
+const TRAIN_HIT_PX = TRAIN_RADIUS_PX + 3;
+
+const TrainCanvasLayer = L.Layer.extend({
+  onAdd(map) {
+    this._canvas = L.DomUtil.create("canvas", "leaflet-zoom-hide");
+    this._canvas.style.pointerEvents = "none";
+    map.getPanes().overlayPane.appendChild(this._canvas);
+    this._trains = [];
+    this._points = [];
+    map.on("moveend zoomend resize viewreset", this._reset, this);
+    this._reset();
+  },
+
+  onRemove(map) {
+    L.DomUtil.remove(this._canvas);
+    map.off("moveend zoomend resize viewreset", this._reset, this);
+  },
+
+  // 지도를 옮기거나 확대하면 canvas 를 화면 크기/위치에 다시 맞춤
+  _reset() {
+    const size = this._map.getSize();
+    const ratio = window.devicePixelRatio || 1;
+    this._topLeft = this._map.containerPointToLayerPoint([0, 0]);
+    L.DomUtil.setPosition(this._canvas, this._topLeft);
+    this._canvas.width = size.x * ratio;
+    this._canvas.height = size.y * ratio;
+    this._canvas.style.width = `${size.x}px`;
+    this._canvas.style.height = `${size.y}px`;
+    this._ratio = ratio;
+    this.redraw();
+  },
+
+  // trains: [{ lat, lon, line, train_no, to, total_delay }, ...]
+  setTrains(trains) {
+    this._trains = trains;
+    this.redraw();
+  },
+
+  redraw() {
+    if (!this._map) return;
+    const ctx = this._canvas.getContext("2d");
+    ctx.setTransform(this._ratio, 0, 0, this._ratio, 0, 0);
+    ctx.clearRect(0, 0, this._canvas.width, this._canvas.height);
+    ctx.lineWidth = 1.5;
+    ctx.strokeStyle = "white";
+
+    // 색이 같은 열차끼리 한 path 로 채움
+    const byColor = {};
+    this._points = [];
+    this._trains.forEach(train => {
+      const p = this._map.latLngToLayerPoint([train.lat, train.lon]).subtract(this._topLeft);
+      this._points.push({ x: p.x, y: p.y, train });
+      const color = trainColor(train.line);
+      (byColor[color] = byColor[color] || []).push(p);
+    });
+    for (const [color, points] of Object.entries(byColor)) {
+      ctx.beginPath();
+      points.forEach(p => {
+        ctx.moveTo(p.x + TRAIN_RADIUS_PX, p.y);
+        ctx.arc(p.x, p.y, TRAIN_RADIUS_PX, 0, 2 * Math.PI);
+      });
+      ctx.fillStyle = color;
+      ctx.fill();
+      ctx.stroke();
+    }
+  },
+
+  // 화면 좌표(containerPoint) 근처에 그린 열차 (없으면 null)
+  trainAt(containerPoint) {
+    const offset = this._map.containerPointToLayerPoint(containerPoint).subtract(this._topLeft);
+    let best = null;
+    let bestDist = TRAIN_HIT_PX * TRAIN_HIT_PX;
+    this._points.forEach(p => {
+      const dist = (p.x - offset.x) ** 2 + (p.y - offset.y) ** 2;
+      if (dist <= bestDist) {
+        best = p.train;
+        bestDist = dist;
+      }
+    });
+    return best;
   }
-  requestAnimationFrame(step);
+});
+
+const trainLayer = new TrainCanvasLayer().addTo(map);
+const trainPopup = L.popup({ autoPan: false });
+let selectedTrainKey = null;  // 팝업을 연 열차 trainKey() (그릴 때마다 위치/내용 갱신)
+
+map.on("click", (e) => {
+  if (e.originalEvent.shiftKey) return;
+  const train = trainLayer.trainAt(e.containerPoint);
+  if (!train) return;
+  selectedTrainKey = trainKey(train);
+  trainPopup.setLatLng([train.lat, train.lon]).setContent(trainPopupText(train)).openOn(map);
+});
+
+map.on("popupclose", (e) => {
+  if (e.popup === trainPopup) selectedTrainKey = null;
+});
+
+map.on("mousemove", (e) => {
+  map.getContainer().style.cursor = trainLayer.trainAt(e.containerPoint) ? "pointer" : "";
+});
+
+function updateTrains(trains) {
+  trainLayer.setTrains(trains);
+  if (selectedTrainKey === null) return;
+  const train = trains.find(t => trainKey(t) === selectedTrainKey);
+  if (!train) {
+    map.closePopup(trainPopup);
+    return;
+  }
+  trainPopup.setLatLng([train.lat, train.lon]);
+  const text = trainPopupText(train);
+  if (trainPopup.getContent() !== text) trainPopup.setContent(text);
 }
 
 fetch('/api/stations')
@@ -83,115 +205,381 @@ fetch('/api/stations')
       });
   });
 
-startBtn.addEventListener("click", () => {
-  if (simInterval) clearInterval(simInterval);
-  simInterval = setInterval(() => {
-    currentSimTimeSec += speedMultiplier;
+// ✅ 바이너리 프레임 (application/x-subway-frame) 디코더
+const BINARY_MIMETYPE = "application/x-subway-frame";
+const STATUS_NAMES = ["stopped", "moving", "terminal"];
+const FRAME_HEADER_BYTES = 20;
+const FRAME_RECORD_BYTES = 28;
+let frameDictionary = null;  // id → 역/열차/호선 이름 (한 번만 받아둠)
+
+function loadFrameDictionary() {
+  if (frameDictionary) return Promise.resolve(frameDictionary);
+  return fetch('/api/frame_dictionary')
+    .then(res => res.json())
+    .then(dictionary => (frameDictionary = dictionary));
+}
+
+function decodeFrame(buffer) {
+  const header = new DataView(buffer, 0, FRAME_HEADER_BYTES);
+  const timeSec = header.getInt32(8, true);
+  const count = header.getUint32(12, true);
+  const dictVersion = header.getUint32(16, true);
+
+  // 서버 사전이 바뀌었으면 다시 받고 디코딩
+  if (dictVersion !== frameDictionary.version) {
+    frameDictionary = null;
+    return loadFrameDictionary().then(() => decodeFrame(buffer));
+  }
+
+  const words = FRAME_RECORD_BYTES / 4;
+  const u32 = new Uint32Array(buffer, FRAME_HEADER_BYTES, count * words);
+  const i32 = new Int32Array(buffer, FRAME_HEADER_BYTES, count * words);
+  const u16 = new Uint16Array(buffer, FRAME_HEADER_BYTES, count * words * 2);
+  const u8 = new Uint8Array(buffer, FRAME_HEADER_BYTES, count * FRAME_RECORD_BYTES);
+  const { stations, trains: trainNames, lines } = frameDictionary;
+
+  const trains = [];
+  for (let i = 0; i < count; i++) {
+    const w = i * words;
+    const h = w * 2;
+    const b = i * FRAME_RECORD_BYTES;
+    trains.push({
+      train_no: trainNames[u32[w]],
+      lat: i32[w + 1] / 1e6,
+      lon: i32[w + 2] / 1e6,
+      total_delay: u32[w + 3],
+      from: stations[u16[h + 8]],
+      to: stations[u16[h + 9]],
+      progress: u16[h + 10] / 65535,
+      delay: u16[h + 11],
+      line: lines[u8[b + 24]],
+      status: STATUS_NAMES[u8[b + 25]]
+    });
+  }
+  return Promise.resolve({ time_sec: timeSec, trains });
+}
+
+function fetchBinaryFrame(url) {
+  return loadFrameDictionary()
+    .then(() => fetch(url, { headers: { Accept: BINARY_MIMETYPE } }))
+    .then(res => res.arrayBuffer())
+    .then(decodeFrame);
+}
+
+function postJSON(url, body) {
+  return fetch(url, {
+    method: "POST",
+    headers: { "Content-Type": "application/json" },
+    body: JSON.stringify(body)
+  }).then(res => res.json());
+}
+
+function simulationSettings() {
+  return {
+    time: secondsToTimeString(currentSimTimeSec),
+    weekday: weekdaySelect.value,
+    direction: directionSelect.value,
+    line: lineSelect.value,
+    speed: speedMultiplier,
+    regions: weatherRegionIds(),
+    congestion: congestionMode(),
+    running: true
+  };
+}
+
+function weatherRegionIds() {
+  return weatherRegions.map(region => region.id);
+}
+
+// 재생 중에 바꾼 지연은 그 시각부터 적용 (서버 실행과 같은 결과)
+function appliedSince() {
+  return playing ? Math.floor(currentSimTimeSec) : null;
+}
+
+function sinceString(since) {
+  return since === null ? "" : secondsToTimeString(since);
+}
+
+function congestionMode() {
+  return congestionToggle.checked ? "auto" : "none";
+}
+
+function sendControl(body) {
+  if (simId) postJSON(`/api/simulation/${simId}/control`, body);
+}
+
+function renderFrame(data) {
+  currentSimTimeSec = data.time_sec;
+  timeLabel.innerText = secondsToTimeString(currentSimTimeSec);
+  updateTrains(data.trains);
+}
+
+// 열차번호는 호선마다 따로 매기므로 호선까지 합쳐서 key (서버 frame_stream.train_key 와 같은 형식)
+function trainKey(train) {
+  return `${train.train_no}_${train.line}`;
+}
+
+// keyframe 이면 전체 교체, delta 면 추가/변경/삭제만 반영
+function applyFrameMessage(msg) {
+  if (msg.type === "key") {
+    trainState = {};
+    msg.trains.forEach(train => { trainState[trainKey(train)] = train; });
+  } else {
+    msg.added.forEach(train => { trainState[trainKey(train)] = train; });
+    msg.updated.forEach(train => {
+      trainState[trainKey(train)] = { ...trainState[trainKey(train)], ...train };
+    });
+    msg.removed.forEach(key => { delete trainState[key]; });
+  }
+  renderFrame({ time_sec: msg.time_sec, trains: Object.values(trainState) });
+}
+
+function startStream() {
+  if (simStream) simStream.close();
+  simStream = new EventSource(`/api/simulation/${simId}/stream`);
+  simStream.onmessage = (e) => applyFrameMessage(JSON.parse(e.data));
+  simStream.addEventListener("end", () => {
+    simStream.close();
+    simStream = null;
+  });
+}
+
+// 🎞️ 로컬 재생: 서버에서 구간 keyframe (도착/출발/다음역 도착 시각 + 선로 형상) 을 시간 창 단위로 받아두고
+// requestAnimationFrame 마다 위치를 직접 보간 → 서버 요청은 창 끝(구간 경계)에 가까워질 때만
+const SEGMENT_WINDOWS = [120, 600, 1800];  // 한 번에 받는 시뮬레이션 시간 (초, 서버 캐시가 맞도록 창 단위로 정렬)
+const WINDOW_REAL_SEC = 10;                // 배속과 관계없이 창 하나가 실제 시간으로 최소 이만큼 재생되도록
+let trackPaths = null;          // 형상 id → [위도, 경도, 누적 비율, ...] (/api/track_geometry, 한 번만 받음)
+let segments = new Map();       // 구간 id → keyframe
+let loadedUntil = null;         // 받아둔 keyframe 이 덮는 마지막 시각
+let segmentFetching = false;
+let segmentGeneration = 0;      // 설정이 바뀌면 증가 → 이전 요청 결과는 버림
+let playing = false;
+let lastTick = null;
+let lastPrune = 0;
+
+function segmentWindowSec() {
+  return SEGMENT_WINDOWS.find(w => w >= speedMultiplier * WINDOW_REAL_SEC) || SEGMENT_WINDOWS[SEGMENT_WINDOWS.length - 1];
+}
+
+function loadTrackPaths() {
+  if (trackPaths) return Promise.resolve(trackPaths);
+  return fetch('/api/track_geometry')
+    .then(res => res.json())
+    .then(geometry => (trackPaths = geometry.paths));
+}
+
+function segmentsUrl(start, end) {
+  const params = new URLSearchParams({
+    start: secondsToTimeString(start),
+    end: secondsToTimeString(end),
+    weekday: weekdaySelect.value,
+    direction: directionSelect.value,
+    line: lineSelect.value,
+    regions: weatherRegionIds().join(","),
+    since: weatherRegions.map(region => sinceString(region.since)).join(","),
+    congestion: congestionMode(),
+    congestion_since: sinceString(congestionSince)
+  });
+  return `/api/segments?${params}`;
+}
+
+// t 가 들어 있는 창 [창 시작, 창 끝] 을 받아서 구간 목록에 합침 (이미 받은 구간은 id 로 건너뜀)
+function fetchSegments(t) {
+  const windowSec = segmentWindowSec();
+  const start = Math.floor(t / windowSec) * windowSec;
+  const end = start + windowSec;
+  const generation = segmentGeneration;
+  segmentFetching = true;
+  return Promise.all([loadFrameDictionary(), loadTrackPaths()])
+    .then(() => fetch(segmentsUrl(start, end)))
+    .then(res => res.json())
+    .then(data => {
+      if (generation !== segmentGeneration) return;
+      if (data.dict_version !== frameDictionary.version) {
+        // 서버 시간표가 바뀌었으면 사전/형상부터 다시 받음
+        frameDictionary = null;
+        trackPaths = null;
+        return;
+      }
+      const cols = data.segments;
+      for (let i = 0; i < cols.id.length; i++) {
+        if (segments.has(cols.id[i])) continue;
+        segments.set(cols.id[i], {
+          train: cols.train[i],
+          line: cols.line[i],
+          from: cols.from[i],
+          to: cols.to[i],
+          geom: cols.geom[i],
+          arrive: cols.arrive[i],
+          depart: cols.depart[i],
+          nextArrive: cols.next_arrive[i],
+          delay: cols.delay[i]
+        });
+      }
+      loadedUntil = Math.max(loadedUntil ?? end, end);
+    })
+    // 실패하면 1초 뒤에 다시 시도 (그동안은 받는 중으로 둠)
+    .catch(() => new Promise(resolve => setTimeout(resolve, 1000)))
+    .finally(() => {
+      if (generation === segmentGeneration) segmentFetching = false;
+    });
+}
+
+function resetSegments() {
+  segmentGeneration++;
+  segments = new Map();
+  loadedUntil = null;
+  segmentFetching = false;
+}
+
+// 구간 하나의 t 시각 위치 (PositionEngine.compute 와 같은 규칙, 그리지 않으면 null)
+function segmentPosition(seg, t) {
+  if (t < seg.arrive || t > seg.nextArrive) return null;
+  const path = trackPaths[seg.geom];
+  if (t < seg.depart || seg.to < 0) return [path[0], path[1]];   // 정차 중 또는 종착
+  if (path[path.length - 3] === null) return null;                // 다음역 좌표 없음
+
+  const total = seg.nextArrive - seg.depart;
+  const progress = total > 0 ? Math.min(Math.max((t - seg.depart) / total, 0), 1) : 1;
+  // 누적 거리 비율로 형상 위 위치 찾기 (꼭짓점은 구간당 몇 개뿐)
+  let j = 0;
+  while (j + 6 < path.length && path[j + 5] < progress) j += 3;
+  const span = path[j + 5] - path[j + 2];
+  const f = span > 0 ? Math.min(Math.max((progress - path[j + 2]) / span, 0), 1) : 0;
+  return [path[j] + (path[j + 3] - path[j]) * f, path[j + 1] + (path[j + 4] - path[j + 1]) * f];
+}
+
+function renderSegments(t) {
+  const { stations, trains: trainNames, lines } = frameDictionary;
+  const trains = [];
+  segments.forEach(seg => {
+    const pos = segmentPosition(seg, t);
+    if (!pos) return;
+    trains.push({
+      lat: pos[0],
+      lon: pos[1],
+      line: lines[seg.line],
+      train_no: trainNames[seg.train],
+      to: stations[seg.to >= 0 ? seg.to : seg.from],
+      total_delay: seg.delay
+    });
+  });
+  updateTrains(trains);
+}
+
+function tick(now) {
+  if (!playing) return;
+  const elapsed = lastTick === null ? 0 : (now - lastTick) / 1000;
+  lastTick = now;
+
+  // 받아둔 창 끝까지만 진행 (다음 창이 아직 안 왔으면 시계를 잠시 멈춤)
+  if (loadedUntil !== null) {
+    currentSimTimeSec = Math.min(currentSimTimeSec + elapsed * speedMultiplier, loadedUntil);
+  }
+  const needed = loadedUntil === null ? currentSimTimeSec : loadedUntil;
+  if (!segmentFetching && (loadedUntil === null || loadedUntil - currentSimTimeSec < segmentWindowSec() / 2)) {
+    fetchSegments(needed);
+  }
+
+  // 이미 지나간 구간 정리 (1초에 한 번)
+  if (now - lastPrune > 1000) {
+    lastPrune = now;
+    segments.forEach((seg, id) => {
+      if (seg.nextArrive < currentSimTimeSec) segments.delete(id);
+    });
+  }
+
+  if (loadedUntil !== null && trackPaths && frameDictionary) {
     timeLabel.innerText = secondsToTimeString(currentSimTimeSec);
-    updateTrains(secondsToTimeString(currentSimTimeSec));
-  }, 1000);
+    renderSegments(currentSimTimeSec);
+  }
+  requestAnimationFrame(tick);
+}
+
+function play() {
+  if (simStream) simStream.close();
+  simStream = null;
+  if (playing) return;
+  playing = true;
+  lastTick = null;
+  requestAnimationFrame(tick);
+}
+
+function stopPlayback() {
+  playing = false;
+  resetSegments();
+}
+
+function clearTrains() {
+  updateTrains([]);
+  trainState = {};
+}
+
+function stopSimulation() {
+  stopPlayback();
+  if (simStream) simStream.close();
+  simStream = null;
+  if (simId) fetch(`/api/simulation/${simId}`, { method: "DELETE" });
+  simId = null;
+}
+
+startBtn.addEventListener("click", () => {
+  if (playing) return;
+  if (simId) {
+    sendControl({ running: true });
+    play();
+    return;
+  }
+  // 서버 실행은 공유(?sim=<id>)용으로만 만들고, 이 화면은 구간 keyframe 으로 직접 재생
+  postJSON("/api/simulation", simulationSettings()).then(data => {
+    simId = data.id;
+  });
+  play();
 });
 
 resetBtn.addEventListener("click", () => {
-  if (simInterval) clearInterval(simInterval);
-  Object.values(trainMarkers).forEach(m => map.removeLayer(m));
-  trainMarkers = {};
-  trainStatusMap = {};
-  delayMap = {};
-  congestedStations.clear();
+  stopSimulation();
+  clearTrains();
+  weatherRegions = [];
+  congestionSince = null;
   currentSimTimeSec = 9 * 3600;
   timeLabel.innerText = "09:00:00";
 });
 
+// 필터가 바뀌면 현재 시각에서 새 실행으로 다시 시작
+[directionSelect, weekdaySelect, lineSelect].forEach(select => {
+  select.addEventListener("change", () => {
+    if (!simId) return;
+    stopSimulation();
+    clearTrains();
+    startBtn.click();
+  });
+});
+
+// 배속이 바뀌면 다음 창부터 창 크기만 달라짐 (서버 실행은 재생한 시각까지 따라잡게 함)
 speedSelect.addEventListener("change", () => {
   speedMultiplier = parseInt(speedSelect.value);
+  sendControl({ time: secondsToTimeString(currentSimTimeSec), speed: speedMultiplier });
 });
 
 weatherSelect.addEventListener("change", () => {
   weatherLevel = weatherSelect.value;
 });
 
-function updateTrains(timeStr) {
-  const direction = directionSelect.value;
-  const weekday = weekdaySelect.value;
-  const line = lineSelect.value;
-
-  const params = new URLSearchParams({
-    time: timeStr,
-    direction,
-    weekday,
-    line,
-    congested: JSON.stringify([...congestedStations]),
-    weather: weatherLevel
-  });
-
-  fetch(`/api/simulation_data?${params.toString()}`)
-    .then(res => res.json())
-    .then(data => {
-      const activeIds = new Set();
-
-      data.forEach(train => {
-        const key = train.train_no;
-        const lat = train.lat;
-        const lon = train.lon;
-        const lineName = `${parseInt(train.line)}호선`;
-        const color = lineColors[lineName] || 'gray';
-        const status = train.status;
-        const delay = parseInt(train.delay || 0);
-
-        // 🧠 상태 전이 확인: stopped → moving 시점에만 누적
-        if (status === "moving" && trainStatusMap[key] === "stopped") {
-          delayMap[key] = (delayMap[key] || 0) + delay;
-        }
-        trainStatusMap[key] = status;
-
-        const icon = L.divIcon({
-          className: 'emoji-icon',
-          html: `<div style="
-              font-size: 12px;
-              color: white;
-              border: 1px solid ${color};
-              border-radius: 50%;
-              width: 14px;
-              height: 14px;
-              display: flex;
-              align-items: center;
-              justify-content: center;
-              background-color: ${color};
-            ">🚇</div>`,
-          iconSize: [14, 14],
-          iconAnchor: [7, 7]
-        });
-
-        const popupText = `
-          🚆 ${lineName}<br>
-          열차번호: ${train.train_no}<br>
-          다음역: ${train.to}<br>
-          ⏱️ 누적 지연: ${delayMap[key] || 0}초
-        `;
-
-        if (trainMarkers[key]) {
-          const prev = trainMarkers[key].getLatLng();
-          animateMove(trainMarkers[key], prev, L.latLng(lat, lon), 1000);
-          trainMarkers[key].setPopupContent(popupText);
-        } else {
-          const marker = L.marker([lat, lon], { icon: icon }).bindPopup(popupText);
-          marker.addTo(map);
-          trainMarkers[key] = marker;
-        }
-
-        activeIds.add(key);
-      });
+// 자동 혼잡도를 켜고 끄면 서버 실행의 지연을 다시 전파하고 받아둔 구간도 버림
+congestionToggle.addEventListener("change", () => {
+  congestionSince = appliedSince();
+  sendControl({ congestion: congestionMode() });
+  if (playing) resetSegments();
+});
 
-      for (const key in trainMarkers) {
-        if (!activeIds.has(key)) {
-          map.removeLayer(trainMarkers[key]);
-          delete trainMarkers[key];
-          delete trainStatusMap[key];
-          delete delayMap[key];
-        }
-      }
-    });
+// ?sim=<id> 로 열면 다른 뷰어가 만든 실행을 함께 봄
+const sharedSimId = new URLSearchParams(window.location.search).get("sim");
+if (sharedSimId) {
+  // 다른 뷰어의 실행은 서버가 보내는 프레임을 그대로 그림
+  simId = sharedSimId;
+  fetchBinaryFrame(`/api/simulation/${simId}`).then(renderFrame);
+  startStream();
 }
 
 // ✅ 5. 드래그 적용 (Shift 키 눌렀을 때만)
@@ -218,12 +606,17 @@ map.on("mousemove", (e) => {
 map.on("mouseup", () => {
   if (!rectangle) return;
   const bounds = rectangle.getBounds();
-  const affected = Object.entries(stationMarkers)
-    .filter(([_, coord]) => bounds.contains(L.latLng(coord)))
-    .map(([name]) => name);
 
-  affected.forEach(name => congestedStations.add(name));
-  alert(`🌧️ 혼잡도 적용됨 (${affected.length}개 역)`);
+  // 역 검색은 서버 공간 인덱스에서, 이후에는 지역 id 만 주고받음
+  postJSON("/api/weather_regions", {
+    bbox: [bounds.getSouth(), bounds.getWest(), bounds.getNorth(), bounds.getEast()],
+    weather: weatherLevel
+  }).then(region => {
+    if (!weatherRegions.some(r => r.id === region.id)) weatherRegions.push({ id: region.id, since: appliedSince() });
+    sendControl({ regions: weatherRegionIds() });
+    if (playing) resetSegments();
+    alert(`🌧️ 혼잡도 적용됨 (${region.stations.length}개 역)`);
+  });
 
   map.removeLayer(rectangle);
   rectangle = null;
@@ -0,0 +1,95 @@
+"""
+테스트용 작은 시간표
+- 2호선 5개 역: 평일 내선(1) 두 대 + 외선(2) 한 대, 토요일 내선 한 대
+- 1호선 3개 역: 2호선 열차와 같은 열차번호(2001)를 쓰는 열차 한 대 (열차번호는 호선마다 따로 매김)
+"""
+import os
+import sys
+
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.delay_propagation import DelayNetwork  # noqa: E402
+from utils.position_engine import PositionEngine  # noqa: E402
+from utils.timetable_index import TIMETABLE_COLUMNS, TimetableIndex  # noqa: E402
+
+LINE2 = ["시청", "을지로입구", "을지로3가", "을지로4가", "동대문역사문화공원"]
+LINE1 = ["서울역", "시청", "종각"]
+
+STATION_COORDS = {
+    "서울역": (37.5547, 126.9707),
+    "시청": (37.5657, 126.9769),
+    "종각": (37.5702, 126.9831),
+    "을지로입구": (37.5660, 126.9826),
+    "을지로3가": (37.5663, 126.9910),
+    "을지로4가": (37.5667, 126.9979),
+    "동대문역사문화공원": (37.5651, 127.0079),
+}
+
+# 역 도착 → 다음역 도착 (초) / 역 정차 시간 (초)
+RUN_SEC = 150
+DWELL_SEC = 30
+
+# (열차번호, 호선, 요일, 방향, 역 목록, 첫 역 도착 시각)
+TRAINS = [
+    ("2001", "02호선", "3", "1", LINE2, 8 * 3600),
+    ("2003", "02호선", "3", "1", LINE2, 8 * 3600 + 180),
+    ("2002", "02호선", "3", "2", LINE2[::-1], 8 * 3600 + 60),
+    ("2001", "02호선", "2", "1", LINE2, 9 * 3600),
+    ("2001", "01호선", "3", "1", LINE1, 8 * 3600 + 330),
+]
+
+
+def train_rows(train_no, line, week, inout, stations, start):
+    """
+    열차 하나 → 구간(역 → 다음역) 행 목록
+    """
+    def stamp(t_sec):
+        return f"{t_sec // 3600:02d}:{t_sec // 60 % 60:02d}:{t_sec % 60:02d}"
+
+    rows = []
+    for i, (station, next_station) in enumerate(zip(stations, stations[1:])):
+        arrive = start + i * RUN_SEC
+        rows.append({
+            "TRAIN_NO": train_no, "LINE_NUM": line, "STATION_NM": station,
+            "ARRIVETIME": stamp(arrive), "LEFTTIME": stamp(arrive + DWELL_SEC),
+            "NEXT_STATION": next_station, "NEXT_ARRIVETIME": stamp(arrive + RUN_SEC),
+            "WEEK_TAG": week, "INOUT_TAG": inout,
+        })
+    return rows
+
+
+def segment(timetable, train_no, line, week, station):
+    """
+    (열차번호, 호선, 요일, 출발역) → 구간 번호
+    """
+    match = (
+        (timetable.train_no == train_no) & (timetable.line_num == line)
+        & (timetable.week_code == timetable.week_lookup[week]) & (timetable.station_nm == station)
+    )
+    (found,) = match.nonzero()
+    assert len(found) == 1
+    return int(found[0])
+
+
+@pytest.fixture
+def timetable_df():
+    rows = [row for train in TRAINS for row in train_rows(*train)]
+    return pd.DataFrame(rows, columns=TIMETABLE_COLUMNS)
+
+
+@pytest.fixture
+def timetable(timetable_df):
+    return TimetableIndex(timetable_df)
+
+
+@pytest.fixture
+def engine(timetable):
+    return PositionEngine(timetable, STATION_COORDS)
+
+
+@pytest.fixture
+def network(timetable, engine):
+    return DelayNetwork(timetable, engine)
@@ -0,0 +1,89 @@
+import numpy as np
+import pytest
+
+from conftest import LINE2, RUN_SEC
+from utils.arrival_index import ArrivalIndex
+from utils.delay_propagation import DelayState
+
+
+@pytest.fixture
+def arrivals(network):
+    return ArrivalIndex(network)
+
+
+def scan(arrivals, station, t_sec, n, week, direction=None, state=None):
+    """
+    모든 도착 이벤트를 훑는 기준 구현 → [(예상 도착, 열차번호, 호선), ...]
+    """
+    tt, engine = arrivals.timetable, arrivals.engine
+    station_id = engine.station_ids[station]
+    events = []
+    for seg in range(len(tt)):
+        if tt.week_code[seg] != tt.week_lookup[week]:
+            continue
+        if direction is not None and tt.inout_code[seg] != tt.inout_lookup[direction]:
+            continue
+        key = (engine.train_names[engine.train_id[seg]], tt.line_names[tt.line_code[seg]])
+        if engine.from_id[seg] == station_id:
+            delay = state.arrive_delay[seg] if state is not None else 0
+            events.append((int(tt.arrive_sec[seg]) + int(delay),) + key)
+        if engine.to_id[seg] == station_id and arrivals.network.next_in_train[seg] < 0:
+            delay = state.depart_delay[seg] if state is not None else 0
+            events.append((int(tt.next_arrive_sec[seg]) + int(delay),) + key)
+    return sorted(event for event in events if event[0] >= t_sec)[:n]
+
+
+def found(arrivals, events, expected):
+    tt, engine = arrivals.timetable, arrivals.engine
+    seg = arrivals.seg[events]
+    return sorted(zip(
+        np.asarray(expected).tolist(),
+        [engine.train_names[train] for train in engine.train_id[seg]],
+        [tt.line_names[line] for line in tt.line_code[seg]],
+    ))
+
+
+@pytest.mark.parametrize("station", ["시청", "을지로3가", "동대문역사문화공원", "종각"])
+@pytest.mark.parametrize("direction", [None, "1", "2"])
+def test_next_arrivals_match_scan(arrivals, engine, station, direction):
+    for t_sec in range(8 * 3600 - 60, 8 * 3600 + 20 * 60, 37):
+        events, expected = arrivals.next_arrivals(engine.station_ids[station], t_sec, 3, "3", direction)
+        assert np.all(np.diff(expected) >= 0)
+        assert found(arrivals, events, expected) == scan(arrivals, station, t_sec, 3, "3", direction), t_sec
+
+
+def test_next_arrivals_with_delay(arrivals, engine, network):
+    delays = np.zeros(len(engine.station_names), dtype=np.int32)
+    delays[engine.station_ids["을지로입구"]] = 240
+    state = DelayState(network)
+    state.update(delays)
+
+    station = engine.station_ids["을지로4가"]
+    for t_sec in range(8 * 3600, 8 * 3600 + 20 * 60, 29):
+        events, expected = arrivals.next_arrivals(station, t_sec, 2, "3", state=state)
+        assert found(arrivals, events, expected) == scan(arrivals, "을지로4가", t_sec, 2, "3", state=state), t_sec
+
+
+def test_terminal_arrival(arrivals, engine):
+    station = engine.station_ids[LINE2[-1]]
+    events, expected = arrivals.next_arrivals(station, 8 * 3600, 5, "3", "1")
+    assert arrivals.terminal[events].all()
+    assert expected.tolist() == [8 * 3600 + 4 * RUN_SEC, 8 * 3600 + 180 + 4 * RUN_SEC]
+    records = arrivals.records(events, expected)
+    assert [record["next"] for record in records] == [None, None]
+    assert records[0]["expected"] == "08:10:00"
+
+
+def test_unknown_week_and_line(arrivals, engine):
+    station = engine.station_ids["시청"]
+    assert len(arrivals.next_arrivals(station, 8 * 3600, 5, "9")[0]) == 0
+    assert arrivals.line_code("2호선") == arrivals.line_code("02호선") == arrivals.timetable.line_lookup["02호선"]
+    assert arrivals.line_code("9호선") is None
+
+
+def test_station_lookup_and_lines(arrivals, engine):
+    assert arrivals.station_id("서울") == engine.station_ids["서울역"]
+    line1, line2 = (arrivals.timetable.line_lookup[name] for name in ("01호선", "02호선"))
+    assert sorted(arrivals.station_lines[engine.station_ids["시청"]]) == sorted([line1, line2])
+    order = {"02호선": LINE2}
+    assert [engine.station_names[s] for s in arrivals.stations_on_line(line2, order)] == LINE2
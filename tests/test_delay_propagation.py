@@ -0,0 +1,119 @@
+import numpy as np
+
+from conftest import DWELL_SEC, LINE2, RUN_SEC, STATION_COORDS, segment
+from utils.delay_propagation import MIN_HEADWAY_SEC, DelayNetwork, DelayState
+from utils.position_engine import PositionEngine
+from utils.timetable_index import TimetableIndex
+
+
+def station_delay(engine, delays):
+    values = np.zeros(len(engine.station_names), dtype=np.int32)
+    for name, delay in delays.items():
+        values[engine.station_ids[name]] = delay
+    return values
+
+
+def same(a, b):
+    return np.array_equal(a.arrive_delay, b.arrive_delay) and np.array_equal(a.depart_delay, b.depart_delay)
+
+
+def test_no_delay_keeps_timetable(network, engine):
+    state = DelayState(network)
+    changed = state.update(station_delay(engine, {}))
+    assert len(changed) == 0
+    assert state.max_delay == 0
+    # 시간표 간격이 최소 간격보다 짧아도 기본 시나리오에서 밀리는 구간이 없어야 함
+    assert np.all(network.required_gap <= MIN_HEADWAY_SEC)
+
+
+def test_delay_flows_downstream(network, engine, timetable):
+    state = DelayState(network)
+    state.update(station_delay(engine, {"을지로입구": 60}))
+
+    before = segment(timetable, "2001", "02호선", "3", "시청")
+    at = segment(timetable, "2001", "02호선", "3", "을지로입구")
+    assert (state.arrive_delay[before], state.depart_delay[before]) == (0, 0)
+    assert (state.arrive_delay[at], state.depart_delay[at]) == (0, 60)
+    for name in LINE2[2:-1]:
+        seg = segment(timetable, "2001", "02호선", "3", name)
+        assert (state.arrive_delay[seg], state.depart_delay[seg]) == (60, 60)
+    assert state.max_delay == 60
+
+
+def test_following_train_keeps_headway(network, engine, timetable):
+    state = DelayState(network)
+    state.update(station_delay(engine, {"을지로입구": 300}))
+
+    leader = segment(timetable, "2001", "02호선", "3", "을지로입구")
+    follower = segment(timetable, "2003", "02호선", "3", "을지로입구")
+    assert network.prev_at_station[follower] == leader
+    # 앞 열차 출발 (08:03:00 + 300) → 시간표 간격 150초 대신 최소 간격 90초 뒤에 도착
+    gap = min(int(timetable.arrive_sec[follower] - timetable.depart_sec[leader]), MIN_HEADWAY_SEC)
+    expected = int(timetable.depart_sec[leader]) + 300 + gap - int(timetable.arrive_sec[follower])
+    assert state.arrive_delay[follower] == expected > 0
+    assert state.depart_delay[follower] == expected + 300
+
+
+def test_same_train_number_on_other_line_is_separate(network, engine, timetable):
+    state = DelayState(network)
+    state.update(station_delay(engine, {"을지로3가": 120}))
+    line1 = timetable.line_code == timetable.line_lookup["01호선"]
+    assert not state.arrive_delay[line1].any()
+    assert not state.depart_delay[line1].any()
+    saturday = timetable.week_code == timetable.week_lookup["2"]
+    assert state.depart_delay[saturday].max() == 120
+
+
+def test_incremental_update_matches_fresh(network, engine):
+    first = station_delay(engine, {"을지로입구": 45})
+    second = station_delay(engine, {"을지로입구": 45, "을지로4가": 200, "시청": 30})
+    third = station_delay(engine, {"을지로4가": 200})
+
+    state = DelayState(network)
+    for delays in (first, second, third):
+        changed = state.update(delays)
+        fresh = DelayState(network)
+        fresh.update(delays)
+        assert same(state, fresh)
+        assert len(changed) > 0
+
+
+def test_from_sec_leaves_earlier_segments(network, engine, timetable):
+    from_sec = 8 * 3600 + 2 * RUN_SEC
+    state = DelayState(network)
+    state.update(station_delay(engine, {name: 90 for name in engine.station_names}), from_sec=from_sec)
+    early = timetable.arrive_sec < from_sec
+    assert not state.arrive_delay[early].any()
+    assert not state.depart_delay[early].any()
+    assert state.depart_delay[~early].min() >= 90
+
+
+def test_dwell_delay_matches_station_delay(network, engine, timetable):
+    delays = station_delay(engine, {"을지로3가": DWELL_SEC})
+    by_station = DelayState(network)
+    by_station.update(delays)
+    dwell = np.where(engine.from_id >= 0, delays[engine.from_id], 0).astype(np.int32)
+    by_segment = DelayState(network, dwell_delay=dwell)
+    assert same(by_station, by_segment)
+
+
+def test_copy_is_independent(network, engine):
+    base = DelayState(network)
+    base.update(station_delay(engine, {"시청": 60}))
+    branch = base.copy()
+    branch.update(station_delay(engine, {"시청": 60, "을지로4가": 60}))
+    assert not same(base, branch)
+    fresh = DelayState(network)
+    fresh.update(station_delay(engine, {"시청": 60}))
+    assert same(base, fresh)
+
+
+def test_network_from_store_matches_memory(timetable, engine, network, tmp_path):
+    timetable.save(tmp_path)
+    loaded = TimetableIndex.load(tmp_path)
+    # 처음에는 derived/ 에 저장하고, 두 번째는 저장된 배열을 mmap 으로 엶
+    for _ in range(2):
+        shared = DelayNetwork(loaded, PositionEngine(loaded, STATION_COORDS))
+        assert isinstance(shared.prev_in_train, np.memmap)
+        for name in ("prev_in_train", "next_in_train", "prev_at_station", "next_at_station", "required_gap"):
+            assert np.array_equal(getattr(shared, name), getattr(network, name)), name
@@ -0,0 +1,62 @@
+import numpy as np
+
+from conftest import STATION_COORDS
+from utils.analytics import TimetableAnalytics
+from utils.delay_propagation import DelayNetwork
+from utils.derived_arrays import DerivedArrays
+from utils.position_engine import PositionEngine
+from utils.timetable_index import TimetableIndex
+
+
+def test_load_or_build_saves_once(tmp_path):
+    calls = []
+
+    def build():
+        calls.append(1)
+        return {"values": np.arange(5, dtype=np.int32), "names": ["a", "b"]}
+
+    first = DerivedArrays(tmp_path, "tt").load_or_build("sample", "k", build)
+    second = DerivedArrays(tmp_path, "tt").load_or_build("sample", "k", build)
+    assert len(calls) == 1
+    assert isinstance(second["values"], np.memmap)
+    assert np.array_equal(first["values"], second["values"])
+    assert second["names"] == ["a", "b"]
+
+    DerivedArrays(tmp_path, "other").load_or_build("sample", "k", build)
+    assert len(calls) == 2
+
+
+def test_memory_only_without_store():
+    values = DerivedArrays().load_or_build("sample", "k", lambda: {"values": np.ones(3)})
+    assert not isinstance(values["values"], np.memmap)
+
+
+def test_rebuilt_store_drops_stale_arrays(timetable_df, tmp_path):
+    TimetableIndex(timetable_df).save(tmp_path)
+    loaded = TimetableIndex.load(tmp_path)
+    DelayNetwork(loaded, PositionEngine(loaded, STATION_COORDS))
+
+    # 같은 디렉토리에 더 작은 시간표로 다시 빌드
+    smaller = TimetableIndex(timetable_df.iloc[:6])
+    smaller.save(tmp_path)
+    reloaded = TimetableIndex.load(tmp_path)
+    engine = PositionEngine(reloaded, STATION_COORDS)
+    network = DelayNetwork(reloaded, engine)
+    assert len(engine.from_lat) == len(network.prev_in_train) == len(reloaded) == 6
+
+
+def test_stale_arrays_for_other_timetable_ignored(timetable_df, tmp_path):
+    TimetableIndex(timetable_df).save(tmp_path)
+    old = TimetableIndex.load(tmp_path)
+
+    # 행 수와 이름 목록은 그대로고 정차 시간만 바뀐 시간표
+    changed = timetable_df.copy()
+    changed.loc[0, "LEFTTIME"] = changed.loc[0, "ARRIVETIME"]
+    TimetableIndex(changed).save(tmp_path)
+    new = TimetableIndex.load(tmp_path)
+    # 다시 빌드한 뒤에 이전 시간표를 연 worker 가 파생 배열을 저장해도 새 시간표에서는 쓰지 않음
+    TimetableAnalytics(DelayNetwork(old, PositionEngine(old, STATION_COORDS)))
+    assert new.derived.timetable_key != old.derived.timetable_key
+    analytics = TimetableAnalytics(DelayNetwork(new, PositionEngine(new, STATION_COORDS)))
+    assert np.array_equal(analytics.dwell, np.maximum(new.depart_sec - new.arrive_sec, 0))
+    assert analytics.dwell.min() == 0
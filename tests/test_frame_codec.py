@@ -0,0 +1,72 @@
+import numpy as np
+import pytest
+
+from utils.frame_codec import (
+    BINARY_MIMETYPE, COORD_SCALE, FRAME_DTYPE, FRAME_MAGIC, FRAME_VERSION, HEADER, PROGRESS_SCALE,
+    encode_frame, frame_dictionary, wants_binary,
+)
+from utils.position_engine import STATUS_MOVING, STATUS_STOPPED
+
+T_SEC = 8 * 3600 + 200
+
+
+def decode(payload):
+    magic, version, t_sec, count, dict_version = HEADER.unpack_from(payload)
+    records = np.frombuffer(payload, dtype=FRAME_DTYPE, offset=HEADER.size)
+    assert len(records) == count
+    return magic, version, t_sec, dict_version, records
+
+
+def test_record_layout_is_aligned():
+    assert HEADER.size == 20
+    assert FRAME_DTYPE.itemsize == 28
+    assert FRAME_DTYPE.itemsize % 4 == 0
+
+
+def test_frame_roundtrip(engine):
+    idx = engine.timetable.active(T_SEC)
+    frame = engine.compute(T_SEC, idx)
+    dictionary = frame_dictionary(engine)
+    total_delay = np.arange(len(frame["idx"]), dtype=np.int32) * 10
+
+    magic, version, t_sec, dict_version, records = decode(
+        encode_frame(engine, frame, T_SEC, dictionary["version"], total_delay=total_delay)
+    )
+
+    assert (magic, version, t_sec, dict_version) == (FRAME_MAGIC, FRAME_VERSION, T_SEC, dictionary["version"])
+    seg = frame["idx"]
+    assert len(records) == len(seg) > 0
+    assert [dictionary["trains"][i] for i in records["train_id"]] == list(engine.timetable.train_no[seg])
+    assert [dictionary["lines"][i] for i in records["line_id"]] == list(engine.timetable.line_num[seg])
+    assert [dictionary["stations"][i] for i in records["from_id"]] == list(engine.timetable.station_nm[seg])
+    assert np.array_equal(records["status"], frame["status"])
+    assert set(records["status"].tolist()) <= {STATUS_STOPPED, STATUS_MOVING}
+    assert np.allclose(records["lat"] / COORD_SCALE, frame["lat"], atol=1 / COORD_SCALE)
+    assert np.allclose(records["lon"] / COORD_SCALE, frame["lon"], atol=1 / COORD_SCALE)
+    assert np.allclose(records["progress"] / PROGRESS_SCALE, frame["progress"], atol=1 / PROGRESS_SCALE)
+    assert np.array_equal(records["total_delay"], total_delay)
+
+
+def test_empty_frame(engine):
+    frame = engine.compute(3 * 3600, engine.timetable.active(3 * 3600))
+    payload = encode_frame(engine, frame, 3 * 3600, 0)
+    assert len(payload) == HEADER.size
+    assert len(decode(payload)[-1]) == 0
+
+
+def test_dictionary_version_tracks_names(engine):
+    dictionary = frame_dictionary(engine)
+    assert dictionary["version"] == frame_dictionary(engine)["version"]
+    assert sorted(dictionary["lines"]) == ["01호선", "02호선"]
+    assert "을지로입구" in dictionary["stations"]
+
+
+@pytest.mark.parametrize("format_param, accept, expected", [
+    ("bin", None, True),
+    ("json", BINARY_MIMETYPE, False),
+    (None, f"{BINARY_MIMETYPE}, application/json;q=0.5", True),
+    (None, "application/json", False),
+    (None, None, False),
+])
+def test_wants_binary(format_param, accept, expected):
+    assert wants_binary(format_param, accept) is expected
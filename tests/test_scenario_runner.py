@@ -0,0 +1,39 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from conftest import TRAINS
+from utils.scenario_runner import _init_worker, run_scenario, save_shared_arrays
+from utils.simulation_utils import WEATHER_DELAY
+
+SCENARIO = {"weather": "강함", "stations": ["을지로3가"], "start": "07:00:00", "end": "11:00:00", "weekday": "전체"}
+
+
+@pytest.fixture
+def executor(timetable, engine, tmp_path):
+    save_shared_arrays(timetable, engine, str(tmp_path))
+    # worker 대신 이 프로세스에서 같은 mmap 배열로 실행
+    _init_worker(str(tmp_path))
+    with ThreadPoolExecutor(1) as pool:
+        yield pool
+
+
+def test_trains_split_by_line_week_and_direction(timetable, engine, executor):
+    trains, stations = run_scenario(timetable, engine, None, SCENARIO, executor, runs=200, seed=0)
+    keys = list(zip(trains["train_no"], trains["line"], trains["weekday"], trains["direction"]))
+    assert sorted(keys) == sorted((train_no, line, week, inout) for train_no, line, week, inout, _, _ in TRAINS)
+
+    delay = WEATHER_DELAY[SCENARIO["weather"]]
+    for (train_no, line, week, inout), mean in zip(keys, trains["mean_delay_sec"]):
+        # 을지로3가 에서 한 번 정차하는 2호선 열차만 날씨 지연, 1호선 2001 은 변동만 (평균 0)
+        expected = delay if line == "02호선" else 0
+        assert mean == pytest.approx(expected, abs=3), (train_no, line, week, inout)
+    # 을지로3가 를 지나는 2호선 열차 4대의 지연이 역에 쌓임
+    at_station = dict(zip(stations["station"], stations["mean_delay_sec"]))
+    assert at_station["을지로3가"] == pytest.approx(4 * delay, abs=8)
+
+
+@pytest.mark.parametrize("start, end", [("07:00", "11:00:00"), ("07:00:00", None), ("11:00:00", "07:00:00")])
+def test_bad_window_rejected(timetable, engine, executor, start, end):
+    with pytest.raises(ValueError):
+        run_scenario(timetable, engine, None, dict(SCENARIO, start=start, end=end), executor, runs=10, seed=0)
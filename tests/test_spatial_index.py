@@ -0,0 +1,51 @@
+import pytest
+
+from conftest import STATION_COORDS
+from utils.spatial_index import (
+    REGION_ID_PREFIX, StationGrid, WeatherRegions, decode_region_id, encode_region_id, parse_region_ids,
+)
+
+# 시청 ~ 을지로3가 (서울역, 을지로4가, 동대문역사문화공원 제외)
+BBOX = [37.560, 126.975, 37.572, 126.992]
+POLYGON = [[37.560, 126.975], [37.560, 126.992], [37.572, 126.992], [37.572, 126.975]]
+
+
+@pytest.fixture
+def grid():
+    names = list(STATION_COORDS)
+    return StationGrid(names, [STATION_COORDS[n][0] for n in names], [STATION_COORDS[n][1] for n in names])
+
+
+def test_bbox_and_polygon_agree(grid):
+    expected = {"시청", "종각", "을지로입구", "을지로3가"}
+    assert set(grid.query_bbox(*BBOX)) == expected
+    assert set(grid.query_polygon(POLYGON)) == expected
+
+
+def test_region_id_resolves_in_other_process(grid):
+    # POST 를 받은 worker 와 다른 worker (등록 정보를 나누지 않음)
+    registered = WeatherRegions(grid).register("강함", bbox=BBOX)
+    other = WeatherRegions(grid)
+    (resolved,) = other.resolve(parse_region_ids(registered["id"]))
+    assert resolved["stations"] == registered["stations"]
+    assert (resolved["weather"], resolved["delay"]) == (registered["weather"], registered["delay"])
+    assert other.get(registered["id"])["id"] == registered["id"]
+
+
+def test_region_id_is_stable_and_comma_free(grid):
+    regions = WeatherRegions(grid)
+    first = regions.register("보통", polygon=POLYGON)
+    assert regions.register("보통", polygon=POLYGON)["id"] == first["id"]
+    assert regions.register("강함", polygon=POLYGON)["id"] != first["id"]
+    assert "," not in first["id"]
+    assert decode_region_id(first["id"])["polygon"] == POLYGON
+
+
+@pytest.mark.parametrize("region_id", [
+    "", "abc", REGION_ID_PREFIX + "!!!", REGION_ID_PREFIX + "e30",
+    encode_region_id("우박", bbox=BBOX), encode_region_id("강함", bbox=BBOX[:2]),
+])
+def test_bad_region_ids_ignored(grid, region_id):
+    regions = WeatherRegions(grid)
+    assert regions.get(region_id) is None
+    assert regions.resolve([region_id]) == []
@@ -0,0 +1,71 @@
+import sqlite3
+
+import pytest
+
+from conftest import RUN_SEC
+from utils.timetable_db import INDEXES, TABLE, TimetableDB, migrate
+
+
+@pytest.fixture
+def db_path(timetable_df, tmp_path):
+    path = str(tmp_path / "preprocessed_timetable.db")
+    conn = sqlite3.connect(path)
+    try:
+        timetable_df.to_sql(TABLE, conn, index=False)
+    finally:
+        conn.close()
+    return path
+
+
+@pytest.fixture
+def db(db_path):
+    migrate(db_path)
+    return TimetableDB(db_path)
+
+
+def test_unmigrated_db_rejected(db_path):
+    with pytest.raises(ValueError):
+        TimetableDB(db_path)
+
+
+def test_migrate_is_idempotent(db_path):
+    first = migrate(db_path)
+    assert migrate(db_path) == first
+    conn = sqlite3.connect(db_path)
+    try:
+        indexes = {row[1] for row in conn.execute(f"PRAGMA index_list({TABLE})")}
+        columns = [row[1] for row in conn.execute(f"PRAGMA table_info({TABLE})")]
+    finally:
+        conn.close()
+    assert set(INDEXES) <= indexes
+    assert columns.count("arrive_sec") == 1
+
+
+def test_query_plans_use_indexes(db):
+    assert db.check_query_plans() == []
+
+
+@pytest.mark.parametrize("filters", [
+    {},
+    {"week": "3"},
+    {"week": "3", "direction": "2"},
+    {"week": "3", "line": "02호선"},
+    {"week": "전체", "direction": "전체", "line": "전체"},
+])
+def test_active_matches_index(db, timetable, filters):
+    for t_sec in range(8 * 3600 - 60, 9 * 3600 + 15 * 60, 13):
+        rows = db.active(t_sec, **filters)
+        idx = timetable.active(t_sec, **filters)
+        assert sorted(zip(rows["TRAIN_NO"], rows["LINE_NUM"], rows["STATION_NM"])) == sorted(
+            zip(timetable.train_no[idx], timetable.line_num[idx], timetable.station_nm[idx])
+        ), t_sec
+
+
+def test_connection_is_read_only(db):
+    with pytest.raises(sqlite3.OperationalError):
+        db.connection().execute(f"DELETE FROM {TABLE}")
+    assert len(db.active(8 * 3600 + 60)) > 0
+
+
+def test_max_span_recorded(db):
+    assert db.max_span == RUN_SEC
@@ -0,0 +1,93 @@
+import numpy as np
+import pytest
+
+from conftest import RUN_SEC, TRAINS
+from utils.timetable_index import TimetableIndex
+
+FILTERS = [
+    {},
+    {"week": "3"},
+    {"week": "3", "direction": "2"},
+    {"week": "3", "line": "02호선"},
+    {"week": "전체", "direction": "전체", "line": "전체"},
+    {"week": "9"},
+]
+
+
+def scan(timetable, t_sec, week=None, direction=None, line=None):
+    """
+    전체 구간을 훑는 기준 구현 (기존 SQL 의 ARRIVETIME <= t AND NEXT_ARRIVETIME >= t + pandas 필터)
+    """
+    mask = (timetable.arrive_sec <= t_sec) & (timetable.next_arrive_sec >= t_sec)
+    for codes, lookup, value in (
+        (timetable.week_code, timetable.week_lookup, week),
+        (timetable.inout_code, timetable.inout_lookup, direction),
+        (timetable.line_code, timetable.line_lookup, line),
+    ):
+        if value not in (None, "전체"):
+            mask &= codes == lookup.get(value, -1)
+    return np.flatnonzero(mask)
+
+
+def test_segments_sorted_in_integer_seconds(timetable):
+    assert len(timetable) == sum(len(stations) - 1 for _, _, _, _, stations, _ in TRAINS)
+    assert timetable.arrive_sec.dtype == np.int32
+    assert np.all(np.diff(timetable.arrive_sec) >= 0)
+    assert np.all(timetable.next_arrive_sec - timetable.arrive_sec == RUN_SEC)
+    assert timetable.arrive_sec[0] == 8 * 3600
+
+
+def test_rows_without_times_dropped(timetable_df):
+    broken = timetable_df.copy()
+    broken.loc[0, "NEXT_ARRIVETIME"] = None
+    broken.loc[1, "ARRIVETIME"] = "not a time"
+    timetable = TimetableIndex(broken)
+    assert timetable.dropped_rows == 2
+    assert len(timetable) == len(timetable_df) - 2
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_active_matches_scan(timetable, filters):
+    for t_sec in range(8 * 3600 - 60, 9 * 3600 + 15 * 60, 7):
+        assert np.array_equal(timetable.active(t_sec, **filters), scan(timetable, t_sec, **filters)), t_sec
+
+
+@pytest.mark.parametrize("filters", FILTERS)
+def test_sweep_matches_active(timetable, filters):
+    t_start, t_end = 8 * 3600 - 30, 8 * 3600 + 20 * 60
+    frames = list(timetable.sweep(t_start, t_end, step=5, **filters))
+    assert [t_sec for t_sec, _ in frames] == list(range(t_start, t_end + 1, 5))
+    for t_sec, idx in frames:
+        assert np.array_equal(np.sort(idx), timetable.active(t_sec, **filters)), t_sec
+
+
+def test_overlapping_window(timetable):
+    t_start, t_end = 8 * 3600 + 100, 8 * 3600 + 400
+    expected = np.flatnonzero((timetable.arrive_sec <= t_end) & (timetable.next_arrive_sec >= t_start))
+    assert np.array_equal(timetable.overlapping(t_start, t_end), expected)
+
+
+def test_out_of_range_time_is_empty(timetable):
+    assert len(timetable.active(-1)) == 0
+    assert len(timetable.active(30 * 3600)) == 0
+
+
+def test_save_load_roundtrip(timetable, tmp_path):
+    timetable.save(tmp_path, {"source": "preprocessed_timetable.db"})
+    loaded = TimetableIndex.load(tmp_path)
+
+    assert len(loaded) == len(timetable)
+    assert isinstance(loaded.arrive_sec, np.memmap)
+    assert loaded.station_names == timetable.station_names
+    assert loaded.week_lookup == timetable.week_lookup
+    for t_sec in range(8 * 3600, 8 * 3600 + 15 * 60, 11):
+        assert np.array_equal(loaded.active(t_sec, week="3"), timetable.active(t_sec, week="3"))
+
+
+def test_from_csv_matches_dataframe(timetable_df, timetable, tmp_path):
+    path = tmp_path / "preprocessed_timetable.csv"
+    timetable_df.to_csv(path, index=False, encoding="utf-8-sig")
+    from_csv = TimetableIndex.from_csv(path)
+    assert np.array_equal(from_csv.arrive_sec, timetable.arrive_sec)
+    assert list(from_csv.train_no) == list(timetable.train_no)
+    assert from_csv.filter_code(from_csv.week_lookup, "전체") is None
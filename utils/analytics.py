@@ -0,0 +1,185 @@
+import numpy as np
+
+from utils.derived_arrays import derived_key
+
+# 배차 간격 분포 구간 경계 (초) - 마지막 구간은 30분 이상
+HEADWAY_BINS = np.array([0, 60, 120, 180, 240, 300, 420, 600, 900, 1200, 1800], dtype=np.int64)
+HEADWAY_PERCENTILES = (10, 50, 90)
+DWELL_PERCENTILES = (50, 90, 99)
+
+
+def group_percentiles(keys, values, n_groups, percentiles):
+    """
+    그룹별 백분위수 (numpy 기본 linear 보간과 같은 값) → (그룹 수, 백분위 수) 배열, 빈 그룹은 NaN
+    그룹마다 따로 정렬하지 않고 (그룹, 값) 순으로 한 번만 정렬
+    """
+    keys = np.asarray(keys, dtype=np.int64)
+    values = np.asarray(values, dtype=np.float64)
+    order = np.lexsort((values, keys))
+    sorted_values = values[order]
+    counts = np.bincount(keys, minlength=n_groups)
+    starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+
+    pos = (np.asarray(percentiles, dtype=np.float64) / 100.0)[None, :] * np.maximum(counts - 1, 0)[:, None]
+    lo = np.floor(pos).astype(np.int64)
+    hi = np.ceil(pos).astype(np.int64)
+    result = np.full(pos.shape, np.nan)
+    has = counts > 0
+    if len(sorted_values):
+        a = sorted_values[(starts[:, None] + lo)[has]]
+        b = sorted_values[(starts[:, None] + hi)[has]]
+        result[has] = a + (b - a) * (pos[has] - lo[has])
+    return result
+
+
+def _stats(percentile_row, percentiles, count, total):
+    row = {f"p{p}": (None if np.isnan(v) else round(float(v), 1)) for p, v in zip(percentiles, percentile_row)}
+    row["count"] = int(count)
+    row["mean"] = round(float(total) / count, 1) if count else None
+    return row
+
+
+class TimetableAnalytics:
+    """
+    시간표 집계 (역별 시간당 열차 수, 호선/방향별 배차 간격, 정차 시간 백분위, 시나리오별 역 지연 합계)
+    - 서버 시작 시 구간별 시(hour), 정차 시간, 같은 역 앞 열차와의 간격을 배열로 미리 계산
+    - 집계는 필터 마스크 + bincount / (그룹, 값) 정렬 한 번으로 처리 (요청마다 groupby 하지 않음)
+    - 배차 간격은 DelayNetwork 의 역 사슬(호선/방향/요일/역별 도착 순서)을 그대로 사용
+    """
+
+    def __init__(self, network):
+        tt = network.timetable
+        self.network = network
+        self.timetable = tt
+
+        # 시간표 store 가 있으면 store 에 저장해두고 worker 끼리 mmap 공유
+        derived = tt.derived.load_or_build("analytics", derived_key(), lambda: self._build(network))
+        self.hour = derived["hour"]
+        self.n_hours = int(self.hour.max()) + 1 if len(tt) else 0
+        self.dwell = derived["dwell"]
+        self.headway = derived["headway"]
+
+        self.n_inout = len(tt.inout_lookup) or 1
+        self.inout_names = [None] * len(tt.inout_lookup)
+        for value, code in tt.inout_lookup.items():
+            self.inout_names[code] = value
+
+    @staticmethod
+    def _build(network):
+        tt = network.timetable
+        prev = network.prev_at_station
+        headway = np.full(len(tt), -1, dtype=np.int32)
+        has_prev = (prev >= 0) & (network.engine.from_id >= 0)  # 좌표 못 찾은 역은 한 사슬로 묶여 있으므로 제외
+        headway[has_prev] = tt.arrive_sec[has_prev] - tt.arrive_sec[prev[has_prev]]
+        return {
+            "hour": (tt.arrive_sec // 3600).astype(np.int16),
+            "dwell": np.maximum(tt.depart_sec - tt.arrive_sec, 0).astype(np.int32),
+            "headway": headway,
+        }
+
+    def select(self, week=None, direction=None, line=None):
+        return self.timetable.select(week, direction, line)
+
+    def trains_per_hour(self, week=None, direction=None, line=None):
+        """
+        역별 시간대(도착 시각 기준)별 열차 수 - 열차가 한 대라도 있는 역만, 합계가 큰 순
+        """
+        tt = self.timetable
+        idx = self.select(week, direction, line)
+        n_station = len(tt.station_names)
+        counts = np.bincount(
+            tt.station_code[idx].astype(np.int64) * self.n_hours + self.hour[idx],
+            minlength=n_station * self.n_hours,
+        ).reshape(n_station, self.n_hours)
+        totals = counts.sum(axis=1)
+
+        stations = []
+        for code in np.argsort(-totals, kind="stable").tolist():
+            if totals[code] == 0:
+                break
+            stations.append({
+                "station": tt.station_names[code],
+                "total": int(totals[code]),
+                "peak_hour": int(np.argmax(counts[code])),
+                "counts": counts[code].tolist(),
+            })
+        return {"hours": list(range(self.n_hours)), "stations": stations}
+
+    def headways(self, week=None, direction=None, line=None):
+        """
+        호선/방향별 배차 간격(같은 역에 앞 열차가 도착한 뒤 다음 열차가 도착할 때까지) 백분위 + 분포
+        """
+        tt = self.timetable
+        idx = self.select(week, direction, line)
+        idx = idx[self.headway[idx] >= 0]
+        values = self.headway[idx]
+        group = tt.line_code[idx].astype(np.int64) * self.n_inout + tt.inout_code[idx]
+        n_groups = len(tt.line_names) * self.n_inout
+
+        n_bins = len(HEADWAY_BINS)
+        bins = np.searchsorted(HEADWAY_BINS, values, side="right") - 1
+        histogram = np.bincount(group * n_bins + bins, minlength=n_groups * n_bins).reshape(n_groups, n_bins)
+        counts = np.bincount(group, minlength=n_groups)
+        totals = np.bincount(group, weights=values, minlength=n_groups)
+        percentiles = group_percentiles(group, values, n_groups, HEADWAY_PERCENTILES)
+
+        groups = []
+        for g in np.flatnonzero(counts).tolist():
+            line_code, inout_code = divmod(g, self.n_inout)
+            groups.append({
+                "line": tt.line_names[line_code],
+                "direction": self.inout_names[inout_code] if self.inout_names else None,
+                **_stats(percentiles[g], HEADWAY_PERCENTILES, counts[g], totals[g]),
+                "histogram": histogram[g].tolist(),
+            })
+        return {"bins": HEADWAY_BINS.tolist(), "groups": groups}
+
+    def dwell_times(self, week=None, direction=None, line=None):
+        """
+        호선별 + 전체 정차 시간(LEFTTIME - ARRIVETIME) 백분위
+        """
+        tt = self.timetable
+        idx = self.select(week, direction, line)
+        values = self.dwell[idx]
+        group = tt.line_code[idx].astype(np.int64)
+        n_groups = len(tt.line_names)
+
+        counts = np.bincount(group, minlength=n_groups)
+        totals = np.bincount(group, weights=values, minlength=n_groups)
+        percentiles = group_percentiles(group, values, n_groups, DWELL_PERCENTILES)
+        overall = group_percentiles(np.zeros(len(values), dtype=np.int64), values, 1, DWELL_PERCENTILES)[0]
+
+        return {
+            "all": _stats(overall, DWELL_PERCENTILES, len(values), values.sum()),
+            "lines": [
+                {"line": tt.line_names[g], **_stats(percentiles[g], DWELL_PERCENTILES, counts[g], totals[g])}
+                for g in np.flatnonzero(counts).tolist()
+            ],
+        }
+
+    def station_delays(self, state, week=None, direction=None, line=None):
+        """
+        DelayState(날씨/혼잡 시나리오) 기준 역별 지연 합계 - 역을 출발할 때의 시간표 대비 지연을 열차마다 더함
+        """
+        tt = self.timetable
+        idx = self.select(week, direction, line)
+        delay = state.depart_delay[idx].astype(np.int64)
+        code = tt.station_code[idx].astype(np.int64)
+        n_station = len(tt.station_names)
+
+        delay_sec = np.bincount(code, weights=delay, minlength=n_station).astype(np.int64)
+        delayed = np.bincount(code, weights=delay > 0, minlength=n_station).astype(np.int64)
+        max_delay = np.zeros(n_station, dtype=np.int64)
+        np.maximum.at(max_delay, code, delay)
+
+        stations = [
+            {
+                "station": tt.station_names[s],
+                "delay_sec": int(delay_sec[s]),
+                "delayed_trains": int(delayed[s]),
+                "max_delay": int(max_delay[s]),
+            }
+            for s in np.argsort(-delay_sec, kind="stable").tolist()
+            if delay_sec[s] > 0
+        ]
+        return {"total_delay_sec": int(delay_sec.sum()), "stations": stations}
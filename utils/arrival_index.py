@@ -0,0 +1,204 @@
+import numpy as np
+
+from utils.derived_arrays import derived_key
+
+from utils.simulation_utils import format_time
+from utils.station_registry import line_number, normalize_station_name
+
+# 한 번에 돌려주는 최대 도착 수
+NEXT_ARRIVALS_MAX = 50
+
+
+class ArrivalIndex:
+    """
+    (호선, 역, 방향, 요일) 별 도착 시각 정렬 배열 (서버 시작 시 한 번만 생성, CSR)
+    - 도착 이벤트: 구간의 출발역 도착(arrive_sec) + 열차 마지막 구간의 다음역(종착역) 도착(next_arrive_sec)
+    - "t 이후 다음 열차 n 대" 는 해당 key 구간에서 이진 탐색 한 번 + 앞에서 몇 개만 읽음 (표 전체를 훑지 않음)
+    - 지연 시나리오(DelayState)가 있으면 예상 도착 = 시간표 + 지연 (정차: arrive_delay, 종착: depart_delay)
+      지연은 0 이상이므로 시간표 시각이 (t - max_delay) 이후인 이벤트부터 보면 충분하고,
+      아직 보지 않은 이벤트의 시간표 시각이 n 번째 예상 도착보다 늦으면 거기서 멈춤
+    """
+
+    def __init__(self, network):
+        self.network = network
+        tt = network.timetable
+        engine = network.engine
+        self.timetable = tt
+        self.engine = engine
+
+        self.n_station = len(engine.station_names)
+        self.n_inout = len(tt.inout_lookup) or 1
+        self.n_week = len(tt.week_lookup) or 1
+
+        # 시간표만으로 정해지는 배열 - 시간표 store 가 있으면 store 에 저장해두고 worker 끼리 mmap 공유
+        derived = tt.derived.load_or_build("arrival_index", derived_key(), self._build)
+        self.seg = derived["seg"]
+        self.terminal = derived["terminal"]
+        self.scheduled = derived["scheduled"]
+        self.offsets = derived["offsets"]
+
+        # 역 id → 그 역을 지나는 호선 코드 목록 / 호선 코드 → 지나는 역 id 목록
+        pairs = derived["pairs"]
+        self.station_lines = {}
+        self.line_stations = {}
+        for line_code, station_id in zip((pairs // self.n_station).tolist(), (pairs % self.n_station).tolist()):
+            self.station_lines.setdefault(station_id, []).append(line_code)
+            self.line_stations.setdefault(line_code, []).append(station_id)
+
+        self.inout_names = [None] * len(tt.inout_lookup)
+        for value, code in tt.inout_lookup.items():
+            self.inout_names[code] = value
+        self._normalized = {}
+        for code, name in enumerate(engine.station_names):
+            self._normalized.setdefault(normalize_station_name(name), code)
+
+    def _build(self):
+        tt, engine, network = self.timetable, self.engine, self.network
+        stop = np.flatnonzero(engine.from_id >= 0)
+        last = np.flatnonzero((network.next_in_train < 0) & (engine.to_id >= 0))
+        seg = np.concatenate([stop, last]).astype(np.int64)
+        terminal = np.concatenate([np.zeros(len(stop), dtype=bool), np.ones(len(last), dtype=bool)])
+        station = np.concatenate([engine.from_id[stop], engine.to_id[last]]).astype(np.int64)
+        scheduled = np.concatenate([tt.arrive_sec[stop], tt.next_arrive_sec[last]]).astype(np.int64)
+
+        line, inout, week = tt.line_code[seg], tt.inout_code[seg], tt.week_code[seg]
+        known = (line >= 0) & (inout >= 0) & (week >= 0)
+        key = self._key(line, station, inout, week)
+
+        # key → 시간표 도착 시각 순
+        order = np.flatnonzero(known)[np.lexsort((scheduled[known], key[known]))]
+        n_keys = len(tt.line_names) * self.n_station * self.n_inout * self.n_week
+        return {
+            "seg": seg[order].astype(np.int32),
+            "terminal": terminal[order],
+            "scheduled": scheduled[order].astype(np.int32),
+            "offsets": np.searchsorted(key[order], np.arange(n_keys + 1)).astype(np.int64),
+            "pairs": np.unique(line[known].astype(np.int64) * self.n_station + station[known]),
+        }
+
+    def _key(self, line, station, inout, week):
+        return ((np.asarray(line, dtype=np.int64) * self.n_station + station) * self.n_inout + inout) * self.n_week \
+            + week
+
+    def station_id(self, name):
+        """
+        역 이름 → 역 id ('서울역' / '서울' 처럼 이름 변형도 허용, 없으면 None)
+        """
+        code = self.engine.station_ids.get(name)
+        return code if code is not None else self._normalized.get(normalize_station_name(name))
+
+    def line_code(self, name):
+        """
+        '02호선' / '2호선' / '2' → 호선 코드 (없으면 None)
+        """
+        code = self.timetable.line_lookup.get(name)
+        if code is not None:
+            return code
+        number = line_number(name)
+        for code, line_name in enumerate(self.timetable.line_names):
+            if number is not None and line_number(line_name) == number:
+                return code
+        return None
+
+    def stations_on_line(self, line_code, line_orders=None):
+        """
+        호선을 지나는 역 id 목록 - line_orders(노선 순서)에 있으면 그 순서, 나머지는 뒤에 이름 순
+        """
+        station_ids = set(self.line_stations.get(line_code, ()))
+        names = self.engine.station_names
+        ordered = []
+        number = line_number(self.timetable.line_names[line_code])
+        for route_name, stations in (line_orders or {}).items():
+            if line_number(route_name) != number:
+                continue
+            for name in stations:
+                code = self.engine.station_ids.get(name)
+                if code in station_ids and code not in ordered:
+                    ordered.append(code)
+        rest = sorted(station_ids.difference(ordered), key=lambda code: names[code])
+        return ordered + rest
+
+    def _delay(self, events, state):
+        seg = self.seg[events]
+        return np.where(self.terminal[events], state.depart_delay[seg], state.arrive_delay[seg])
+
+    def _next_in_key(self, key, t_sec, n, state):
+        """
+        key 하나에서 t_sec 이후 예상 도착 n 개 → (이벤트 번호, 예상 도착)
+        """
+        lo, hi = int(self.offsets[key]), int(self.offsets[key + 1])
+        scheduled = self.scheduled[lo:hi]
+        if state is None or state.max_delay <= 0:
+            start = lo + int(np.searchsorted(scheduled, t_sec, side="left"))
+            events = np.arange(start, min(start + n, hi))
+            return events, self.scheduled[events].astype(np.int64)
+
+        start = lo + int(np.searchsorted(scheduled, t_sec - state.max_delay, side="left"))
+        chunk = 2 * n
+        while True:
+            end = min(start + chunk, hi)
+            events = np.arange(start, end)
+            expected = self.scheduled[events].astype(np.int64) + self._delay(events, state)
+            keep = expected >= t_sec
+            events, expected = events[keep], expected[keep]
+            order = np.argsort(expected, kind="stable")[:n]
+            events, expected = events[order], expected[order]
+            # 다 봤거나, 다음 이벤트의 시간표 시각(= 예상 도착 하한)이 n 번째 예상 도착보다 늦으면 끝
+            if end == hi or (len(expected) == n and self.scheduled[end] > expected[-1]):
+                return events, expected
+            chunk *= 2
+
+    def next_arrivals(self, station_id, t_sec, n, week, direction=None, line=None, state=None):
+        """
+        역 하나의 t_sec 이후 도착 n 개 (예상 도착 순) → (이벤트 번호, 예상 도착) 배열
+        week: WEEK_TAG, direction: INOUT_TAG (None/"전체" 면 모두), line: 호선 코드 (None 이면 모든 호선)
+        state: 지연 시나리오 DelayState (None 이면 시간표 그대로)
+        """
+        tt = self.timetable
+        week_code = tt.week_lookup.get(week)
+        if week_code is None:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        if direction in (None, "전체"):
+            inouts = range(len(tt.inout_lookup))
+        else:
+            inouts = [tt.inout_lookup[direction]] if direction in tt.inout_lookup else []
+        lines = self.station_lines.get(station_id, []) if line is None else [line]
+
+        parts = [
+            self._next_in_key(int(self._key(line_code, station_id, inout, week_code)), t_sec, n, state)
+            for line_code in lines for inout in inouts
+        ]
+        if not parts:
+            return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+        events = np.concatenate([events for events, _ in parts])
+        expected = np.concatenate([expected for _, expected in parts])
+        order = np.argsort(expected, kind="stable")[:n]
+        return events[order], expected[order]
+
+    def records(self, events, expected):
+        """
+        이벤트 번호 + 예상 도착 → 응답용 dict 목록
+        next: 이 역 다음 정차역 (종착이면 None)
+        """
+        tt = self.timetable
+        engine = self.engine
+        names = engine.station_names
+        seg = self.seg[events]
+        to_id = np.where(self.terminal[events], -1, engine.to_id[seg])
+        return [
+            {
+                "train_no": engine.train_names[train],
+                "line": tt.line_names[line_code],
+                "direction": self.inout_names[inout],
+                "scheduled": format_time(scheduled),
+                "expected": format_time(exp),
+                "delay": exp - scheduled,
+                "next": names[next_id] if next_id >= 0 else None,
+                "terminal": terminal,
+            }
+            for train, line_code, inout, scheduled, exp, next_id, terminal in zip(
+                engine.train_id[seg].tolist(), tt.line_code[seg].tolist(), tt.inout_code[seg].tolist(),
+                self.scheduled[events].tolist(), np.asarray(expected).tolist(), to_id.tolist(),
+                self.terminal[events].tolist(),
+            )
+        ]
@@ -0,0 +1,195 @@
+"""
+Flask(WSGI) 앱 앞에 두는 가벼운 ASGI 프론트엔드 (외부 의존성 없음, uvicorn 등 ASGI 서버로 실행)
+
+- route() 로 등록한 경로는 이벤트 루프에서 직접 처리 (정적 bytes, 계산은 스레드 풀 Future 를 await)
+- 그 밖의 경로는 WsgiBridge 가 스레드 풀에서 Flask 앱을 그대로 호출 (스트리밍 응답은 chunk 단위로 전달)
+"""
+import asyncio
+import contextvars
+import io
+import re
+import sys
+from urllib.parse import parse_qs
+
+_ROUTE_PARAM = re.compile(r"<(\w+)>")
+
+
+class AsgiRequest:
+    """
+    route 핸들러에 넘기는 요청 정보 - args 는 파라미터별 첫 번째 값, headers 는 소문자 이름
+    """
+
+    def __init__(self, scope):
+        self.method = scope["method"]
+        self.path = scope["path"]
+        query = parse_qs(scope.get("query_string", b"").decode("latin-1"), keep_blank_values=True)
+        self.args = {name: values[0] for name, values in query.items()}
+        self.headers = {
+            name.decode("latin-1").lower(): value.decode("latin-1") for name, value in scope.get("headers", ())
+        }
+
+
+def response(body, content_type="application/json", status=200, headers=()):
+    """
+    route 핸들러 반환 형식 - body 는 bytes 또는 bytes 를 내놓는 async iterator
+    """
+    return status, [("content-type", content_type), *headers], body
+
+
+class WsgiBridge:
+    """
+    WSGI 앱을 ASGI 로 감싸서 executor 스레드에서 실행
+    - 요청 하나의 WSGI 호출/응답 iterator 는 같은 contextvars Context 에서 차례로 실행 (Flask 컨텍스트 유지)
+    """
+
+    def __init__(self, wsgi_app, executor):
+        self.wsgi_app = wsgi_app
+        self.executor = executor
+
+    def environ(self, scope, body):
+        server = scope.get("server") or ("localhost", 80)
+        client = scope.get("client") or ("", 0)
+        environ = {
+            "REQUEST_METHOD": scope["method"],
+            "SCRIPT_NAME": scope.get("root_path", "").encode("utf-8").decode("latin-1"),
+            "PATH_INFO": scope["path"].encode("utf-8").decode("latin-1"),
+            "QUERY_STRING": scope.get("query_string", b"").decode("latin-1"),
+            "SERVER_NAME": server[0],
+            "SERVER_PORT": str(server[1]),
+            "REMOTE_ADDR": client[0],
+            "SERVER_PROTOCOL": f"HTTP/{scope.get('http_version', '1.1')}",
+            "CONTENT_LENGTH": str(len(body)),
+            "wsgi.version": (1, 0),
+            "wsgi.url_scheme": scope.get("scheme", "http"),
+            "wsgi.input": io.BytesIO(body),
+            "wsgi.errors": sys.stderr,
+            "wsgi.multithread": True,
+            "wsgi.multiprocess": False,
+            "wsgi.run_once": False,
+        }
+        for name, value in scope.get("headers", ()):
+            name = name.decode("latin-1").upper().replace("-", "_")
+            value = value.decode("latin-1")
+            if name == "CONTENT_TYPE":
+                environ["CONTENT_TYPE"] = value
+            elif name != "CONTENT_LENGTH":
+                key = f"HTTP_{name}"
+                environ[key] = f"{environ[key]},{value}" if key in environ else value
+        return environ
+
+    async def __call__(self, scope, receive, send):
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        started = {}
+
+        def start_response(status, headers, exc_info=None):
+            started["status"] = int(status.split(" ", 1)[0])
+            started["headers"] = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+            return lambda data: started.setdefault("written", []).append(data)
+
+        result = await loop.run_in_executor(
+            self.executor, context.run, self.wsgi_app, self.environ(scope, body), start_response
+        )
+        iterator = iter(result)
+
+        async def chunks():
+            for data in started.pop("written", ()):
+                yield data
+            while True:
+                data = await loop.run_in_executor(self.executor, context.run, next, iterator, None)
+                if data is None:
+                    return
+                if data:
+                    yield data
+
+        try:
+            # 첫 chunk 를 받아야 start_response 가 호출된 것이 보장됨
+            first = await loop.run_in_executor(self.executor, context.run, next, iterator, None)
+            await send({"type": "http.response.start", "status": started["status"], "headers": started["headers"]})
+            if first:
+                await send({"type": "http.response.body", "body": first, "more_body": True})
+            if first is not None:
+                await _send_stream(chunks(), receive, send)
+            else:
+                await send({"type": "http.response.body", "body": b""})
+        finally:
+            if hasattr(result, "close"):
+                await loop.run_in_executor(self.executor, context.run, result.close)
+
+
+async def _send_stream(chunks, receive, send):
+    """
+    async iterator 를 chunk 단위로 전송 - 클라이언트가 끊으면 중단
+    """
+    async def watch_disconnect():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    watcher = asyncio.ensure_future(watch_disconnect())
+    try:
+        async for data in chunks:
+            if watcher.done():
+                return
+            await send({"type": "http.response.body", "body": data, "more_body": True})
+        await send({"type": "http.response.body", "body": b""})
+    finally:
+        watcher.cancel()
+        await chunks.aclose()
+
+
+class AsyncFrontend:
+    """
+    ASGI 앱: route() 로 등록한 async 핸들러를 먼저 찾고, 없으면 fallback(WsgiBridge) 으로 넘김
+    """
+
+    def __init__(self, fallback):
+        self.fallback = fallback
+        self._routes = []    # (method, 경로 정규식, 핸들러)
+
+    def route(self, path, method="GET"):
+        """
+        '/api/simulation/<sim_id>/stream' 형식 경로 → 핸들러(request, **경로 파라미터) 등록
+        """
+        pattern = re.compile("^" + _ROUTE_PARAM.sub(r"(?P<\1>[^/]+)", path) + "$")
+
+        def decorator(handler):
+            self._routes.append((method, pattern, handler))
+            return handler
+        return decorator
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            while True:
+                message = await receive()
+                if message["type"] == "lifespan.startup":
+                    await send({"type": "lifespan.startup.complete"})
+                elif message["type"] == "lifespan.shutdown":
+                    await send({"type": "lifespan.shutdown.complete"})
+                    return
+        if scope["type"] != "http":
+            return
+
+        for method, pattern, handler in self._routes:
+            match = pattern.match(scope["path"])
+            if match and scope["method"] in (method, "HEAD" if method == "GET" else method):
+                break
+        else:
+            await self.fallback(scope, receive, send)
+            return
+
+        status, headers, body = await handler(AsgiRequest(scope), **match.groupdict())
+        headers = [(name.lower().encode("latin-1"), value.encode("latin-1")) for name, value in headers]
+        if isinstance(body, bytes):
+            headers.append((b"content-length", str(len(body)).encode("latin-1")))
+            await send({"type": "http.response.start", "status": status, "headers": headers})
+            await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+            return
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await _send_stream(body, receive, send)
@@ -0,0 +1,113 @@
+import numpy as np
+
+from utils.derived_arrays import derived_key
+
+# 혼잡도 시간 버킷 (초)
+CONGESTION_BUCKET_SEC = 1800
+
+# 가장 붐비는 역의 가장 붐비는 시간대에 늘어나는 정차 시간 (초)
+MAX_CONGESTION_SEC = 20
+
+# 환승 호선이 하나 늘 때마다 역 부하에 더하는 비율
+TRANSFER_WEIGHT = 0.25
+
+# WEEK_TAG 별 시간대 곡선: (중심 시각(시), 폭(시), 높이) 가우시안의 합
+# 평일은 출근(08시)/퇴근(18시 반) 두 봉우리, 토요일/공휴일은 낮 시간 완만한 봉우리
+RUSH_PEAKS = {
+    "3": ((8.25, 0.75, 1.0), (18.5, 1.0, 0.9), (13.0, 3.0, 0.25)),   # 평일
+    "2": ((14.0, 3.0, 0.45),),                                        # 토요일
+    "1": ((14.0, 3.0, 0.35),),                                        # 공휴일
+}
+
+
+def rush_curve(week, hours):
+    """
+    WEEK_TAG + 시각(시, 실수 배열) → 0~1 혼잡 계수 (모르는 요일은 평일 곡선)
+    24시 이후(심야 연장 운행)는 다음날 새벽으로 보고 같은 곡선 사용
+    """
+    hours = np.asarray(hours, dtype=np.float64) % 24
+    curve = np.zeros_like(hours)
+    for center, width, height in RUSH_PEAKS.get(str(week), RUSH_PEAKS["3"]):
+        curve += height * np.exp(-0.5 * ((hours - center) / width) ** 2)
+    return np.clip(curve, 0.0, 1.0)
+
+
+class CongestionModel:
+    """
+    출퇴근 시간 기반 자동 혼잡도 - (요일, 역, 시간 버킷) 별 정차 시간 증가(초) 표
+    - 역 부하: 하루 동안 그 역에 도착하는 열차 수(요일별, 최대 역 기준 0~1) × 환승 호선 수 가중
+    - 정차 시간 증가 = MAX_CONGESTION_SEC × 시간대 곡선 × 역 부하 (정수 초로 반올림)
+    - 표는 서버 시작 시 한 번 만들고, 구간별 값(segment_dwell)도 한 번만 모아둠
+      → 프레임 계산에서는 DelayState(dwell_delay=segment_dwell) 로 전파된 지연 배열을 gather 하기만 함
+    """
+
+    def __init__(self, timetable, max_sec=MAX_CONGESTION_SEC, bucket_sec=CONGESTION_BUCKET_SEC):
+        self.timetable = timetable
+        self.bucket_sec = bucket_sec
+        tt = timetable
+        self.week_names = [None] * len(tt.week_lookup)
+        for value, code in tt.week_lookup.items():
+            self.week_names[code] = value
+
+        self.n_buckets = int(tt.arrive_sec.max()) // bucket_sec + 1 if len(tt) else 1
+
+        # 시간표 store 가 있으면 store 에 저장해두고 worker 끼리 mmap 공유
+        derived = tt.derived.load_or_build(
+            "congestion_model", derived_key(max_sec, bucket_sec, TRANSFER_WEIGHT, RUSH_PEAKS),
+            lambda: self._build(max_sec),
+        )
+        self.load = derived["load"]
+        self.table = derived["table"]
+        self.segment_dwell = derived["segment_dwell"]
+
+    def _build(self, max_sec):
+        tt = self.timetable
+        bucket_sec = self.bucket_sec
+        n_week = len(tt.week_lookup) or 1
+        n_station = len(tt.station_names)
+
+        week = tt.week_code.astype(np.int64)
+        station = tt.station_code.astype(np.int64)
+        known = (station >= 0) & (week >= 0)   # 역/요일 값이 없는 행(코드 -1)은 혼잡도 0
+
+        # 요일별 역 도착 열차 수 → 0~1 (요일마다 가장 붐비는 역 기준)
+        visits = np.bincount(
+            week[known] * n_station + station[known], minlength=n_week * n_station
+        ).reshape(n_week, n_station)
+        peak = visits.max(axis=1, keepdims=True)
+        load = np.sqrt(visits / np.maximum(peak, 1))
+
+        # 환승역 가중: 역을 지나는 서로 다른 호선 수
+        has_line = known & (tt.line_code >= 0)
+        pairs = np.unique(station[has_line] * len(tt.line_names) + tt.line_code[has_line])
+        n_lines = np.bincount(pairs // len(tt.line_names), minlength=n_station)
+        load = np.clip(load * (1 + TRANSFER_WEIGHT * np.maximum(n_lines - 1, 0)), 0.0, 1.0)
+
+        # 요일별 시간대 곡선 (버킷 중앙 시각 기준)
+        centers = (np.arange(self.n_buckets) + 0.5) * bucket_sec / 3600
+        curves = np.array([rush_curve(name, centers) for name in self.week_names]).reshape(-1, self.n_buckets)
+        if not len(curves):
+            curves = np.zeros((1, self.n_buckets))
+
+        table = np.rint(max_sec * load[:, :, None] * curves[:, None, :]).astype(np.int16)
+
+        # 구간별 정차 시간 증가: 출발역 + 도착 시각 버킷으로 표를 gather
+        bucket = np.minimum(tt.arrive_sec // bucket_sec, self.n_buckets - 1)
+        segment_dwell = np.zeros(len(tt), dtype=np.int32)
+        segment_dwell[known] = table[week[known], station[known], bucket[known]]
+        return {"load": load, "table": table, "segment_dwell": segment_dwell}
+
+    def station_profile(self, name, week="3"):
+        """
+        역 하나의 시간 버킷별 정차 시간 증가 목록 (요일/역이 없으면 None)
+        """
+        code = self.timetable.week_lookup.get(week)
+        if code is None or name not in self.timetable.station_names:
+            return None
+        station = self.timetable.station_names.index(name)
+        return {
+            "station": name,
+            "bucket_sec": self.bucket_sec,
+            "load": round(float(self.load[code, station]), 3),
+            "dwell_sec": self.table[code, station].tolist(),
+        }
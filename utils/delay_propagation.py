@@ -0,0 +1,243 @@
+import heapq
+
+import numpy as np
+
+from utils.derived_arrays import derived_key
+from utils.timetable_index import sweep_active
+
+# 같은 역에서 앞 열차 출발 후 뒤 열차 도착까지 최소 간격 (초)
+# 시간표 자체 간격이 이보다 짧으면 시간표 간격을 기준으로 삼아 기본 시나리오 지연은 0 이 되도록 함
+MIN_HEADWAY_SEC = 90
+
+
+def _chain(keys, arrive_sec):
+    """
+    같은 key 안에서 도착 시각 순으로 이전/다음 구간 번호 배열 (없으면 -1)
+    """
+    n = len(keys)
+    order = np.lexsort((np.arange(n), arrive_sec, keys))
+    same = keys[order[1:]] == keys[order[:-1]]
+
+    prev_seg = np.full(n, -1, dtype=np.int32)
+    next_seg = np.full(n, -1, dtype=np.int32)
+    prev_seg[order[1:][same]] = order[:-1][same]
+    next_seg[order[:-1][same]] = order[1:][same]
+    return prev_seg, next_seg
+
+
+class DelayNetwork:
+    """
+    지연 전파에 쓰는 구간 연결 구조 (서버 시작 시 한 번만 생성)
+    - 열차 사슬: 같은 열차(열차번호/호선/요일/방향)의 구간을 운행 순서대로 연결 → 지연이 하류 구간으로 전달
+    - 역 사슬: 같은 호선/방향/요일/역을 지나는 구간을 도착 순서대로 연결 → 뒤 열차에 최소 운행 간격 적용
+    구간 번호는 시작 시각 순이므로 번호 순서가 곧 계산 순서 (앞 구간이 항상 먼저)
+    """
+
+    def __init__(self, timetable, engine, min_headway=MIN_HEADWAY_SEC):
+        self.timetable = timetable
+        self.engine = engine
+        self.min_headway = min_headway
+        # 시간표 store 가 있으면 store 에 저장해두고 worker 끼리 mmap 공유
+        derived = timetable.derived.load_or_build(
+            "delay_network", derived_key(min_headway), lambda: self._build(timetable, engine, min_headway)
+        )
+        self.prev_in_train, self.next_in_train = derived["prev_in_train"], derived["next_in_train"]
+        self.prev_at_station, self.next_at_station = derived["prev_at_station"], derived["next_at_station"]
+        self.required_gap = derived["required_gap"]
+        self.station_segments, self.station_offsets = derived["station_segments"], derived["station_offsets"]
+
+    @staticmethod
+    def _build(timetable, engine, min_headway):
+        n = len(timetable)
+
+        n_week = len(timetable.week_lookup) or 1
+        n_inout = len(timetable.inout_lookup) or 1
+        n_line = len(timetable.line_lookup) or 1
+        n_station = len(engine.station_names) + 1
+
+        week = timetable.week_code.astype(np.int64)
+        inout = timetable.inout_code.astype(np.int64)
+        line = timetable.line_code.astype(np.int64)
+        # 열차번호는 호선마다 따로 매기므로 호선까지 같아야 같은 열차
+        train_key = ((engine.train_id.astype(np.int64) * n_line + line) * n_week + week) * n_inout + inout
+        station_key = ((line * n_inout + inout) * n_week + week) * n_station + engine.from_id + 1
+
+        prev_in_train, next_in_train = _chain(train_key, timetable.arrive_sec)
+        prev_at_station, next_at_station = _chain(station_key, timetable.arrive_sec)
+
+        # 앞 열차 출발 → 이 열차 도착까지 필요한 간격 (시간표 간격과 최소 간격 중 작은 값)
+        has_prev = prev_at_station >= 0
+        gap = np.zeros(n, dtype=np.int32)
+        gap[has_prev] = timetable.arrive_sec[has_prev] - timetable.depart_sec[prev_at_station[has_prev]]
+
+        # 역 id → 그 역에서 출발하는 구간 번호 (CSR)
+        from_id = engine.from_id
+        known = np.flatnonzero(from_id >= 0)
+        order = known[np.argsort(from_id[known], kind="stable")]
+        station_offsets = np.zeros(len(engine.station_names) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(from_id[known], minlength=len(engine.station_names)), out=station_offsets[1:])
+        return {
+            "prev_in_train": prev_in_train, "next_in_train": next_in_train,
+            "prev_at_station": prev_at_station, "next_at_station": next_at_station,
+            # 시간표상 겹치는 경우(음수 간격)도 그대로 둬야 지연이 없을 때 밀리는 구간이 생기지 않음
+            "required_gap": np.minimum(gap, min_headway).astype(np.int32),
+            "station_segments": order.astype(np.int32),
+            "station_offsets": station_offsets,
+        }
+
+    def views(self):
+        """
+        전파 루프용 memoryview (원소 단위 접근이 numpy 보다 훨씬 빠르고, 리스트로 복사하지 않아서
+        mmap 으로 연 배열이면 worker 끼리 같은 페이지를 그대로 공유)
+        """
+        tt = self.timetable
+        return tuple(memoryview(np.ascontiguousarray(values)) for values in (
+            self.prev_in_train, self.prev_at_station, self.next_in_train, self.next_at_station,
+            tt.arrive_sec, tt.depart_sec, self.engine.from_id, self.required_gap,
+        ))
+
+    def segments_from(self, station_ids):
+        parts = [
+            self.station_segments[self.station_offsets[s]:self.station_offsets[s + 1]]
+            for s in station_ids
+        ]
+        return np.concatenate(parts) if parts else np.zeros(0, dtype=np.int32)
+
+
+class DelayState:
+    """
+    시나리오(역별 정차 지연) 하나에 대한 구간별 지연 상태
+    - arrive_delay[s]: 시간표 대비 도착 지연 (이전 구간 지연 + 앞 열차 간격 때문에 밀린 시간)
+    - depart_delay[s]: 시간표 대비 출발 지연 (도착 지연 + 출발역 정차 지연 + 구간별 정차 시간 증가)
+    - dwell_delay[s]: 구간별 정차 시간 증가 (시간대 혼잡도 모델 등, 역별 지연과 따로 더해짐)
+    기본값은 모든 지연 0 이고, update() 는 바뀐 역/구간부터 영향받는 구간만 다시 계산
+    """
+
+    def __init__(self, network, dwell_delay=None):
+        self.network = network
+        n = len(network.timetable)
+        self.station_delay = np.zeros(len(network.engine.station_names), dtype=np.int32)
+        self.dwell_delay = np.zeros(n, dtype=np.int32)
+        self.arrive_delay = np.zeros(n, dtype=np.int32)
+        self.depart_delay = np.zeros(n, dtype=np.int32)
+        self.max_delay = 0
+        if dwell_delay is not None:
+            self.update(self.station_delay, dwell_delay=dwell_delay)
+
+    def copy(self):
+        """
+        같은 지연 상태의 복사본 (캐시해둔 기본 상태에서 시나리오를 더 얹을 때 사용)
+        """
+        state = DelayState.__new__(DelayState)
+        state.network = self.network
+        state.station_delay = self.station_delay.copy()
+        state.dwell_delay = self.dwell_delay.copy()
+        state.arrive_delay = self.arrive_delay.copy()
+        state.depart_delay = self.depart_delay.copy()
+        state.max_delay = self.max_delay
+        return state
+
+    def update(self, station_delay, from_sec=None, dwell_delay=None):
+        """
+        역별 정차 지연 (+ 구간별 정차 시간 증가) 변경 → 영향받는 구간만 전파해서 갱신, 바뀐 구간 번호 배열 반환
+        from_sec: 이 시각 이전에 도착한 구간은 이미 지난 일로 보고 다시 계산하지 않음
+        dwell_delay: 구간별 정차 시간 증가 배열 (None 이면 기존 값 유지)
+        """
+        net = self.network
+        station_delay = np.asarray(station_delay, dtype=np.int32)
+        changed_stations = np.flatnonzero(station_delay != self.station_delay)
+        self.station_delay = station_delay.copy()
+
+        seeds = net.segments_from(changed_stations)
+        if dwell_delay is not None:
+            dwell_delay = np.asarray(dwell_delay, dtype=np.int32)
+            seeds = np.union1d(seeds, np.flatnonzero(dwell_delay != self.dwell_delay)).astype(np.int32)
+            self.dwell_delay = dwell_delay.copy()
+        if from_sec is not None:
+            seeds = seeds[net.timetable.arrive_sec[seeds] >= from_sec]
+
+        station_delay = self.station_delay.tolist()
+        dwell = memoryview(self.dwell_delay) if self.dwell_delay.any() else None
+        # 루프 안에서는 memoryview 로 원소를 읽고 쓰고 (numpy 원소 접근보다 빠름) 지연 배열에 바로 반영
+        arrive_delay, depart_delay = memoryview(self.arrive_delay), memoryview(self.depart_delay)
+        prev_train, prev_station, next_train, next_station, arrive, depart, from_id, gap = net.views()
+        heap = seeds.tolist()
+        heapq.heapify(heap)
+        queued = set(heap)
+        changed = []
+
+        while heap:
+            s = heapq.heappop(heap)
+            queued.discard(s)
+
+            delay = 0
+            p = prev_train[s]
+            if p >= 0:
+                delay = depart_delay[p]
+            q = prev_station[s]
+            if q >= 0:
+                earliest = depart[q] + depart_delay[q] + gap[s]
+                delay = max(delay, earliest - arrive[s])
+            f = from_id[s]
+            new_depart = delay + (station_delay[f] if f >= 0 else 0) + (dwell[s] if dwell is not None else 0)
+
+            if delay == arrive_delay[s] and new_depart == depart_delay[s]:
+                continue
+            arrive_delay[s] = delay
+            depart_delay[s] = new_depart
+            changed.append(s)
+
+            for nxt in (next_train[s], next_station[s]):
+                if nxt >= 0 and nxt not in queued:
+                    heapq.heappush(heap, nxt)
+                    queued.add(nxt)
+
+        changed = np.array(changed, dtype=np.int32)
+        self.max_delay = int(self.depart_delay.max()) if len(self.depart_delay) else 0
+        return changed
+
+    def active(self, t_sec, week=None, direction=None, line=None):
+        """
+        지연을 반영했을 때 t_sec 에 운행 중인 구간 → (구간 번호, offset, delay)
+        PositionEngine.compute(t_sec, idx, delay=delay, offset=offset) 에 그대로 넘기면 됨
+        """
+        return self.overlapping(t_sec, t_sec, week, direction, line)
+
+    def overlapping(self, t_start, t_end, week=None, direction=None, line=None):
+        """
+        지연을 반영했을 때 [t_start, t_end] 와 운행 시간이 겹치는 구간 → (구간 번호, offset, delay)
+        출발 지연 합계(depart_delay)는 offset + delay
+        """
+        tt = self.network.timetable
+        idx = tt.overlapping(t_start - self.max_delay, t_end, week, direction, line)
+        offset = self.arrive_delay[idx]
+        depart = self.depart_delay[idx]
+        running = (tt.arrive_sec[idx] + offset <= t_end) & (tt.next_arrive_sec[idx] + depart >= t_start)
+        return idx[running], offset[running], (depart - offset)[running]
+
+    def sweep(self, t_start, t_end, step=1, week=None, direction=None, line=None):
+        """
+        active() 를 t_start ~ t_end 구간 전체에 대해 한 번의 훑기로 계산 → (t, 구간 번호, offset, delay) yield
+        """
+        tt = self.network.timetable
+        idx = tt.overlapping(t_start - self.max_delay, t_end, week, direction, line)
+        offset = self.arrive_delay[idx]
+        depart = self.depart_delay[idx]
+        start = tt.arrive_sec[idx] + offset
+        order = np.argsort(start, kind="stable")
+        idx, offset, delay, start = idx[order], offset[order], (depart - offset)[order], start[order]
+        end = tt.next_arrive_sec[idx] + depart[order]
+        for t_sec, live in sweep_active(start, end, t_start, t_end, step):
+            yield t_sec, idx[live], offset[live], delay[live]
+
+    def admit_sec(self, seg):
+        return int(self.network.timetable.arrive_sec[seg]) + int(self.arrive_delay[seg])
+
+    def depart_sec(self, seg):
+        return int(self.network.timetable.depart_sec[seg]) + int(self.depart_delay[seg])
+
+    def arrive_sec(self, seg):
+        """
+        다음역 실제 도착 시각
+        """
+        return int(self.network.timetable.next_arrive_sec[seg]) + int(self.depart_delay[seg])
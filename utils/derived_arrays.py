@@ -0,0 +1,110 @@
+"""
+timetable store 디렉토리에 같이 두는 파생 배열 (PositionEngine, DelayNetwork 등이 시간표로부터 만드는 구간별 배열)
+
+<store>/derived/<이름>-<key>/
+  *.npy        배열 (읽기 전용 mmap 으로 엶)
+  values.json  배열이 아닌 값 (목록, 숫자 등)
+
+- 처음 만든 프로세스가 임시 디렉토리에 다 쓴 뒤 이름을 바꿔서 저장하고, 다음 프로세스(다른 worker, 재시작)는 mmap 으로 열기만 함
+  → worker 가 몇 개든 파생 배열도 시간표 배열처럼 OS 페이지 캐시에 한 벌만 올라감 (worker 별 Private_Dirty 가 늘지 않음)
+- 디렉토리 key 는 시간표 key (store meta.json 해시 - 행 수, 이름 목록, 원본 mtime/크기) + 시간표 밖의 입력 (역 좌표,
+  노선 순서, 파라미터) 해시 - 같은 디렉토리에 store 를 다시 빌드하면 TimetableIndex.save() 가 derived/ 를 지우고,
+  그 사이 이전 시간표로 만든 배열이 다시 저장되더라도 시간표 key 가 달라서 쓰이지 않음
+- store 없이 DB/CSV 에서 바로 읽은 시간표거나 디렉토리에 쓸 수 없으면 그냥 메모리에 만듦
+"""
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+
+DERIVED_DIR = "derived"
+VALUES_FILE = "values.json"
+
+# 파생 배열 계산 방식이 바뀌면 올림 (이전에 저장한 배열은 key 가 달라져서 쓰지 않음)
+DERIVED_VERSION = 1
+
+
+def derived_key(*parts):
+    """
+    입력 값들 → 12자리 해시 (배열은 내용, 나머지는 JSON 표현 기준)
+    """
+    digest = hashlib.sha1(str(DERIVED_VERSION).encode("utf-8"))
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            digest.update(str(part.dtype).encode("utf-8"))
+            digest.update(np.ascontiguousarray(part).tobytes())
+        else:
+            digest.update(json.dumps(part, ensure_ascii=False, sort_keys=True, default=str).encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()[:12]
+
+
+class DerivedArrays:
+    """
+    store 디렉토리의 파생 배열 저장소 (store_dir 가 None 이면 저장하지 않고 매번 만듦)
+    timetable_key: store 시간표를 나타내는 값 - 모든 key 에 섞어서 다른 시간표로 만든 배열은 열지 않음
+    """
+
+    def __init__(self, store_dir=None, timetable_key=""):
+        self.root = os.path.join(store_dir, DERIVED_DIR) if store_dir else None
+        self.timetable_key = timetable_key
+
+    def load_or_build(self, name, key, build):
+        """
+        name/key 로 저장해둔 값 dict (배열은 mmap) - 없으면 build() 결과를 저장한 뒤 mmap 으로 다시 열어서 반환
+        저장할 수 없으면 build() 결과를 그대로 반환
+        """
+        if self.root is None:
+            return build()
+        directory = os.path.join(self.root, f"{name}-{derived_key(self.timetable_key, key)}")
+        values = self._open(directory)
+        if values is not None:
+            return values
+        values = build()
+        try:
+            self._save(directory, values)
+        except OSError:
+            return values
+        return self._open(directory) or values
+
+    @staticmethod
+    def _open(directory):
+        if not os.path.isdir(directory):
+            return None
+        try:
+            with open(os.path.join(directory, VALUES_FILE), encoding="utf-8") as f:
+                values = json.load(f)
+            for file_name in os.listdir(directory):
+                if file_name.endswith(".npy"):
+                    values[file_name[:-4]] = np.load(os.path.join(directory, file_name), mmap_mode="r")
+        except (OSError, ValueError):
+            return None
+        return values
+
+    @staticmethod
+    def _save(directory, values):
+        """
+        임시 디렉토리에 다 쓰고 이름을 바꿈 - 다른 프로세스가 먼저 저장했으면 그쪽을 그대로 둠
+        """
+        parent = os.path.dirname(directory)
+        os.makedirs(parent, exist_ok=True)
+        tmp_dir = os.path.join(parent, f".{os.path.basename(directory)}.{os.getpid()}.tmp")
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            plain = {}
+            for key, value in values.items():
+                if isinstance(value, np.ndarray):
+                    np.save(os.path.join(tmp_dir, f"{key}.npy"), np.ascontiguousarray(value))
+                else:
+                    plain[key] = value
+            with open(os.path.join(tmp_dir, VALUES_FILE), "w", encoding="utf-8") as f:
+                json.dump(plain, f, ensure_ascii=False)
+            try:
+                os.rename(tmp_dir, directory)
+            except OSError:
+                if not os.path.isdir(directory):
+                    raise
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
@@ -0,0 +1,135 @@
+import hashlib
+import threading
+from concurrent.futures import Future
+import time
+from collections import OrderedDict
+
+# 기본 캐시 크기 / 만료 시간
+FRAME_CACHE_SIZE = 2048
+FRAME_CACHE_TTL_SEC = 600
+
+# put() 에서 ttl 을 주지 않았음을 나타내는 값 (None 은 "만료 없음")
+_DEFAULT = object()
+
+
+def congested_key(congested_stations):
+    """
+    혼잡역 집합 → 순서와 무관한 고정 길이 해시 (빈 집합은 "")
+    """
+    if not congested_stations:
+        return ""
+    joined = "\n".join(sorted(str(name) for name in congested_stations))
+    return hashlib.sha1(joined.encode("utf-8")).hexdigest()
+
+
+def frame_key(t_sec, week, direction, line, delay_buffer, congested_stations, fmt="json", regions=(),
+              congestion=False, since=None):
+    """
+    프레임 캐시 key - 날씨 지연이 0 이면 혼잡역은 결과에 영향이 없으므로 빈 집합으로 취급
+    regions: 날씨 지역 id 튜플 (지역 내용은 id 로 고정되므로 id 만으로 충분)
+    congestion: 자동 혼잡도 적용 여부
+    since: {지역 id (혼잡역/날씨는 ""): 적용 시각(초)}
+    """
+    congested = congested_key(congested_stations) if delay_buffer > 0 else ""
+    return (t_sec, week, direction, line, delay_buffer, congested, ",".join(regions), fmt, bool(congestion),
+            tuple(sorted((since or {}).items())))
+
+
+class FrameCache:
+    """
+    프레임 결과를 담아두는 LRU + TTL 캐시 (스레드 안전)
+    - 가장 오래 안 쓴 항목부터 maxsize 를 넘는 만큼 제거
+    - ttl_sec 이 지난 항목은 조회 시 만료 처리 (put 에서 ttl=None 이면 만료 없음)
+    - 같은 key 를 동시에 계산하려는 요청은 먼저 시작한 계산의 Future 를 같이 기다림 (single-flight)
+    """
+
+    def __init__(self, maxsize=FRAME_CACHE_SIZE, ttl_sec=FRAME_CACHE_TTL_SEC):
+        self.maxsize = maxsize
+        self.ttl_sec = ttl_sec
+        self._items = OrderedDict()    # key → (만료 시각 or None, 값)
+        self._inflight = {}            # key → 계산 중인 Future
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.coalesced = 0
+
+    def get(self, key):
+        with self._lock:
+            item = self._items.get(key)
+            if item is not None:
+                expires, value = item
+                if expires is None or expires > time.monotonic():
+                    self._items.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._items[key]
+                self.evictions += 1
+            self.misses += 1
+            return None
+
+    def put(self, key, value, ttl=_DEFAULT):
+        ttl = self.ttl_sec if ttl is _DEFAULT else ttl
+        expires = time.monotonic() + ttl if ttl is not None else None
+        with self._lock:
+            self._items[key] = (expires, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+                self.evictions += 1
+
+    def submit(self, key, compute, executor=None):
+        """
+        key 의 값을 담은 Future 반환
+        - 캐시에 있으면 완료된 Future, 같은 key 를 계산 중이면 그 Future 를 그대로 반환
+        - 없으면 executor 에서 계산 (executor=None 이면 호출한 스레드에서 바로 계산)
+        """
+        value = self.get(key)
+        if value is not None:
+            future = Future()
+            future.set_result(value)
+            return future
+
+        with self._lock:
+            future = self._inflight.get(key)
+            if future is not None:
+                self.coalesced += 1
+                return future
+            future = self._inflight[key] = Future()
+
+        def run():
+            try:
+                value = compute()
+            except BaseException as e:
+                future.set_exception(e)
+            else:
+                self.put(key, value)
+                future.set_result(value)
+            finally:
+                with self._lock:
+                    self._inflight.pop(key, None)
+
+        if executor is None:
+            run()
+        else:
+            executor.submit(run)
+        return future
+
+    def get_or_compute(self, key, compute):
+        return self.submit(key, compute).result()
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                "size": len(self._items),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "coalesced": self.coalesced,
+                "inflight": len(self._inflight),
+            }
@@ -0,0 +1,80 @@
+import json
+import struct
+import zlib
+
+import numpy as np
+
+# 바이너리 프레임 형식
+# 헤더 (20 bytes, little-endian): magic "SUBF", version(u8), padding(3), time_sec(i32), count(u32), dict_version(u32)
+# 열차 레코드 (28 bytes, 4 byte 정렬 → JS 에서 Uint32Array / Uint16Array / Uint8Array 로 바로 읽음)
+BINARY_MIMETYPE = "application/x-subway-frame"
+FRAME_MAGIC = b"SUBF"
+FRAME_VERSION = 1
+HEADER = struct.Struct("<4sB3xiII")
+
+COORD_SCALE = 1_000_000    # 위경도 1e-6 도 단위 정수
+PROGRESS_SCALE = 65535     # 진행률 0~1 → 0~65535
+
+FRAME_DTYPE = np.dtype([
+    ("train_id", "<u4"),
+    ("lat", "<i4"),
+    ("lon", "<i4"),
+    ("total_delay", "<u4"),
+    ("from_id", "<u2"),
+    ("to_id", "<u2"),
+    ("progress", "<u2"),
+    ("delay", "<u2"),
+    ("line_id", "u1"),
+    ("status", "u1"),
+    ("pad", "<u2"),
+])
+
+
+def frame_dictionary(engine):
+    """
+    레코드의 정수 id 를 이름으로 바꾸는 사전 (클라이언트가 한 번만 받아둠)
+    """
+    lines = [None] * len(engine.timetable.line_lookup)
+    for name, code in engine.timetable.line_lookup.items():
+        lines[code] = name
+    dictionary = {
+        "stations": engine.station_names,
+        "trains": engine.train_names,
+        "lines": lines,
+    }
+    dictionary["version"] = zlib.crc32(json.dumps(dictionary, ensure_ascii=False).encode("utf-8"))
+    return dictionary
+
+
+def encode_frame(engine, frame, t_sec, dict_version, total_delay=None):
+    """
+    PositionEngine.compute() 결과를 바이너리 프레임(bytes)으로 인코딩
+    """
+    idx = frame["idx"]
+    records = np.zeros(len(idx), dtype=FRAME_DTYPE)
+
+    from_id = engine.from_id[idx]
+    to_id = engine.to_id[idx]
+    records["train_id"] = engine.train_id[idx]
+    records["line_id"] = engine.timetable.line_code[idx]
+    records["from_id"] = from_id
+    records["to_id"] = np.where(to_id >= 0, to_id, from_id)
+    records["status"] = frame["status"]
+    records["progress"] = np.rint(frame["progress"] * PROGRESS_SCALE)
+    records["lat"] = np.rint(frame["lat"] * COORD_SCALE)
+    records["lon"] = np.rint(frame["lon"] * COORD_SCALE)
+    records["delay"] = frame["delay"]
+    if total_delay is not None:
+        records["total_delay"] = total_delay
+
+    header = HEADER.pack(FRAME_MAGIC, FRAME_VERSION, t_sec, len(records), dict_version)
+    return header + records.tobytes()
+
+
+def wants_binary(format_param, accept_header):
+    """
+    format=bin 파라미터나 Accept 헤더로 바이너리 응답을 요청했는지 확인
+    """
+    if format_param:
+        return format_param == "bin"
+    return BINARY_MIMETYPE in (accept_header or "")
@@ -0,0 +1,164 @@
+"""
+하루 전체 프레임을 미리 계산해서 요일(WEEK_TAG)별로 저장해두는 frame store
+
+    python -m utils.frame_store --db data/preprocessed_timetable.db --out data/frame_store
+
+- 날씨 영향이 없는 기본 시나리오를 1초 단위로 계산해서 컬럼별 .npy 파일로 저장
+- 서버는 np.load(mmap_mode="r") 로 열어서 offsets[t]:offsets[t+1] 구간만 잘라서 응답
+  (여러 worker 가 같은 파일을 열면 OS 페이지 캐시를 공유)
+- 날씨 강도는 혼잡역이 지정되어야 결과가 달라지므로 기본 시나리오는 요일별로 하나만 만든다
+- 위치는 line_orders.json 선로 형상(TrackGeometry)을 따라 계산
+"""
+import argparse
+import json
+import os
+import zlib
+
+import numpy as np
+import pandas as pd
+
+from utils.frame_codec import COORD_SCALE, PROGRESS_SCALE
+from utils.position_engine import PositionEngine
+from utils.station_registry import StationRegistry
+from utils.timetable_index import TimetableIndex
+from utils.track_geometry import TrackGeometry
+
+STORE_VERSION = 2
+STORE_COLUMNS = ("seg", "status", "progress", "lat", "lon")
+
+
+def timetable_fingerprint(timetable):
+    """
+    frame store 의 구간 번호가 현재 시간표와 같은지 확인하기 위한 값
+    """
+    digest = zlib.crc32(timetable.arrive_sec.tobytes())
+    digest = zlib.crc32(timetable.next_arrive_sec.tobytes(), digest)
+    return f"{len(timetable)}-{digest}"
+
+
+def build_week(timetable, engine, week, out_dir):
+    """
+    한 요일(WEEK_TAG)의 하루 전체 프레임을 1초 단위로 계산해서 저장
+    """
+    segments = timetable.select(week=week)
+    if len(segments) == 0:
+        return None
+    t_start = int(timetable.arrive_sec[segments].min())
+    t_end = int(timetable.next_arrive_sec[segments].max()) + 1
+
+    columns = {name: [] for name in STORE_COLUMNS}
+    counts = np.zeros(t_end - t_start, dtype=np.int64)
+    for t_sec in range(t_start, t_end):
+        frame = engine.compute(t_sec, timetable.active(t_sec, week=week))
+        counts[t_sec - t_start] = len(frame["idx"])
+        columns["seg"].append(frame["idx"].astype(np.int32))
+        columns["status"].append(frame["status"])
+        columns["progress"].append(np.rint(frame["progress"] * PROGRESS_SCALE).astype(np.uint16))
+        columns["lat"].append(np.rint(frame["lat"] * COORD_SCALE).astype(np.int32))
+        columns["lon"].append(np.rint(frame["lon"] * COORD_SCALE).astype(np.int32))
+
+    week_dir = os.path.join(out_dir, f"week_{week}")
+    os.makedirs(week_dir, exist_ok=True)
+    offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    np.save(os.path.join(week_dir, "offsets.npy"), offsets)
+    for name, chunks in columns.items():
+        np.save(os.path.join(week_dir, f"{name}.npy"), np.concatenate(chunks))
+
+    return {"t_start": t_start, "t_end": t_end, "rows": int(offsets[-1])}
+
+
+def build_store(timetable, engine, out_dir):
+    os.makedirs(out_dir, exist_ok=True)
+    weeks = {}
+    for week in timetable.week_lookup:
+        info = build_week(timetable, engine, week, out_dir)
+        if info is not None:
+            weeks[week] = info
+            print(f"📦 WEEK_TAG={week}: {info['rows']} rows ({info['t_start']}~{info['t_end']}s)")
+
+    meta = {"version": STORE_VERSION, "fingerprint": timetable_fingerprint(timetable), "weeks": weeks}
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, ensure_ascii=False, indent=2)
+    return meta
+
+
+class FrameStore:
+    """
+    build_store() 로 만든 파일을 mmap 으로 열어서 초 단위 프레임을 잘라주는 읽기 전용 store
+    """
+
+    def __init__(self, store_dir, timetable):
+        with open(os.path.join(store_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != STORE_VERSION or meta.get("fingerprint") != timetable_fingerprint(timetable):
+            raise ValueError("frame store 가 현재 시간표와 맞지 않음 - 다시 빌드 필요")
+
+        self.timetable = timetable
+        self.weeks = {}
+        for week, info in meta["weeks"].items():
+            week_dir = os.path.join(store_dir, f"week_{week}")
+            arrays = {
+                name: np.load(os.path.join(week_dir, f"{name}.npy"), mmap_mode="r")
+                for name in ("offsets",) + STORE_COLUMNS
+            }
+            self.weeks[week] = (info["t_start"], arrays)
+
+    @classmethod
+    def open(cls, store_dir, timetable):
+        """
+        store 가 없거나 시간표와 맞지 않으면 None (호출 측은 직접 계산으로 대체)
+        """
+        try:
+            return cls(store_dir, timetable)
+        except (OSError, ValueError):
+            return None
+
+    def has(self, week):
+        return week in self.weeks
+
+    def frame(self, t_sec, week, direction=None, line=None):
+        """
+        PositionEngine.compute() 와 같은 형식의 프레임 반환 (계산 없이 mmap 슬라이스)
+        """
+        t_start, arrays = self.weeks[week]
+        offsets = arrays["offsets"]
+        row = t_sec - t_start
+        if 0 <= row < len(offsets) - 1:
+            lo, hi = int(offsets[row]), int(offsets[row + 1])
+        else:
+            lo = hi = 0
+
+        seg = arrays["seg"][lo:hi]
+        mask = self.timetable.filter_mask(seg, direction=direction, line=line)
+        seg = seg[mask]
+        return {
+            "idx": seg.astype(np.int64),
+            "status": arrays["status"][lo:hi][mask],
+            "progress": arrays["progress"][lo:hi][mask] / PROGRESS_SCALE,
+            "lat": arrays["lat"][lo:hi][mask] / COORD_SCALE,
+            "lon": arrays["lon"][lo:hi][mask] / COORD_SCALE,
+            "delay": np.zeros(len(seg), dtype=np.int32),
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="하루 전체 기본 시나리오 프레임 미리 계산")
+    parser.add_argument("--db", default=os.path.join("data", "preprocessed_timetable.db"))
+    parser.add_argument("--stations", default=os.path.join("data", "station.csv"))
+    parser.add_argument("--lines", default=os.path.join("data", "line_orders.json"))
+    parser.add_argument("--out", default=os.path.join("data", "frame_store"))
+    args = parser.parse_args()
+
+    df_station = pd.read_csv(args.stations, encoding="utf-8")
+    stations = StationRegistry.from_dataframe(df_station)
+    timetable = TimetableIndex.from_sqlite(args.db)
+    with open(args.lines, encoding="utf-8") as f:
+        line_orders = json.load(f)
+    engine = PositionEngine(timetable, stations)
+    engine.use_geometry(TrackGeometry(engine, line_orders, stations))
+    build_store(timetable, engine, args.out)
+
+
+if __name__ == "__main__":
+    main()
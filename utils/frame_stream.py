@@ -0,0 +1,83 @@
+import json
+
+# 전체 프레임(keyframe)을 보내는 간격 (프레임 수)
+KEYFRAME_INTERVAL = 30
+
+# 이 거리(위경도, 약 10m) 이상 움직였을 때만 위치 변경 전송
+MOVE_THRESHOLD = 1e-4
+
+# 위치 외에 바뀌면 열차 정보 전체를 다시 보내는 항목
+STATE_FIELDS = ("status", "from", "to", "delay", "total_delay")
+
+
+def train_key(train):
+    """
+    열차 key "열차번호_호선" - 열차번호는 호선마다 따로 매기므로 호선까지 포함
+    """
+    return f"{train['train_no']}_{train['line']}"
+
+
+class DeltaEncoder:
+    """
+    구독자 한 명에게 보낸 마지막 상태를 기억하고, 다음 프레임을 keyframe 또는 delta 로 인코딩
+    - keyframe: {"type": "key", "time_sec", "trains": [...]}
+    - delta: {"type": "delta", "time_sec", "added": [...], "updated": [...], "removed": [train_key(), ...]}
+      updated 는 상태가 바뀌었으면 열차 정보 전체, 위치만 바뀌었으면 train_no/line/lat/lon/progress 만 포함
+    """
+
+    def __init__(self, keyframe_interval=KEYFRAME_INTERVAL, threshold=MOVE_THRESHOLD):
+        self.keyframe_interval = keyframe_interval
+        self.threshold = threshold
+        self._sent = {}
+        self._count = 0
+
+    def encode(self, frame):
+        trains = {train_key(train): train for train in frame["trains"]}
+        keyframe = self._count % self.keyframe_interval == 0
+        self._count += 1
+
+        if keyframe:
+            self._sent = dict(trains)
+            return {"type": "key", "time_sec": frame["time_sec"], "trains": frame["trains"]}
+
+        added, updated = [], []
+        for key, train in trains.items():
+            prev = self._sent.get(key)
+            if prev is None:
+                added.append(train)
+                self._sent[key] = train
+            elif any(train.get(field) != prev.get(field) for field in STATE_FIELDS):
+                updated.append(train)
+                self._sent[key] = train
+            elif (abs(train["lat"] - prev["lat"]) >= self.threshold
+                  or abs(train["lon"] - prev["lon"]) >= self.threshold):
+                updated.append({
+                    "train_no": train["train_no"],
+                    "line": train["line"],
+                    "lat": train["lat"],
+                    "lon": train["lon"],
+                    "progress": train["progress"],
+                })
+                self._sent[key] = train
+
+        removed = [key for key in self._sent if key not in trains]
+        for key in removed:
+            del self._sent[key]
+
+        return {
+            "type": "delta",
+            "time_sec": frame["time_sec"],
+            "added": added,
+            "updated": updated,
+            "removed": removed,
+        }
+
+
+def format_sse(payload, event=None):
+    """
+    Server-Sent Events 메시지 문자열 생성
+    """
+    message = f"data: {json.dumps(payload, ensure_ascii=False, separators=(',', ':'))}\n\n"
+    if event:
+        message = f"event: {event}\n" + message
+    return message
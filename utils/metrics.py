@@ -0,0 +1,328 @@
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter as StackCounter
+from contextlib import contextmanager
+
+# Prometheus text exposition 형식
+PROMETHEUS_MIMETYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# 지연 히스토그램 버킷 (초)
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# 프레임당 열차 수 히스토그램 버킷
+TRAIN_COUNT_BUCKETS = (25, 50, 100, 200, 300, 400, 500, 700, 1000)
+
+# 느린 프레임 프로파일러 기본값: 이 시간(ms) 이상 걸린 프레임만 저장 / 스택 샘플 간격 (초)
+PROFILE_SLOW_MS = 100
+PROFILE_INTERVAL_SEC = 0.002
+# slow_ms 하한 (너무 낮으면 모든 프레임이 파일로 남음) / out_dir 에 남겨두는 최대 파일 수 (오래된 것부터 삭제)
+PROFILE_MIN_SLOW_MS = 20
+PROFILE_MAX_FILES = 200
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        if value == float("inf"):
+            return "+Inf"
+        return repr(value)
+    return str(value)
+
+
+class _Metric:
+    """
+    label 값 튜플 → 값 (스레드 안전)
+    fn 이 있으면 값을 저장하지 않고 출력할 때마다 fn() 결과 사용 (숫자 또는 {label 값 튜플: 숫자})
+    """
+
+    kind = "untyped"
+
+    def __init__(self, name, help_text, labelnames=(), fn=None):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self.fn = fn
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels):
+        return tuple(str(labels.get(name, "")) for name in self.labelnames)
+
+    def samples(self):
+        """
+        → [(이름 접미사, [(label, 값), ...], 값), ...]
+        """
+        if self.fn is not None:
+            values = self.fn()
+            values = values if isinstance(values, dict) else {(): values}
+        else:
+            with self._lock:
+                values = dict(self._values)
+        return [("", list(zip(self.labelnames, key)), value) for key, value in sorted(values.items())]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        with self._lock:
+            self._values[self._key(labels)] = value
+
+
+class Histogram(_Metric):
+    """
+    누적 버킷 히스토그램 (le 는 버킷 상한, 마지막은 +Inf) + _sum, _count
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        slot = bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # 버킷별 개수 (마지막 칸은 +Inf), 합계
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][slot] += 1
+            state[1] += value
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        out = []
+        for key, (counts, total) in sorted(values.items()):
+            labels = list(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                out.append(("_bucket", labels + [("le", _format_value(float(bound)))], cumulative))
+            out.append(("_sum", labels, total))
+            out.append(("_count", labels, cumulative))
+        return out
+
+
+class MetricsRegistry:
+    """
+    지표 목록 → Prometheus text 형식 (/metrics 응답)
+    """
+
+    def __init__(self):
+        self._metrics = []
+        self._lock = threading.Lock()
+
+    def _add(self, metric):
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help_text, labelnames=(), fn=None):
+        return self._add(Counter(name, help_text, labelnames, fn))
+
+    def gauge(self, name, help_text, labelnames=(), fn=None):
+        return self._add(Gauge(name, help_text, labelnames, fn))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        with self._lock:
+            metrics = list(self._metrics)
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {_escape(metric.help)}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for suffix, labels, value in metric.samples():
+                lines.append(f"{metric.name}{suffix}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+def _collapsed_stack(frame):
+    """
+    스레드의 현재 frame → 'file:함수;file:함수;...' (바깥 → 안쪽, flamegraph collapsed 형식)
+    """
+    names = []
+    while frame is not None:
+        code = frame.f_code
+        names.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+
+class _ProfileSession:
+    def __init__(self, label):
+        self.label = label
+        self.samples = StackCounter()
+        self.stages = []
+
+
+class SlowFrameProfiler:
+    """
+    느린 프레임 샘플링 프로파일러 (기본 꺼짐, configure() 로 켬)
+    - profile() 블록 동안 샘플링 스레드가 interval_sec 마다 그 스레드의 호출 스택을 모음
+    - 블록이 slow_ms 이상 걸렸으면 out_dir 에 요청 하나당 파일 하나 저장
+      (주석 줄: label/전체 시간/단계별 시간, 나머지: collapsed 스택 + 샘플 수 → flamegraph.pl, speedscope 로 열림)
+    - 빠르게 끝난 요청의 샘플은 버림, 꺼져 있으면 profile() 은 아무것도 하지 않음
+    - 저장한 파일은 max_files 개까지만 남기고 오래된 것부터 지움
+    """
+
+    def __init__(self, out_dir, slow_ms=PROFILE_SLOW_MS, interval_sec=PROFILE_INTERVAL_SEC, enabled=False,
+                 max_files=PROFILE_MAX_FILES):
+        self.out_dir = out_dir
+        self.slow_ms = max(float(slow_ms), PROFILE_MIN_SLOW_MS)
+        self.interval_sec = interval_sec
+        self.enabled = enabled
+        self.max_files = max_files
+        self.written = 0
+        self._sessions = {}          # 스레드 id → _ProfileSession
+        self._wake = threading.Condition()
+        self._thread = None
+
+    def configure(self, enabled=None, slow_ms=None):
+        """
+        켜고 끄기 / 기준 시간 변경 - enabled 는 bool, slow_ms 는 PROFILE_MIN_SLOW_MS 이상의 숫자만 허용
+        (잘못된 값이면 아무것도 바꾸지 않고 TypeError / ValueError)
+        """
+        if enabled is not None and not isinstance(enabled, bool):
+            raise TypeError("enabled 는 true/false")
+        if slow_ms is not None:
+            if isinstance(slow_ms, bool) or not isinstance(slow_ms, (int, float)):
+                raise TypeError("slow_ms 는 숫자")
+            if not slow_ms >= PROFILE_MIN_SLOW_MS:
+                raise ValueError(f"slow_ms 는 {PROFILE_MIN_SLOW_MS} 이상")
+            self.slow_ms = float(slow_ms)
+        if enabled is not None:
+            self.enabled = enabled
+        return self.status()
+
+    def status(self):
+        return {
+            "enabled": self.enabled, "slow_ms": self.slow_ms, "interval_ms": self.interval_sec * 1000,
+            "out_dir": self.out_dir, "written": self.written, "max_files": self.max_files,
+        }
+
+    @contextmanager
+    def profile(self, label):
+        ident = threading.get_ident()
+        # 꺼져 있거나 이미 바깥 블록에서 프로파일 중이면 그대로 실행
+        if not self.enabled or ident in self._sessions:
+            yield
+            return
+
+        session = _ProfileSession(label)
+        with self._wake:
+            self._sessions[ident] = session
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._sample_loop, name="frame-profiler", daemon=True)
+                self._thread.start()
+            self._wake.notify()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            with self._wake:
+                self._sessions.pop(ident, None)
+            if elapsed_ms >= self.slow_ms:
+                self._write(session, elapsed_ms)
+
+    def note(self, stage, elapsed_sec):
+        """
+        지금 스레드가 프로파일 중이면 단계 시간을 기록 (StageTimer.span 이 호출)
+        """
+        session = self._sessions.get(threading.get_ident())
+        if session is not None:
+            session.stages.append((stage, elapsed_sec))
+
+    def _sample_loop(self):
+        while True:
+            with self._wake:
+                while not self._sessions:
+                    self._wake.wait()
+                sessions = list(self._sessions.items())
+            frames = sys._current_frames()
+            for ident, session in sessions:
+                frame = frames.get(ident)
+                if frame is not None:
+                    session.samples[_collapsed_stack(frame)] += 1
+            del frames
+            time.sleep(self.interval_sec)
+
+    def _write(self, session, elapsed_ms):
+        os.makedirs(self.out_dir, exist_ok=True)
+        with self._wake:
+            self.written += 1
+            seq = self.written
+        slug = re.sub(r"[^0-9A-Za-z_.=-]+", "_", session.label)[:80]
+        path = os.path.join(
+            self.out_dir, f"{time.strftime('%Y%m%d-%H%M%S')}-{seq:05d}-{elapsed_ms:.0f}ms-{slug}.txt"
+        )
+        lines = [f"# {session.label}", f"# elapsed_ms {elapsed_ms:.3f}"]
+        lines += [f"# stage {stage} {elapsed * 1000:.3f}ms" for stage, elapsed in session.stages]
+        lines += [f"{stack} {count}" for stack, count in session.samples.most_common()]
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines) + "\n")
+        self._prune()
+        return path
+
+    def _prune(self):
+        """
+        out_dir 의 프로파일 파일을 max_files 개까지만 남김 (파일 이름이 저장 시각 순)
+        """
+        try:
+            names = sorted(name for name in os.listdir(self.out_dir) if name.endswith(".txt"))
+        except OSError:
+            return
+        for name in names[:max(len(names) - self.max_files, 0)]:
+            try:
+                os.remove(os.path.join(self.out_dir, name))
+            except OSError:
+                pass
+
+
+class StageTimer:
+    """
+    프레임 파이프라인 단계별 시간 → 단계 이름을 label 로 히스토그램에 기록
+    프로파일 중인 요청이면 단계 시간을 프로파일 파일에도 같이 적음
+    """
+
+    def __init__(self, histogram, profiler=None):
+        self.histogram = histogram
+        self.profiler = profiler
+
+    @contextmanager
+    def span(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.histogram.observe(elapsed, stage=stage)
+            if self.profiler is not None:
+                self.profiler.note(stage, elapsed)
@@ -0,0 +1,232 @@
+import numpy as np
+
+from utils.derived_arrays import derived_key
+from utils.station_registry import StationRegistry, normalize_station_name
+
+# 열차 상태 코드
+STATUS_STOPPED = 0
+STATUS_MOVING = 1
+STATUS_TERMINAL = 2
+STATUS_NAMES = ["stopped", "moving", "terminal"]
+
+
+class PositionEngine:
+    """
+    TimetableIndex 의 구간 배열을 그대로 사용하여 열차 상태/진행률/위경도를 한 번에 계산하는 엔진
+    - 역 이름은 시작 시 정수 id 로 바꾸고, 구간별 출발/도착 역 좌표를 배열로 미리 만들어 둠
+    - 한 프레임 계산은 행 단위 반복 없이 NumPy 배열 연산으로만 처리
+    """
+
+    def __init__(self, timetable, station_dict=None):
+        """
+        station_dict: StationRegistry 또는 {역명: (위도, 경도)} - 없으면 timetable store 에 같이 저장된 역 좌표 사용
+        StationRegistry 면 구간 좌표를 (호선, 역명) 으로 찾으므로 환승역도 호선별 좌표를 사용
+        """
+        self.timetable = timetable
+
+        # 역/열차 id 는 시간표 코드를 그대로 사용 (다음역이 없으면 -1)
+        self.station_names = timetable.station_names
+        self.station_ids = {name: code for code, name in enumerate(self.station_names)}
+        # 정규화 이름 → 역 코드 목록 (StationRegistry 와 같은 규칙 - '서울역' / '서울' 처럼 표기가 달라도 같은 역)
+        self._normalized_ids = {}
+        for code, name in enumerate(self.station_names):
+            self._normalized_ids.setdefault(normalize_station_name(name), []).append(code)
+        self.from_id = timetable.station_code
+        self.to_id = timetable.next_station_code
+        self.train_id = timetable.train_code
+        self.train_names = timetable.train_names
+
+        # 좌표를 찾지 못한 (호선, 역명, 행 수) 목록
+        self.unmatched = []
+
+        if station_dict is None:
+            if timetable.station_lat is None:
+                raise ValueError("역 좌표가 없음 - station_dict 를 넘기거나 timetable store 를 다시 빌드 필요")
+            self.station_lat = np.asarray(timetable.station_lat, dtype=np.float64)
+            self.station_lon = np.asarray(timetable.station_lon, dtype=np.float64)
+        else:
+            coords = np.array(
+                [station_dict.get(name, (np.nan, np.nan)) for name in self.station_names],
+                dtype=np.float64,
+            ).reshape(-1, 2)
+            self.station_lat = coords[:, 0]
+            self.station_lon = coords[:, 1]
+
+        # 선로 형상 (use_geometry() 로 설정하면 역 사이 직선 대신 노선을 따라 이동)
+        self.geometry = None
+
+        # 구간별 좌표는 시작 시 한 번만 모아둠 (timetable store 가 있으면 store 에 저장해두고 worker 끼리 mmap 공유)
+        if isinstance(station_dict, StationRegistry):
+            key = derived_key("registry", station_dict.names, station_dict.lines, station_dict.lat, station_dict.lon)
+            derived = timetable.derived.load_or_build(
+                "position_engine", key, lambda: self._resolve_registry(station_dict)
+            )
+            self.from_sid, self.to_sid = derived["from_sid"], derived["to_sid"]
+            self.unmatched = [tuple(item) for item in derived["unmatched"]]
+        else:
+            key = derived_key("stations", self.station_lat, self.station_lon)
+            derived = timetable.derived.load_or_build("position_engine", key, lambda: {
+                "from_lat": self._gather(self.station_lat, self.from_id),
+                "from_lon": self._gather(self.station_lon, self.from_id),
+                "to_lat": self._gather(self.station_lat, self.to_id),
+                "to_lon": self._gather(self.station_lon, self.to_id),
+            })
+        self.from_lat, self.from_lon = derived["from_lat"], derived["from_lon"]
+        self.to_lat, self.to_lon = derived["to_lat"], derived["to_lon"]
+
+    def _resolve_registry(self, registry):
+        """
+        (호선, 역명) → 역 id 로 변환해두고 id 로 좌표를 모음 (환승역도 호선별 좌표)
+        """
+        from_sid, to_sid, unmatched = registry.resolve_timetable(self.timetable)
+        return {
+            "from_sid": from_sid, "to_sid": to_sid, "unmatched": unmatched,
+            "from_lat": self._gather(registry.lat, from_sid), "from_lon": self._gather(registry.lon, from_sid),
+            "to_lat": self._gather(registry.lat, to_sid), "to_lon": self._gather(registry.lon, to_sid),
+        }
+
+    @staticmethod
+    def _gather(values, ids):
+        """
+        id 배열로 값을 모으되 id 가 -1 (없음) 이면 NaN
+        """
+        out = np.full(len(ids), np.nan)
+        known = ids >= 0
+        out[known] = values[ids[known]]
+        return out
+
+    def use_geometry(self, geometry):
+        """
+        TrackGeometry 설정 - 이동 중 위치를 거리 기준으로 선로를 따라 계산
+        """
+        self.geometry = geometry
+
+    def station_codes(self, name):
+        """
+        역 이름 → 시간표 역 코드 목록 (정규화 이름으로 비교, 없으면 [])
+        """
+        return self._normalized_ids.get(normalize_station_name(name), [])
+
+    def congested_mask(self, congested_stations):
+        """
+        혼잡역 이름 집합 (station.csv / 클라이언트 표기 그대로) → 역 id 기준 bool 마스크
+        """
+        mask = np.zeros(len(self.station_names), dtype=bool)
+        for name in congested_stations:
+            mask[self.station_codes(name)] = True
+        return mask
+
+    def region_delay(self, regions):
+        """
+        날씨 지역 목록 → 역 id 별 정차 지연(초) 배열 (여러 지역에 걸치면 큰 값)
+        """
+        station_delay = np.zeros(len(self.station_names), dtype=np.int32)
+        for region in regions:
+            mask = self.congested_mask(region["stations"])
+            station_delay[mask] = np.maximum(station_delay[mask], region["delay"])
+        return station_delay
+
+    def compute(self, t_sec, idx, congested=None, delay_buffer=0, delay=None, station_delay=None, offset=None):
+        """
+        t_sec 시각에 idx 구간들의 상태/진행률/위치 계산
+        congested: congested_mask() 결과 (혼잡역에서 출발하는 구간만 delay_buffer 만큼 출발 지연)
+        station_delay: region_delay() 결과 (출발역 id 별 지연, congested 대신 사용)
+        delay: 구간별 출발 지연(초)을 직접 넘길 때 사용 (가장 우선)
+        offset: 구간 전체를 미루는 전파 지연(초) - 주면 delay(정차 지연)만큼 다음 도착도 함께 늦어짐
+        반환값: 배열 dict (idx, pos, status, progress, lat, lon, delay) - pos 는 입력 idx 에서의 위치
+        """
+        tt = self.timetable
+        idx = np.asarray(idx, dtype=np.int64)
+
+        if delay is not None:
+            delay = np.asarray(delay, dtype=np.int32)
+        elif station_delay is not None:
+            from_id = self.from_id[idx]
+            delay = np.where(from_id >= 0, station_delay[from_id], 0).astype(np.int32)
+        else:
+            delay = np.zeros(len(idx), dtype=np.int32)
+            if congested is not None and delay_buffer > 0:
+                delay[congested[self.from_id[idx]]] = delay_buffer
+
+        arrive = tt.arrive_sec[idx]
+        depart = tt.depart_sec[idx] + delay
+        next_arrive = tt.next_arrive_sec[idx]
+        if offset is not None:
+            # 전파 지연이 있으면 운행 시간은 그대로 두고 구간 전체를 미룸
+            arrive = arrive + offset
+            depart = depart + offset
+            next_arrive = next_arrive + offset + delay
+
+        lat1, lon1 = self.from_lat[idx], self.from_lon[idx]
+        lat2, lon2 = self.to_lat[idx], self.to_lon[idx]
+        has_next = self.to_id[idx] >= 0
+
+        stopped = (arrive <= t_sec) & (t_sec < depart)
+        moving = ~stopped & (depart <= t_sec) & has_next & ~np.isnan(lat2)
+        terminal = ~stopped & ~has_next
+
+        total = (next_arrive - depart).astype(np.float64)
+        passed = (t_sec - depart).astype(np.float64)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            progress = np.where(total > 0, np.clip(passed / total, 0, 1), 1.0)
+        progress = np.where(moving, progress, 0.0)
+
+        if self.geometry is not None:
+            lat_track, lon_track = self.geometry.locate(idx, progress)
+        else:
+            lat_track, lon_track = lat1 + (lat2 - lat1) * progress, lon1 + (lon2 - lon1) * progress
+        lat = np.where(moving, lat_track, lat1)
+        lon = np.where(moving, lon_track, lon1)
+
+        keep = (stopped | moving | terminal) & ~np.isnan(lat1)
+        status = np.where(stopped, STATUS_STOPPED, np.where(moving, STATUS_MOVING, STATUS_TERMINAL))
+
+        return {
+            "idx": idx[keep],
+            "pos": np.flatnonzero(keep),
+            "status": status[keep].astype(np.int8),
+            "progress": progress[keep],
+            "lat": lat[keep],
+            "lon": lon[keep],
+            "delay": delay[keep],
+        }
+
+    def skipped_rows(self, idx, frame):
+        """
+        compute(t, idx) 에서 프레임에 들어가지 못한 구간 수 → (좌표 없음, 운행 중 아님)
+        좌표 없음: 출발역 좌표가 없거나, 다음역 좌표가 없어 이동 위치를 계산하지 못한 구간
+        """
+        dropped = np.ones(len(idx), dtype=bool)
+        dropped[frame["pos"]] = False
+        idx = np.asarray(idx, dtype=np.int64)[dropped]
+        no_coords = np.isnan(self.from_lat[idx]) | ((self.to_id[idx] >= 0) & np.isnan(self.to_lat[idx]))
+        n_no_coords = int(no_coords.sum())
+        return n_no_coords, len(idx) - n_no_coords
+
+    def to_records(self, frame):
+        """
+        compute() 결과를 /api/simulation_data 응답 형식 (dict 리스트) 으로 변환
+        """
+        tt = self.timetable
+        idx = frame["idx"]
+        names = self.station_names
+        from_ids = self.from_id[idx].tolist()
+        to_names = [names[to] if to >= 0 else names[fr] for fr, to in zip(from_ids, self.to_id[idx].tolist())]
+        return [
+            {
+                "train_no": self.train_names[train],
+                "line": tt.line_names[line],
+                "from": names[from_id] if from_id >= 0 else None,
+                "to": to_station,
+                "progress": progress,
+                "status": STATUS_NAMES[status],
+                "lat": lat,
+                "lon": lon,
+                "delay": delay,
+            }
+            for train, line, from_id, to_station, progress, status, lat, lon, delay in zip(
+                self.train_id[idx].tolist(), tt.line_code[idx].tolist(), from_ids, to_names,
+                frame["progress"].tolist(), frame["status"].tolist(),
+                frame["lat"].tolist(), frame["lon"].tolist(), frame["delay"].tolist(),
+            )
+        ]
@@ -0,0 +1,279 @@
+"""
+날씨 지연 시나리오 Monte Carlo 실행기
+
+    python -m utils.scenario_runner --weather 강함 --bbox 37.55,126.96,37.58,127.00 \
+        --start 07:00:00 --end 10:00:00 --weekday 3 --line 02호선 --runs 1000 --out results
+
+- 시나리오 = (날씨 강도, 영향 지역, 시작/끝 시각, 요일, 호선) - --grid JSON 파일로 여러 개 지정 가능
+- 각 실행마다 정차 시간에 무작위 변동(+날씨 지역 지연)을 주고 열차별/역별 누적 지연을 집계
+  (열차는 DelayNetwork 와 같이 열차번호 + 호선 + 요일 + 방향이 모두 같아야 같은 열차)
+- 실행 묶음(chunk)을 ProcessPoolExecutor 로 나눠 돌리고, 시간표 배열은 .npy 파일을 mmap 으로 열어 worker 끼리 공유
+- 결과는 열차별/역별 지연 분포 (평균, p50, p90, p99, 최대) 를 CSV 또는 Parquet 로 저장
+"""
+import argparse
+import itertools
+import json
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from utils.position_engine import PositionEngine
+from utils.simulation_utils import WEATHER_DELAY, parse_time_to_seconds
+from utils.spatial_index import StationGrid
+from utils.station_registry import StationRegistry
+from utils.timetable_index import TimetableIndex
+
+# 정차 시간 변동 (초) - 날씨 지연이 있으면 지연의 절반만큼 표준편차가 커짐
+DWELL_JITTER_SEC = 5
+WEATHER_JITTER_RATIO = 0.5
+# 변동은 평균 0 을 유지하도록 ±(표준편차 × 이 값) 에서 대칭으로 자름 (날씨 없음이면 평균 지연 0)
+JITTER_CLIP_SIGMA = 3
+
+# worker 한 번에 처리하는 실행 수
+RUNS_PER_CHUNK = 50
+
+SHARED_ARRAYS = ("arrive_sec", "depart_sec", "from_id", "train_id", "week_code", "inout_code", "line_code")
+# 열차 하나를 구분하는 배열 (열차번호는 호선마다 따로 매기고, 요일/방향이 다르면 다른 운행)
+TRAIN_KEY = ("train_id", "line_code", "week_code", "inout_code")
+PERCENTILES = (50, 90, 99)
+
+_shared = {}
+
+
+def _init_worker(array_dir):
+    """
+    worker 시작 시 공유 배열을 읽기 전용 mmap 으로 열기 (프로세스마다 복사하지 않음)
+    """
+    for name in SHARED_ARRAYS:
+        _shared[name] = np.load(os.path.join(array_dir, f"{name}.npy"), mmap_mode="r")
+
+
+def scenario_segments(arrays, codes, start_sec, end_sec):
+    """
+    시나리오에 포함되는 구간 번호 (요일/방향/호선 코드 일치 + 시간 창 안에서 정차)
+    codes: (week_code, inout_code, line_code) - None 이면 필터 없음
+    """
+    mask = (arrays["arrive_sec"] >= start_sec) & (arrays["depart_sec"] <= end_sec)
+    for name, code in zip(("week_code", "inout_code", "line_code"), codes):
+        if code is not None:
+            mask &= arrays[name] == code
+    return np.flatnonzero(mask)
+
+
+def train_keys(arrays, segments):
+    """
+    구간 번호 → (열차 키 행렬 (열차 × TRAIN_KEY), 구간별 열차 번호 0..n-1)
+    """
+    keys = np.column_stack([arrays[name][segments] for name in TRAIN_KEY])
+    unique, inverse = np.unique(keys, axis=0, return_inverse=True)
+    return unique, inverse.ravel()
+
+
+def _run_chunk(args):
+    """
+    시나리오를 runs 번 무작위 실행 → (runs × 열차) / (runs × 역) 누적 지연 행렬
+    열차/역은 시나리오 안에서 np.unique 순서로 0..n-1 번호를 다시 매김
+    """
+    codes, start_sec, end_sec, station_delay, runs, seed = args
+    segments = scenario_segments(_shared, codes, start_sec, end_sec)
+    _, train_local = train_keys(_shared, segments)
+    from_id = _shared["from_id"][segments]
+    _, station_local = np.unique(from_id, return_inverse=True)
+    n_trains = int(train_local.max()) + 1 if len(segments) else 0
+    n_stations = int(station_local.max()) + 1 if len(segments) else 0
+
+    rng = np.random.default_rng(seed)
+    base = np.where(from_id >= 0, station_delay[np.maximum(from_id, 0)], 0).astype(np.float64)
+    scale = DWELL_JITTER_SEC + WEATHER_JITTER_RATIO * base
+    # 합계가 아니라 변동만 자름 - 합계를 0 에서 자르면 날씨가 없어도 평균이 양수로 치우침
+    noise = np.clip(rng.normal(0.0, 1.0, size=(runs, len(segments))), -JITTER_CLIP_SIGMA, JITTER_CLIP_SIGMA)
+    extra = base + noise * scale
+
+    offsets = np.arange(runs)[:, None]
+    train_totals = np.bincount(
+        (train_local + offsets * n_trains).ravel(), weights=extra.ravel(), minlength=runs * n_trains
+    ).reshape(runs, n_trains)
+    station_totals = np.bincount(
+        (station_local + offsets * n_stations).ravel(), weights=extra.ravel(), minlength=runs * n_stations
+    ).reshape(runs, n_stations)
+    return train_totals, station_totals
+
+
+def _summarize(totals, columns, scenario_name):
+    """
+    (runs × 대상) 지연 행렬 → 대상별 분포 요약 DataFrame
+    columns: 대상을 나타내는 열 {열 이름: 값 목록}
+    """
+    summary = pd.DataFrame({
+        "scenario": scenario_name,
+        **columns,
+        "mean_delay_sec": totals.mean(axis=0),
+        "max_delay_sec": totals.max(axis=0),
+    })
+    for q, values in zip(PERCENTILES, np.percentile(totals, PERCENTILES, axis=0)):
+        summary[f"p{q}_delay_sec"] = values
+    return summary
+
+
+def scenario_window(scenario):
+    """
+    시나리오 시작/끝 시각 → (start_sec, end_sec) - 형식이 잘못됐거나 끝이 시작보다 이르면 ValueError
+    """
+    start_sec = parse_time_to_seconds(scenario.get("start"))
+    end_sec = parse_time_to_seconds(scenario.get("end"))
+    if start_sec is None or end_sec is None:
+        raise ValueError(f"시각 형식 오류 (HH:MM:SS): start={scenario.get('start')!r}, end={scenario.get('end')!r}")
+    if end_sec < start_sec:
+        raise ValueError(f"끝 시각이 시작 시각보다 이름: {scenario['start']} > {scenario['end']}")
+    return start_sec, end_sec
+
+
+def run_scenario(timetable, engine, grid, scenario, executor, runs, seed):
+    """
+    시나리오 하나 실행 → (열차별 요약, 역별 요약)
+    """
+    start_sec, end_sec = scenario_window(scenario)
+    codes = (
+        timetable.filter_code(timetable.week_lookup, scenario.get("weekday")),
+        timetable.filter_code(timetable.inout_lookup, scenario.get("direction")),
+        timetable.filter_code(timetable.line_lookup, scenario.get("line")),
+    )
+
+    stations = set(scenario.get("stations", ()))
+    if scenario.get("bbox"):
+        stations |= grid.query_bbox(*scenario["bbox"])
+    delay = WEATHER_DELAY.get(scenario.get("weather", "none"), 0)
+    station_delay = engine.region_delay([{"stations": stations, "delay": delay}])
+
+    n_chunks = (runs + RUNS_PER_CHUNK - 1) // RUNS_PER_CHUNK
+    chunks = [
+        (codes, start_sec, end_sec, station_delay, min(RUNS_PER_CHUNK, runs - i * RUNS_PER_CHUNK), child)
+        for i, child in enumerate(np.random.SeedSequence(seed).spawn(n_chunks))
+    ]
+    results = list(executor.map(_run_chunk, chunks))
+    train_totals = np.vstack([r[0] for r in results])
+    station_totals = np.vstack([r[1] for r in results])
+
+    # worker 와 같은 방식으로 구간을 골라서 열차/역 이름 매칭
+    arrays = {
+        "arrive_sec": timetable.arrive_sec, "depart_sec": timetable.depart_sec, "train_id": engine.train_id,
+        "week_code": timetable.week_code, "inout_code": timetable.inout_code, "line_code": timetable.line_code,
+    }
+    segments = scenario_segments(arrays, codes, start_sec, end_sec)
+    trains, _ = train_keys(arrays, segments)
+    station_codes = np.unique(engine.from_id[segments])
+
+    name = scenario.get("name") or f"{scenario.get('weather', 'none')}_{scenario['start']}_{scenario['end']}"
+    week_names, inout_names = list(timetable.week_lookup), list(timetable.inout_lookup)
+    train_columns = {
+        "train_no": [engine.train_names[code] for code in trains[:, 0]],
+        "line": [timetable.line_names[code] for code in trains[:, 1]],
+        "weekday": [week_names[code] for code in trains[:, 2]],
+        "direction": [inout_names[code] for code in trains[:, 3]],
+    }
+    station_names = [engine.station_names[code] if code >= 0 else None for code in station_codes]
+    return (
+        _summarize(train_totals, train_columns, name),
+        _summarize(station_totals, {"station": station_names}, name),
+    )
+
+
+def save_shared_arrays(timetable, engine, array_dir):
+    """
+    worker 가 mmap 으로 열 수 있도록 시간표 배열을 .npy 로 저장
+    """
+    arrays = {
+        "arrive_sec": timetable.arrive_sec,
+        "depart_sec": timetable.depart_sec,
+        "from_id": engine.from_id,
+        "train_id": engine.train_id,
+        "week_code": timetable.week_code,
+        "inout_code": timetable.inout_code,
+        "line_code": timetable.line_code,
+    }
+    for name, values in arrays.items():
+        np.save(os.path.join(array_dir, f"{name}.npy"), values)
+
+
+def write_table(df, path):
+    if path.endswith(".parquet"):
+        try:
+            df.to_parquet(path, index=False)
+        except ImportError:
+            raise SystemExit("Parquet 저장에는 pyarrow 가 필요함 (pip install pyarrow) - --format csv 사용 가능")
+    else:
+        df.to_csv(path, index=False, encoding="utf-8-sig")
+
+
+def load_scenarios(args):
+    """
+    --grid JSON 파일, 또는 --weather / --bbox 조합으로 시나리오 목록 생성
+    """
+    if args.grid:
+        with open(args.grid, encoding="utf-8") as f:
+            return json.load(f)
+    bboxes = [[float(v) for v in bbox.split(",")] for bbox in args.bbox] or [None]
+    return [
+        {
+            "weather": weather, "bbox": bbox, "start": args.start, "end": args.end,
+            "weekday": args.weekday, "direction": args.direction, "line": args.line,
+        }
+        for weather, bbox in itertools.product(args.weather, bboxes)
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="날씨 지연 시나리오 Monte Carlo 실행")
+    parser.add_argument("--db", default=os.path.join("data", "preprocessed_timetable.db"))
+    parser.add_argument("--stations", default=os.path.join("data", "station.csv"))
+    parser.add_argument("--grid", help="시나리오 목록 JSON 파일")
+    parser.add_argument("--weather", nargs="+", default=["강함"], choices=list(WEATHER_DELAY))
+    parser.add_argument("--bbox", nargs="*", default=[], help="남,서,북,동 (여러 개 가능)")
+    parser.add_argument("--start", default="07:00:00")
+    parser.add_argument("--end", default="10:00:00")
+    parser.add_argument("--weekday", default="3")
+    parser.add_argument("--direction", default="전체")
+    parser.add_argument("--line", default="전체")
+    parser.add_argument("--runs", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--out", default="results")
+    args = parser.parse_args()
+    scenarios = load_scenarios(args)
+    # 잘못된 시나리오는 시간표를 읽기 전에 한꺼번에 걸러서 종료 (앞 시나리오 결과를 버리지 않도록)
+    for i, scenario in enumerate(scenarios):
+        try:
+            scenario_window(scenario)
+        except ValueError as e:
+            raise SystemExit(f"시나리오 {scenario.get('name') or i}: {e}")
+
+    df_station = pd.read_csv(args.stations, encoding="utf-8")
+    registry = StationRegistry.from_dataframe(df_station)
+    timetable = TimetableIndex.from_sqlite(args.db)
+    engine = PositionEngine(timetable, registry)
+    grid = StationGrid.from_registry(registry)
+
+    os.makedirs(args.out, exist_ok=True)
+    train_tables, station_tables = [], []
+    with tempfile.TemporaryDirectory() as array_dir:
+        save_shared_arrays(timetable, engine, array_dir)
+        with ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(array_dir,)) as executor:
+            for i, scenario in enumerate(scenarios):
+                trains, stations = run_scenario(
+                    timetable, engine, grid, scenario, executor, args.runs, args.seed + i
+                )
+                train_tables.append(trains)
+                station_tables.append(stations)
+                print(f"🌨️ {trains['scenario'].iloc[0] if len(trains) else i}: "
+                      f"열차 {len(trains)}대, 평균 누적 지연 {trains['mean_delay_sec'].mean():.1f}초")
+
+    write_table(pd.concat(train_tables, ignore_index=True), os.path.join(args.out, f"train_delay.{args.format}"))
+    write_table(pd.concat(station_tables, ignore_index=True), os.path.join(args.out, f"station_delay.{args.format}"))
+
+
+if __name__ == "__main__":
+    main()
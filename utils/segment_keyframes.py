@@ -0,0 +1,50 @@
+import numpy as np
+
+# 형상 좌표 소수점 자리 (1e-6 도 ≈ 0.1m) / 정규화 누적 거리 자리
+COORD_DECIMALS = 6
+CUM_DECIMALS = 5
+
+
+def geometry_payload(geometry):
+    """
+    TrackGeometry → {"paths": [[위도, 경도, 누적 비율, 위도, 경도, 누적 비율, ...], ...]} (형상 id 순서)
+    좌표가 없는(NaN) 꼭짓점 값은 null - 클라이언트는 그 구간의 이동 위치를 그리지 않음 (PositionEngine 과 같음)
+    """
+    values = np.column_stack([
+        np.round(geometry.vertex_lat, COORD_DECIMALS),
+        np.round(geometry.vertex_lon, COORD_DECIMALS),
+        np.round(geometry.vertex_cum, CUM_DECIMALS),
+    ]).ravel().tolist()
+    values = [None if value != value else value for value in values]
+    offsets = (geometry.offsets * 3).tolist()
+    return {"paths": [values[lo:hi] for lo, hi in zip(offsets[:-1], offsets[1:])]}
+
+
+def segment_keyframes(engine, idx, offset=None, depart_delay=None):
+    """
+    구간 번호 배열 → 클라이언트 보간용 keyframe (컬럼별 목록)
+    - 시각은 지연을 반영한 값: 도착 arrive(+offset), 출발 depart(+depart_delay), 다음역 도착 next_arrive(+depart_delay)
+    - 클라이언트는 arrive ~ depart 는 출발역에 정차, depart ~ next_arrive 는 형상(geom)을 따라 이동으로 그림
+    - 출발역 좌표가 없는 구간은 제외 (PositionEngine.compute 에서도 그리지 않음)
+    - engine 에 TrackGeometry 가 설정되어 있어야 함 (geom 은 geometry_payload() 의 형상 id)
+    offset / depart_delay: DelayState.overlapping() 결과 (없으면 시간표 그대로)
+    """
+    tt = engine.timetable
+    idx = np.asarray(idx, dtype=np.int64)
+    offset = np.zeros(len(idx), dtype=np.int32) if offset is None else np.asarray(offset)
+    depart_delay = np.zeros(len(idx), dtype=np.int32) if depart_delay is None else np.asarray(depart_delay)
+
+    keep = ~np.isnan(engine.from_lat[idx])
+    idx, offset, depart_delay = idx[keep], offset[keep], depart_delay[keep]
+    return {
+        "id": idx.tolist(),
+        "train": engine.train_id[idx].tolist(),
+        "line": tt.line_code[idx].tolist(),
+        "from": engine.from_id[idx].tolist(),
+        "to": engine.to_id[idx].tolist(),
+        "geom": engine.geometry.seg_geom[idx].tolist(),
+        "arrive": (tt.arrive_sec[idx] + offset).tolist(),
+        "depart": (tt.depart_sec[idx] + depart_delay).tolist(),
+        "next_arrive": (tt.next_arrive_sec[idx] + depart_delay).tolist(),
+        "delay": depart_delay.tolist(),
+    }
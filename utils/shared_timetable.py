@@ -0,0 +1,167 @@
+"""
+여러 worker 프로세스가 같이 쓰는 세대(generation)별 timetable store
+
+    python -m utils.shared_timetable --db data/preprocessed_timetable.db --root data/timetable_store
+
+root/
+  CURRENT                   지금 쓰는 세대 이름 (임시 파일 → os.replace 로 원자적으로 교체)
+  20250101-093000-<지문>/   TimetableIndex.save() 결과 (구간 배열 + 버킷 + 역 좌표, meta.json 에 세대 이름)
+
+- 시간표/역 좌표 배열은 master(또는 이 CLI)가 한 번만 만들고, worker 는 attach() 로 읽기 전용 mmap 만 열기 때문에
+  worker 가 몇 개든 배열은 OS 페이지 캐시에 한 벌만 올라감
+- 새 시간표는 새 세대 디렉토리를 다 쓴 뒤에 CURRENT 를 바꾸므로, 반쯤 쓰인 store 를 여는 worker 는 없음
+  이미 떠 있는 worker 는 처음 연 세대를 계속 쓰고, 새로 뜨는 worker 부터 새 세대를 씀 (serve_ver_4.py 가 하나씩 교체)
+- 지난 세대는 KEEP_GENERATIONS 개까지만 남기고 지움
+  (지워도 이미 mmap 으로 열어둔 worker 는 파일을 닫을 때까지 그대로 읽을 수 있음)
+- CURRENT 가 없는 root 는 python -m utils.timetable_store 로 만든 단일 store 로 보고 그대로 엶
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+
+import pandas as pd
+
+from utils.frame_store import timetable_fingerprint
+from utils.station_registry import StationRegistry
+from utils.timetable_index import TimetableIndex, source_signature
+from utils.timetable_store import build, store_bytes
+
+CURRENT_FILE = "CURRENT"
+
+# 남겨둘 세대 수 (현재 세대 포함) - CURRENT 를 읽은 직후 교체되어도 그 세대가 바로 지워지지 않도록 여유를 둠
+KEEP_GENERATIONS = 3
+
+
+def current_generation(root):
+    """
+    CURRENT 가 가리키는 세대 이름 (세대 방식 store 가 아니면 None)
+    """
+    try:
+        with open(os.path.join(root, CURRENT_FILE), encoding="utf-8") as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def generation_meta(root, generation=None):
+    """
+    세대의 meta.json (generation 이 None 이면 현재 세대, store 가 없으면 None)
+    """
+    generation = generation or current_generation(root)
+    store_dir = os.path.join(root, generation) if generation else root
+    try:
+        with open(os.path.join(store_dir, "meta.json"), encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def generations(root):
+    """
+    root 아래 세대 이름 목록 (오래된 순, 이름이 시각으로 시작하므로 이름 순)
+    """
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        name for name in os.listdir(root)
+        if not name.startswith(".") and os.path.isfile(os.path.join(root, name, "meta.json"))
+    )
+
+
+def attach(root, source=None):
+    """
+    현재 세대를 읽기 전용 mmap 으로 열기 → (세대 이름, TimetableIndex)
+    세대 방식 store 가 아니면 root 를 단일 store 로 열고 세대 이름은 None
+    source: 원본 경로 - store 가 그 원본의 지금 내용이 아니면 ValueError (TimetableIndex.load 참고)
+    """
+    generation = current_generation(root)
+    if generation is None:
+        return None, TimetableIndex.load(root, source)
+    return generation, TimetableIndex.load(os.path.join(root, generation), source)
+
+
+def _switch_current(root, generation):
+    """
+    CURRENT 를 원자적으로 교체 (읽는 쪽은 이전 이름이나 새 이름 중 하나만 봄)
+    """
+    tmp_path = os.path.join(root, f".{CURRENT_FILE}.{os.getpid()}")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(generation + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, os.path.join(root, CURRENT_FILE))
+
+
+def prune(root, keep=KEEP_GENERATIONS):
+    """
+    현재 세대를 빼고 오래된 세대부터 지워서 keep 개만 남김 → 지운 세대 이름 목록
+    """
+    current = current_generation(root)
+    names = generations(root)
+    removed = [name for name in names[:max(len(names) - keep, 0)] if name != current]
+    for name in removed:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+    return removed
+
+
+def publish(timetable, stations, root, source, source_mtime=None, source_size=None):
+    """
+    새 세대 디렉토리에 store 를 다 쓴 뒤 CURRENT 를 교체 → meta dict (meta["generation"] 이 세대 이름)
+    source_mtime / source_size: 원본 파일 수정 시각 / 크기 (serve_ver_4.py 가 다시 빌드할지 판단하고,
+    attach() 가 원본이 바뀐 store 를 쓰지 않도록 비교할 때 사용)
+    """
+    os.makedirs(root, exist_ok=True)
+    fingerprint = timetable_fingerprint(timetable)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    generation = f"{stamp}-{fingerprint}"
+    serial = 1
+    while os.path.exists(os.path.join(root, generation)):
+        serial += 1
+        generation = f"{stamp}-{fingerprint}-{serial}"
+
+    # 임시 디렉토리에 다 쓰고 이름을 바꿈 (같은 파일시스템 안의 rename 이라 원자적)
+    tmp_dir = os.path.join(root, f".{generation}.tmp")
+    meta = build(timetable, stations, tmp_dir, source, {
+        "generation": generation,
+        "fingerprint": fingerprint,
+        "source_mtime": source_mtime,
+        "source_size": source_size,
+        "published_at": time.time(),
+    })
+    os.rename(tmp_dir, os.path.join(root, generation))
+    _switch_current(root, generation)
+    prune(root)
+    return meta
+
+
+def main():
+    parser = argparse.ArgumentParser(description="시간표를 새 세대 timetable store 로 발행 (CURRENT 교체)")
+    parser.add_argument("--csv", default=os.path.join("data", "preprocessed_timetable.csv"))
+    parser.add_argument("--db", help="CSV 대신 SQLite DB 에서 읽기")
+    parser.add_argument("--stations", default=os.path.join("data", "station.csv"))
+    parser.add_argument("--root", default=os.path.join("data", "timetable_store"))
+    args = parser.parse_args()
+
+    df_station = pd.read_csv(args.stations, encoding="utf-8")
+    stations = StationRegistry.from_dataframe(df_station)
+
+    source = args.db or args.csv
+    signature = source_signature(source)
+    if args.db:
+        timetable = TimetableIndex.from_sqlite(args.db)
+    else:
+        timetable = TimetableIndex.from_csv(args.csv)
+    meta = publish(timetable, stations, args.root, os.path.basename(source), **signature)
+
+    store_dir = os.path.join(args.root, meta["generation"])
+    print(f"📦 세대 {meta['generation']}: {meta['rows']} 구간, 역 {len(timetable.station_names)}개 "
+          f"({store_bytes(store_dir) / 1e6:.1f} MB) → {args.root}/{CURRENT_FILE}")
+    if meta["unmatched_stations"]:
+        print(f"⚠️ station.csv 에 좌표가 없는 역 {len(meta['unmatched_stations'])}개: "
+              f"{', '.join(meta['unmatched_stations'][:20])}")
+
+
+if __name__ == "__main__":
+    main()
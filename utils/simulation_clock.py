@@ -0,0 +1,259 @@
+import heapq
+import itertools
+import threading
+import time
+from concurrent.futures import Future
+
+import numpy as np
+
+from utils.delay_propagation import DelayState
+from utils.position_engine import STATUS_STOPPED, STATUS_MOVING, STATUS_TERMINAL
+from utils.simulation_utils import WEATHER_DELAY
+
+# 이벤트 종류
+EVENT_ADMIT = 0     # 출발역 도착 → 이 구간 편입 (정차 시작)
+EVENT_DEPART = 1    # 정차 → 이동
+EVENT_ARRIVE = 2    # 다음역 도착 (이어지는 구간이 없으면 종착)
+EVENT_REMOVE = 3    # 종착 후 지도에서 제거
+
+# 종착 후 지도에 남겨두는 시간 (초)
+TERMINAL_HOLD_SEC = 30
+
+
+class Simulation:
+    """
+    서버에서 시계를 들고 고정 tick 단위로 진행하는 시뮬레이션
+    - 필터(요일/방향/호선)에 맞는 구간을 시작 시각 순으로 훑으며 새로 시작하는 구간만 편입
+    - 편입/출발/도착/종착은 시각 순 이벤트 큐(heap)로 처리해서, tick 마다 상태가 바뀌는 열차만 건드림
+    - 지연은 DelayState 로 하류 구간과 뒤따르는 열차까지 전파하고, 누적 지연은 현재 구간의 시간표 대비 지연
+    """
+
+    def __init__(self, timetable, engine, network, start_sec, week=None, direction=None, line=None, tick_sec=1,
+                 delays=None):
+        """
+        delays: 시작 지연 상태 (예: 자동 혼잡도를 미리 전파해 둔 DelayState) - 복사해서 사용
+        """
+        self.timetable = timetable
+        self.engine = engine
+        self.tick_sec = tick_sec
+        self.filters = {"week": week, "direction": direction, "line": line}
+
+        self.segments = timetable.select(week, direction, line)
+        self._starts = timetable.arrive_sec[self.segments]
+
+        self.trains = {}     # 열차 key → {"seg", "status", "total_delay"}
+        self._events = []    # (시각, 순번, 이벤트 종류, 구간 번호)
+        self._order = itertools.count()
+        self._lock = threading.RLock()
+
+        # 구간별 전파 지연 - 역별 정차 지연은 혼잡역/날씨 또는 날씨 지역, 구간별 정차 시간 증가는 자동 혼잡도
+        self.delays = delays.copy() if delays is not None else DelayState(network)
+
+        # 벽시계 → 시뮬레이션 시계 연동
+        self.speed = 1
+        self.running = False
+        self._wall = None
+        self._carry = 0.0
+
+        # 같은 시각의 프레임은 구독자가 여럿이어도 한 번만 계산 (계산 중이면 같은 Future 를 기다림)
+        self._frame_cache = None
+        self._frame_future = None
+
+        # 시작 시각에 이미 운행 중인 구간부터 편입
+        self.t = start_sec
+        self._cursor = int(np.searchsorted(self._starts, start_sec, side="right"))
+        for seg in timetable.active(start_sec, week, direction, line):
+            self._admit(int(seg))
+        self._process_events(start_sec)
+
+    def _train_key(self, seg):
+        """
+        열차 key - 열차번호는 호선마다 따로 매기므로 호선까지 포함
+        """
+        tt = self.timetable
+        return tt.train_no[seg], int(tt.line_code[seg]), int(tt.week_code[seg]), int(tt.inout_code[seg])
+
+    def _push(self, t_sec, kind, seg):
+        heapq.heappush(self._events, (t_sec, next(self._order), kind, seg))
+
+    def _expected(self, kind, seg):
+        """
+        현재 지연 기준 이벤트 시각 - 지연이 바뀐 뒤 남아 있는 예전 이벤트는 시각이 달라서 무시됨
+        """
+        if kind == EVENT_ADMIT:
+            return self.delays.admit_sec(seg)
+        if kind == EVENT_DEPART:
+            return self.delays.depart_sec(seg)
+        return self.delays.arrive_sec(seg)
+
+    def _admit(self, seg):
+        """
+        새 구간 편입: 열차는 해당 역에 정차 상태로 시작하고 출발/도착 이벤트 등록
+        """
+        key = self._train_key(seg)
+        train = self.trains.setdefault(key, {})
+        train.update(seg=seg, status=STATUS_STOPPED, total_delay=int(self.delays.arrive_delay[seg]))
+
+        self._push(self.delays.depart_sec(seg), EVENT_DEPART, seg)
+        self._push(self.delays.arrive_sec(seg), EVENT_ARRIVE, seg)
+
+    def _process_events(self, t_sec):
+        while self._events and self._events[0][0] <= t_sec:
+            event_time, _, kind, seg = heapq.heappop(self._events)
+            if kind != EVENT_REMOVE and event_time != self._expected(kind, seg):
+                continue
+            key = self._train_key(seg)
+            train = self.trains.get(key)
+
+            if kind == EVENT_ADMIT:
+                # 구간 번호는 시작 시각 순 - 이미 더 뒤 구간을 달리는 열차면 무시
+                if train is None or train["seg"] < seg:
+                    self._admit(seg)
+                continue
+            # 이미 다음 구간으로 넘어간 열차의 이벤트는 무시
+            if train is None or train["seg"] != seg:
+                continue
+
+            if kind == EVENT_DEPART and train["status"] == STATUS_STOPPED:
+                train["status"] = STATUS_MOVING
+                train["total_delay"] = int(self.delays.depart_delay[seg])
+            elif kind == EVENT_ARRIVE:
+                train["status"] = STATUS_TERMINAL
+                self._push(event_time + TERMINAL_HOLD_SEC, EVENT_REMOVE, seg)
+            elif kind == EVENT_REMOVE:
+                del self.trains[key]
+
+    def advance_to(self, t_sec):
+        """
+        t_sec 까지 시계를 진행 (새로 시작하는 구간 편입 → 이벤트 처리)
+        """
+        with self._lock:
+            while self._cursor < len(self.segments) and self._starts[self._cursor] <= t_sec:
+                seg = int(self.segments[self._cursor])
+                self._cursor += 1
+                # tick 사이에 이미 끝난 구간은 건너뜀 (지연이 있으면 편입 시각까지 대기)
+                if self.delays.arrive_sec(seg) >= t_sec:
+                    self._push(self.delays.admit_sec(seg), EVENT_ADMIT, seg)
+            self._process_events(t_sec)
+            self.t = t_sec
+            self._frame_cache = None
+
+    def step(self, ticks=1):
+        self.advance_to(self.t + ticks * self.tick_sec)
+
+    def sync(self):
+        """
+        실행 중이면 마지막 호출 이후 흐른 벽시계 시간 × 배속만큼 tick 진행
+        """
+        with self._lock:
+            now = time.monotonic()
+            if self.running and self._wall is not None:
+                self._carry += (now - self._wall) * self.speed / self.tick_sec
+                ticks = int(self._carry)
+                if ticks > 0:
+                    self._carry -= ticks
+                    self.step(ticks)
+            self._wall = now
+
+    def set_running(self, running):
+        self.sync()
+        self.running = running
+
+    def set_speed(self, speed):
+        self.sync()
+        self.speed = speed
+
+    def set_station_delay(self, station_delay, dwell_delay=None):
+        """
+        역별 정차 지연 (+ 구간별 정차 시간 증가) 변경
+        현재 시각 이후 구간만 다시 전파하고, 이미 훑은 구간은 이벤트를 다시 등록
+        """
+        with self._lock:
+            changed = self.delays.update(station_delay, from_sec=self.t, dwell_delay=dwell_delay)
+            starts = self.timetable.arrive_sec
+            for seg in changed.tolist():
+                if starts[seg] > self.t:
+                    continue  # 아직 커서가 지나가지 않은 구간은 편입할 때 새 지연이 반영됨
+                train = self.trains.get(self._train_key(seg))
+                if train is not None and train["seg"] == seg:
+                    if train["status"] == STATUS_STOPPED:
+                        self._push(self.delays.depart_sec(seg), EVENT_DEPART, seg)
+                    self._push(self.delays.arrive_sec(seg), EVENT_ARRIVE, seg)
+                elif train is None or train["seg"] < seg:
+                    self._push(self.delays.admit_sec(seg), EVENT_ADMIT, seg)
+            self._frame_cache = None
+
+    def set_weather(self, congested_stations, weather):
+        """
+        혼잡역/날씨 변경
+        """
+        delay_buffer = WEATHER_DELAY.get(weather, 0)
+        self.set_station_delay(self.engine.congested_mask(congested_stations).astype(np.int32) * delay_buffer)
+
+    def set_congestion(self, dwell_delay):
+        """
+        자동 혼잡도 (구간별 정차 시간 증가) 변경 - 끄려면 0 배열
+        """
+        self.set_station_delay(self.delays.station_delay, dwell_delay=dwell_delay)
+
+    def set_regions(self, regions):
+        """
+        등록된 날씨 지역 목록으로 정차 지연 설정
+        """
+        self.set_station_delay(self.engine.region_delay(regions))
+
+    def frame_arrays(self):
+        """
+        현재 시각의 PositionEngine.compute() 결과 + 열차별 누적 지연 배열 (total_delay)
+        """
+        with self._lock:
+            t_now = self.t
+            trains = list(self.trains.values())
+            segs = np.array([train["seg"] for train in trains], dtype=np.int64)
+            offset = self.delays.arrive_delay[segs]
+            delays = self.delays.depart_delay[segs] - offset
+            totals = np.array([train["total_delay"] for train in trains], dtype=np.int64)
+            terminal = np.array([train["status"] == STATUS_TERMINAL for train in trains], dtype=bool)
+
+        frame = self.engine.compute(t_now, segs, delay=delays, offset=offset)
+        frame["status"][terminal[frame["pos"]]] = STATUS_TERMINAL
+        frame["total_delay"] = totals[frame["pos"]]
+        frame["time_sec"] = t_now
+        return frame
+
+    def frame(self):
+        """
+        현재 시각의 열차 목록 (/api/simulation_data 형식 + 누적 지연 total_delay)
+        """
+        with self._lock:
+            if self._frame_cache is not None:
+                return self._frame_cache
+            pending = self._frame_future
+            if pending is not None and pending.t_sec == self.t:
+                owner = False
+            else:
+                pending = self._frame_future = Future()
+                pending.t_sec = self.t
+                owner = True
+        if not owner:
+            return pending.result()
+
+        try:
+            frame = self.frame_arrays()
+            records = self.engine.to_records(frame)
+            for record, total_delay in zip(records, frame["total_delay"].tolist()):
+                record["total_delay"] = total_delay
+            result = {"time_sec": frame["time_sec"], "trains": records}
+        except BaseException as e:
+            pending.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                if self._frame_future is pending:
+                    self._frame_future = None
+
+        with self._lock:
+            if self.t == frame["time_sec"]:
+                self._frame_cache = result
+        pending.set_result(result)
+        return result
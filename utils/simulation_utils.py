@@ -1,5 +1,13 @@
 import datetime
 
+# 날씨 영향에 따른 정차시간 증가 (초)
+WEATHER_DELAY = {
+    "none": 0,
+    "약함": 5,
+    "보통": 10,
+    "강함": 20
+}
+
 
 def parse_time_to_seconds(time_str):
     """
@@ -19,6 +27,15 @@ def seconds_to_timestr(seconds):
     return str(datetime.timedelta(seconds=seconds))
 
 
+def format_time(t_sec):
+    """
+    초 → 'HH:MM:SS' (24시 이후 심야 운행도 25:10:00 처럼 그대로, 문자열 비교 순서가 유지되도록 0 채움)
+    """
+    h, rest = divmod(int(t_sec), 3600)
+    m, s = divmod(rest, 60)
+    return f"{h:02d}:{m:02d}:{s:02d}"
+
+
 def interpolate_position(start_pos, end_pos, progress):
     """
     progress(0~1)에 따라 두 좌표 사이를 선형 보간하여 현재 위치 반환
@@ -0,0 +1,193 @@
+import base64
+import binascii
+import json
+import math
+import threading
+
+import numpy as np
+
+from utils.simulation_utils import WEATHER_DELAY
+
+# 격자 한 칸 크기 (위경도, 약 1km)
+GRID_CELL_DEG = 0.01
+
+# 지역 id 앞에 붙이는 형식 표시 (id 자체에 날씨 강도 + 영역을 담음)
+REGION_ID_PREFIX = "r1"
+# id 에 담는 좌표 자릿수 (약 0.1m)
+REGION_COORD_DIGITS = 6
+
+
+class StationGrid:
+    """
+    station.csv 좌표를 격자(cell)로 나눠둔 공간 인덱스
+    - 사각형(bbox) / 다각형(polygon) 안의 역을 해당 격자 칸만 확인해서 조회
+    """
+
+    def __init__(self, names, lats, lons, cell_deg=GRID_CELL_DEG):
+        self.names = np.asarray(names, dtype=object)
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lons = np.asarray(lons, dtype=np.float64)
+        self.cell_deg = cell_deg
+
+        self.cells = {}
+        for i, (lat, lon) in enumerate(zip(self.lats, self.lons)):
+            if np.isnan(lat) or np.isnan(lon):
+                continue
+            self.cells.setdefault(self._cell(lat, lon), []).append(i)
+        self.cells = {cell: np.array(rows, dtype=np.int32) for cell, rows in self.cells.items()}
+
+    @classmethod
+    def from_dataframe(cls, df_station, cell_deg=GRID_CELL_DEG):
+        return cls(df_station['역명'].to_numpy(), df_station['위도'].to_numpy(), df_station['경도'].to_numpy(), cell_deg)
+
+    @classmethod
+    def from_registry(cls, registry, cell_deg=GRID_CELL_DEG):
+        """
+        StationRegistry 의 역 (id 순서) 으로 격자 생성 - 돌려주는 역 이름은 PositionEngine 이 정규화해서 찾음
+        """
+        return cls(registry.names, registry.lat, registry.lon, cell_deg)
+
+    def _cell(self, lat, lon):
+        return math.floor(lat / self.cell_deg), math.floor(lon / self.cell_deg)
+
+    def _candidates(self, south, west, north, east):
+        lat0, lon0 = self._cell(south, west)
+        lat1, lon1 = self._cell(north, east)
+        # 격자 칸 수보다 저장된 칸이 적으면 저장된 칸만 훑음
+        if (lat1 - lat0 + 1) * (lon1 - lon0 + 1) > len(self.cells):
+            rows = [r for (a, b), r in self.cells.items() if lat0 <= a <= lat1 and lon0 <= b <= lon1]
+        else:
+            rows = [
+                self.cells[(a, b)]
+                for a in range(lat0, lat1 + 1)
+                for b in range(lon0, lon1 + 1)
+                if (a, b) in self.cells
+            ]
+        return np.concatenate(rows) if rows else np.zeros(0, dtype=np.int32)
+
+    def query_bbox(self, south, west, north, east):
+        """
+        사각형 안에 있는 역 이름 집합
+        """
+        rows = self._candidates(south, west, north, east)
+        lat, lon = self.lats[rows], self.lons[rows]
+        inside = (south <= lat) & (lat <= north) & (west <= lon) & (lon <= east)
+        return set(self.names[rows[inside]])
+
+    def query_polygon(self, points):
+        """
+        다각형([(위도, 경도), ...]) 안에 있는 역 이름 집합 (ray casting)
+        """
+        poly = np.asarray(points, dtype=np.float64)
+        if len(poly) < 3:
+            return set()
+        rows = self._candidates(poly[:, 0].min(), poly[:, 1].min(), poly[:, 0].max(), poly[:, 1].max())
+        lat, lon = self.lats[rows], self.lons[rows]
+
+        inside = np.zeros(len(rows), dtype=bool)
+        for (lat_a, lon_a), (lat_b, lon_b) in zip(poly, np.roll(poly, -1, axis=0)):
+            crosses = (lat_a > lat) != (lat_b > lat)
+            with np.errstate(divide="ignore", invalid="ignore"):
+                lon_cross = lon_a + (lat - lat_a) * (lon_b - lon_a) / (lat_b - lat_a)
+            inside ^= crosses & (lon < lon_cross)
+        return set(self.names[rows[inside]])
+
+
+def encode_region_id(weather, bbox=None, polygon=None):
+    """
+    날씨 강도 + bbox/polygon → 지역 id (URL 에 그대로 쓰는 base64url 문자열, 같은 입력이면 같은 id)
+    """
+    if polygon is not None:
+        spec = {"weather": weather, "polygon": [
+            [round(float(lat), REGION_COORD_DIGITS), round(float(lon), REGION_COORD_DIGITS)] for lat, lon in polygon
+        ]}
+    else:
+        spec = {"weather": weather, "bbox": [round(float(value), REGION_COORD_DIGITS) for value in bbox]}
+    payload = json.dumps(spec, ensure_ascii=False, separators=(",", ":"), sort_keys=True).encode("utf-8")
+    return REGION_ID_PREFIX + base64.urlsafe_b64encode(payload).decode("ascii").rstrip("=")
+
+
+def decode_region_id(region_id):
+    """
+    지역 id → {"weather", "bbox" 또는 "polygon"} (형식이 맞지 않으면 None)
+    """
+    if not isinstance(region_id, str) or not region_id.startswith(REGION_ID_PREFIX):
+        return None
+    encoded = region_id[len(REGION_ID_PREFIX):]
+    try:
+        spec = json.loads(base64.urlsafe_b64decode(encoded + "=" * (-len(encoded) % 4)))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        return None
+    return spec if isinstance(spec, dict) else None
+
+
+class WeatherRegions:
+    """
+    날씨 영향 지역 등록소
+    - 지역(bbox 또는 polygon + 날씨 강도)을 한 번 등록하면 포함된 역을 계산해서 id 로 보관
+    - id 에 날씨 강도와 영역이 들어 있으므로 등록하지 않은 프로세스(prefork 의 다른 worker, 재시작한 서버)도
+      id 만 받으면 같은 지역을 다시 계산해서 씀 - 등록은 캐시일 뿐 worker 끼리 상태를 나눌 필요가 없음
+    """
+
+    def __init__(self, grid):
+        self.grid = grid
+        self._regions = {}
+        self._lock = threading.Lock()
+
+    def register(self, weather, bbox=None, polygon=None):
+        if weather not in WEATHER_DELAY:
+            raise ValueError(f"알 수 없는 날씨 강도: {weather}")
+        if polygon is not None:
+            stations = self.grid.query_polygon(polygon)
+        elif bbox is not None:
+            south, west, north, east = bbox
+            stations = self.grid.query_bbox(south, west, north, east)
+        else:
+            raise ValueError("bbox 또는 polygon 이 필요함")
+
+        region_id = encode_region_id(weather, bbox=bbox, polygon=polygon)
+        with self._lock:
+            self._regions[region_id] = {
+                "id": region_id,
+                "weather": weather,
+                "delay": WEATHER_DELAY[weather],
+                "stations": frozenset(stations),
+            }
+            return self._regions[region_id]
+
+    def get(self, region_id):
+        """
+        지역 id → 지역 dict - 이 프로세스에서 등록하지 않은 id 는 id 에 담긴 영역으로 다시 계산 (잘못된 id 는 None)
+        """
+        with self._lock:
+            region = self._regions.get(region_id)
+        if region is not None:
+            return region
+        spec = decode_region_id(region_id)
+        if spec is None:
+            return None
+        try:
+            region = self.register(spec.get("weather"), bbox=spec.get("bbox"), polygon=spec.get("polygon"))
+        except (ValueError, TypeError):
+            return None
+        # 좌표 반올림 전 값으로 만든 id 도 그대로 찾을 수 있게 원래 id 로도 보관
+        with self._lock:
+            self._regions.setdefault(region_id, region)
+        return region
+
+    def resolve(self, region_ids):
+        """
+        지역 id 목록 → 지역 dict 목록 (형식이 잘못된 id 는 무시)
+        """
+        return [region for region in map(self.get, region_ids) if region is not None]
+
+
+def parse_region_ids(value):
+    """
+    "id1,id2" 형식 파라미터 → 정렬된 id 튜플
+    """
+    if not value:
+        return ()
+    if isinstance(value, str):
+        value = value.split(",")
+    return tuple(sorted({rid.strip() for rid in value if rid and rid.strip()}))
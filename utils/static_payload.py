@@ -0,0 +1,96 @@
+import gzip
+import hashlib
+import os
+import threading
+import time
+
+# 브라우저는 저장해두되 쓸 때마다 ETag 로 재검증 (바뀌지 않았으면 304)
+STATIC_CACHE_CONTROL = "public, no-cache"
+
+# 원본 파일 변경 여부를 확인하는 최소 간격 (초)
+SOURCE_CHECK_SEC = 5
+
+
+class EncodedPayload:
+    """
+    직렬화된 응답 본문 + gzip 본문 + strong ETag (본문 sha1, gzip 본문은 '-gz' 를 붙인 별도 ETag)
+    """
+
+    def __init__(self, body, content_type="application/json"):
+        self.body = body
+        self.gzip_body = gzip.compress(body, compresslevel=9, mtime=0)
+        self.content_type = content_type
+        digest = hashlib.sha1(body).hexdigest()
+        self.etag = f'"{digest}"'
+        self.gzip_etag = f'"{digest}-gz"'
+
+    def matches(self, if_none_match):
+        """
+        If-None-Match 헤더에 현재 본문의 ETag(어느 인코딩이든)가 있는지
+        """
+        if not if_none_match:
+            return False
+        tags = {tag.strip() for tag in if_none_match.split(",")}
+        return "*" in tags or self.etag in tags or self.gzip_etag in tags
+
+    def respond(self, if_none_match=None, accept_encoding=None):
+        """
+        조건부 요청 처리 → (status, headers 목록, body)
+        - If-None-Match 가 맞으면 304 (본문 없음)
+        - Accept-Encoding 에 gzip 이 있으면 미리 압축해 둔 본문
+        """
+        use_gzip = "gzip" in (accept_encoding or "").lower()
+        headers = [
+            ("Cache-Control", STATIC_CACHE_CONTROL),
+            ("ETag", self.gzip_etag if use_gzip else self.etag),
+            ("Vary", "Accept-Encoding"),
+        ]
+        if self.matches(if_none_match):
+            return 304, headers, b""
+        headers.append(("Content-Type", self.content_type))
+        if use_gzip:
+            headers.append(("Content-Encoding", "gzip"))
+            return 200, headers, self.gzip_body
+        return 200, headers, self.body
+
+
+class StaticPayload:
+    """
+    정적 엔드포인트 응답 - 시작할 때 한 번 직렬화하고, sources 파일이 바뀌었을 때만 다시 만듦
+    build: () → 직렬화된 bytes
+    """
+
+    def __init__(self, build, sources=()):
+        self.build = build
+        self.sources = tuple(sources)
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self._stamp = self._source_stamp()
+        self._payload = EncodedPayload(build())
+
+    def _source_stamp(self):
+        stamp = []
+        for path in self.sources:
+            try:
+                stat = os.stat(path)
+            except OSError:
+                stamp.append(None)
+            else:
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(stamp)
+
+    def current(self):
+        now = time.monotonic()
+        if not self.sources or now - self._checked < SOURCE_CHECK_SEC:
+            return self._payload
+        with self._lock:
+            if now - self._checked >= SOURCE_CHECK_SEC:
+                self._checked = now
+                stamp = self._source_stamp()
+                if stamp != self._stamp:
+                    try:
+                        self._payload = EncodedPayload(self.build())
+                    except (OSError, ValueError):
+                        return self._payload  # 쓰는 중인 파일 등 - 이전 본문을 유지하고 다음 확인 때 재시도
+                    self._stamp = stamp
+        return self._payload
@@ -0,0 +1,114 @@
+import re
+import unicodedata
+
+import numpy as np
+
+_BRACKETS = re.compile(r"\(.*?\)|\[.*?\]")
+_SPACES = re.compile(r"\s+")
+
+
+def line_number(name):
+    """
+    '01호선' / '2호선_내선' / 3 → 1 / 2 / 3 (숫자가 없으면 None)
+    """
+    match = re.match(r"\s*0*(\d+)", str(name))
+    return int(match.group(1)) if match else None
+
+
+def normalize_station_name(name):
+    """
+    역 이름 비교용 정규화 - 괄호 안 부기, 공백, 끝의 '역' 제거
+    '서울역' → '서울', '총신대입구(이수)' → '총신대입구'
+    """
+    if name is None or (isinstance(name, float) and np.isnan(name)):
+        return ""
+    name = unicodedata.normalize("NFKC", str(name))
+    name = _SPACES.sub("", _BRACKETS.sub("", name))
+    if len(name) > 2 and name.endswith("역"):
+        name = name[:-1]
+    return name
+
+
+class StationRegistry:
+    """
+    station.csv 의 역을 (호선, 역명) 단위 정수 id 로 관리하는 등록소
+    - 환승역은 호선마다 행이 따로 있으므로 (호선, 정규화 역명) 으로 먼저 찾고, 없으면 역명만으로 찾음
+    - 시간표는 서로 다른 (호선, 역) 조합만 한 번씩 찾아서 구간별 id 배열로 변환
+    """
+
+    def __init__(self, names, lines, lats, lons):
+        self.names = [str(name) for name in names]
+        self.lines = [line_number(line) for line in lines]
+        self.lat = np.asarray(lats, dtype=np.float64)
+        self.lon = np.asarray(lons, dtype=np.float64)
+
+        self._by_line = {}
+        self._by_name = {}
+        for sid, (name, line) in enumerate(zip(self.names, self.lines)):
+            key = normalize_station_name(name)
+            self._by_line.setdefault((line, key), sid)
+            self._by_name.setdefault(key, sid)
+
+    @classmethod
+    def from_dataframe(cls, df_station):
+        return cls(df_station['역명'], df_station['호선'], df_station['위도'], df_station['경도'])
+
+    def __len__(self):
+        return len(self.names)
+
+    def resolve(self, name, line=None):
+        """
+        역 이름 (+ 호선) → 역 id (찾지 못하면 -1)
+        """
+        key = normalize_station_name(name)
+        if line is not None:
+            sid = self._by_line.get((line_number(line), key))
+            if sid is not None:
+                return sid
+        return self._by_name.get(key, -1)
+
+    def get(self, name, default=None, line=None):
+        """
+        station_dict.get() 과 같은 형식 - (위도, 경도) 또는 default
+        """
+        sid = self.resolve(name, line)
+        if sid < 0:
+            return default
+        return self.lat[sid], self.lon[sid]
+
+    def resolve_codes(self, station_names, station_code, line_names, line_code):
+        """
+        시간표 역 코드 + 호선 코드 배열 → 역 id 배열 (코드 -1 이나 못 찾은 역은 -1)
+        반환값: (id 배열, [(호선, 역명, 행 수), ...] 못 찾은 목록)
+        """
+        station_code = np.asarray(station_code, dtype=np.int64)
+        line_code = np.asarray(line_code, dtype=np.int64)
+        key = line_code * (len(station_names) + 1) + station_code + 1
+        keys, inverse, counts = np.unique(key, return_inverse=True, return_counts=True)
+
+        resolved = np.full(len(keys), -1, dtype=np.int32)
+        unmatched = []
+        for i, k in enumerate(keys.tolist()):
+            line, code = divmod(k, len(station_names) + 1)
+            if code == 0:
+                continue  # 다음역 없음 (종착)
+            name = station_names[code - 1]
+            resolved[i] = self.resolve(name, line_names[line])
+            if resolved[i] < 0:
+                unmatched.append((line_names[line], name, int(counts[i])))
+        return resolved[inverse], unmatched
+
+    def resolve_timetable(self, timetable):
+        """
+        출발역/다음역을 역 id 열로 변환 → (from_sid, to_sid, 못 찾은 목록)
+        """
+        from_sid, unmatched = self.resolve_codes(
+            timetable.station_names, timetable.station_code, timetable.line_names, timetable.line_code
+        )
+        to_sid, unmatched_next = self.resolve_codes(
+            timetable.station_names, timetable.next_station_code, timetable.line_names, timetable.line_code
+        )
+        merged = {}
+        for line, name, rows in unmatched + unmatched_next:
+            merged[(line, name)] = merged.get((line, name), 0) + rows
+        return from_sid, to_sid, [(line, name, rows) for (line, name), rows in sorted(merged.items())]
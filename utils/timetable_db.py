@@ -0,0 +1,172 @@
+"""
+preprocessed_timetable SQLite DB 마이그레이션 + 읽기 전용 조회
+
+    python -m utils.timetable_db migrate --db data/preprocessed_timetable.db
+    python -m utils.timetable_db explain --db data/preprocessed_timetable.db
+
+- migrate: 시각 TEXT 컬럼 옆에 정수 초 컬럼(arrive_sec, depart_sec, next_arrive_sec)을 추가하고
+  (WEEK_TAG, LINE_NUM, arrive_sec) 등 복합 인덱스 생성, 가장 긴 구간 길이를 timetable_meta 에 기록
+- 조회는 arrive_sec BETWEEN t - 최대 구간 길이 AND t 로 인덱스 범위를 좁히고 요일/방향/호선 필터도 모두 SQL 로 처리
+- explain: 필터 조합별 EXPLAIN QUERY PLAN 을 출력하고, 인덱스를 안 타는 쿼리가 있으면 종료 코드 1
+"""
+import argparse
+import itertools
+import sqlite3
+import sys
+import threading
+from urllib.parse import quote
+
+import pandas as pd
+
+from utils.simulation_utils import parse_time_to_seconds
+from utils.timetable_index import TIMETABLE_COLUMNS
+
+TABLE = "preprocessed_timetable"
+META_TABLE = "timetable_meta"
+
+# 추가하는 정수 초 컬럼 ← 원본 TEXT 컬럼
+SECOND_COLUMNS = {
+    "arrive_sec": "ARRIVETIME",
+    "depart_sec": "LEFTTIME",
+    "next_arrive_sec": "NEXT_ARRIVETIME",
+}
+
+# 인덱스 이름 → 컬럼 (필터가 많은 조합부터 planner 가 고를 수 있게 둠)
+INDEXES = {
+    "idx_timetable_week_line_start": ("WEEK_TAG", "LINE_NUM", "arrive_sec"),
+    "idx_timetable_week_inout_start": ("WEEK_TAG", "INOUT_TAG", "arrive_sec"),
+    "idx_timetable_week_start": ("WEEK_TAG", "arrive_sec"),
+    "idx_timetable_start": ("arrive_sec",),
+}
+
+# 읽기 전용 연결 설정
+MMAP_SIZE = 256 * 1024 * 1024
+
+
+def migrate(db_path):
+    """
+    정수 초 컬럼 + 복합 인덱스 추가 (이미 있으면 건너뜀, 여러 번 실행해도 같은 결과)
+    """
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.create_function("time_to_sec", 1, parse_time_to_seconds, deterministic=True)
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({TABLE})")}
+        for column, source in SECOND_COLUMNS.items():
+            if column not in existing:
+                conn.execute(f"ALTER TABLE {TABLE} ADD COLUMN {column} INTEGER")
+            conn.execute(f"UPDATE {TABLE} SET {column} = time_to_sec({source})")
+
+        for name, columns in INDEXES.items():
+            conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {TABLE} ({', '.join(columns)})")
+
+        max_span = conn.execute(
+            f"SELECT COALESCE(MAX(next_arrive_sec - arrive_sec), 0) FROM {TABLE} WHERE next_arrive_sec >= arrive_sec"
+        ).fetchone()[0]
+        conn.execute(f"CREATE TABLE IF NOT EXISTS {META_TABLE} (key TEXT PRIMARY KEY, value INTEGER)")
+        conn.execute(f"INSERT OR REPLACE INTO {META_TABLE} VALUES ('max_span_sec', ?)", (max_span,))
+        conn.commit()
+        conn.execute("ANALYZE")
+        conn.commit()
+        return max_span
+    finally:
+        conn.close()
+
+
+def _filter_value(value):
+    return None if value is None or value == "전체" else value
+
+
+class TimetableDB:
+    """
+    마이그레이션된 DB 를 스레드별 읽기 전용 연결로 조회 (요청마다 connect 하지 않음)
+    - mode=ro&immutable=1 로 열어서 잠금/변경 확인 없이 읽고, mmap_size 로 페이지를 메모리 매핑
+    """
+
+    def __init__(self, db_path, mmap_size=MMAP_SIZE):
+        self.db_path = db_path
+        self.mmap_size = mmap_size
+        self._local = threading.local()
+        try:
+            row = self.connection().execute(
+                f"SELECT value FROM {META_TABLE} WHERE key = 'max_span_sec'"
+            ).fetchone()
+        except sqlite3.OperationalError:
+            row = None
+        if row is None:
+            raise ValueError(f"{db_path} 가 마이그레이션되지 않음 - python -m utils.timetable_db migrate 필요")
+        self.max_span = int(row[0])
+
+    def connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            uri = f"file:{quote(self.db_path)}?mode=ro&immutable=1"
+            conn = sqlite3.connect(uri, uri=True, check_same_thread=False)
+            conn.execute(f"PRAGMA mmap_size = {int(self.mmap_size)}")
+            conn.execute("PRAGMA query_only = 1")
+            self._local.conn = conn
+        return conn
+
+    def active_query(self, t_sec, week=None, direction=None, line=None, columns=TIMETABLE_COLUMNS):
+        """
+        t_sec 에 운행 중인 구간 조회 SQL + 파라미터 ("전체"/None 필터는 조건에서 뺌)
+        """
+        clauses = ["arrive_sec BETWEEN ? AND ?", "next_arrive_sec >= ?"]
+        params = [t_sec - self.max_span, t_sec, t_sec]
+        for column, value in (("WEEK_TAG", week), ("INOUT_TAG", direction), ("LINE_NUM", line)):
+            value = _filter_value(value)
+            if value is not None:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        sql = f"SELECT {', '.join(columns)} FROM {TABLE} WHERE {' AND '.join(clauses)} ORDER BY arrive_sec"
+        return sql, params
+
+    def active(self, t_sec, week=None, direction=None, line=None):
+        """
+        t_sec 에 ARRIVETIME <= t <= NEXT_ARRIVETIME 인 행 DataFrame (필터까지 SQL 에서 처리)
+        """
+        sql, params = self.active_query(t_sec, week, direction, line)
+        return pd.read_sql_query(sql, self.connection(), params=params)
+
+    def query_plan(self, t_sec, week=None, direction=None, line=None):
+        """
+        active() 쿼리의 EXPLAIN QUERY PLAN detail 목록
+        """
+        sql, params = self.active_query(t_sec, week, direction, line)
+        return [row[3] for row in self.connection().execute(f"EXPLAIN QUERY PLAN {sql}", params)]
+
+    def check_query_plans(self, t_sec=9 * 3600):
+        """
+        요일/방향/호선 필터 조합마다 인덱스 검색을 하는지 확인 → (필터, plan) 중 풀스캔인 것 목록
+        """
+        failures = []
+        for week, direction, line in itertools.product(("3", None), ("1", None), ("02호선", None)):
+            plan = self.query_plan(t_sec, week, direction, line)
+            if not any(step.startswith("SEARCH") and "INDEX" in step for step in plan):
+                failures.append(((week, direction, line), plan))
+        return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="시간표 SQLite DB 마이그레이션 / 쿼리 플랜 확인")
+    parser.add_argument("command", choices=["migrate", "explain"])
+    parser.add_argument("--db", default="data/preprocessed_timetable.db")
+    args = parser.parse_args()
+
+    if args.command == "migrate":
+        max_span = migrate(args.db)
+        print(f"🗃️ 정수 초 컬럼 + 인덱스 {len(INDEXES)}개 준비 완료 (최대 구간 길이 {max_span}초)")
+        return
+
+    db = TimetableDB(args.db)
+    for filters in itertools.product(("3", None), ("1", None), ("02호선", None)):
+        print(filters, " / ".join(db.query_plan(9 * 3600, *filters)))
+    failures = db.check_query_plans()
+    if failures:
+        for filters, plan in failures:
+            print(f"❌ 인덱스 미사용 {filters}: {' / '.join(plan)}")
+        sys.exit(1)
+    print("✅ 모든 필터 조합이 인덱스 검색 사용")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+import json
+import os
+import shutil
+import sqlite3
+from functools import cached_property
+
+import numpy as np
+import pandas as pd
+
+from utils.derived_arrays import DERIVED_DIR, DerivedArrays, derived_key
+from utils.simulation_utils import parse_time_to_seconds
+
+# 버킷 크기 (초) - 1분 단위로 구간을 나눠서 보관
+BUCKET_SEC = 60
+
+TIMETABLE_COLUMNS = [
+    "TRAIN_NO", "LINE_NUM", "STATION_NM", "ARRIVETIME", "LEFTTIME",
+    "NEXT_STATION", "NEXT_ARRIVETIME", "WEEK_TAG", "INOUT_TAG",
+]
+
+# save() / load() 로 주고받는 컬럼 배열
+STORE_VERSION = 1
+STORE_ARRAYS = (
+    "arrive_sec", "depart_sec", "next_arrive_sec",
+    "station_code", "next_station_code", "train_code", "line_code", "week_code", "inout_code",
+)
+
+
+def _code_dtype(n):
+    """
+    범주 개수에 맞는 가장 작은 정수 코드 타입 (없는 값 -1 을 위해 부호 있는 타입)
+    """
+    for dtype in (np.int8, np.int16):
+        if n <= np.iinfo(dtype).max:
+            return dtype
+    return np.int32
+
+
+def _factorize(values):
+    """
+    문자열 컬럼을 (정수 코드 배열, 값 목록) 으로 변환 - 값이 없으면 코드 -1
+    """
+    codes, uniques = pd.factorize(values)
+    return codes.astype(_code_dtype(len(uniques))), [str(value) for value in uniques]
+
+
+def _to_seconds(values):
+    """
+    'HH:MM:SS' 컬럼 → 초 (float, 파싱 실패는 NaN) - 서로 다른 시각 문자열만 한 번씩 파싱
+    """
+    codes, uniques = pd.factorize(values)
+    # 마지막 칸은 값이 없는 행(코드 -1)용 NaN
+    seconds = np.array([parse_time_to_seconds(str(value)) for value in uniques] + [None], dtype=np.float64)
+    return seconds[codes]
+
+
+def sweep_active(start, end, t_start, t_end, step=1):
+    """
+    시작 시각 순으로 정렬된 구간들을 한 번만 훑으며 t_start ~ t_end (step 간격) 각 시각에
+    start <= t <= end 인 위치 배열을 yield → (t, 위치 배열)
+    - 새로 시작한 구간은 커서로 추가하고, 끝난 구간은 살아 있는 목록에서만 걸러냄
+    """
+    live = np.zeros(0, dtype=np.int64)
+    cursor = 0
+    for t_sec in range(t_start, t_end + 1, step):
+        hi = int(np.searchsorted(start, t_sec, side="right"))
+        if hi > cursor:
+            live = np.concatenate([live, np.arange(cursor, hi)])
+            cursor = hi
+        live = live[end[live] >= t_sec]
+        yield t_sec, live
+
+
+def source_signature(path):
+    """
+    원본 파일 → {"source_mtime", "source_size"} (store meta.json 에 같이 저장해두고 load() 때 비교)
+    """
+    stat = os.stat(path)
+    return {"source_mtime": stat.st_mtime, "source_size": stat.st_size}
+
+
+class TimetableIndex:
+    """
+    preprocessed_timetable 을 서버 시작 시 한 번만 읽어서 메모리에 올려둔 인덱스
+    - 시각은 모두 정수 초 (ARRIVETIME → arrive_sec, LEFTTIME → depart_sec, NEXT_ARRIVETIME → next_arrive_sec)
+    - 역/열차/호선/요일/방향은 정수 코드 + 이름 목록 (문자열 배열은 필요할 때만 만듦)
+    - 구간은 출발(도착) 시각 순으로 정렬
+    - 1분 버킷마다 해당 분에 걸쳐 있는 구간 번호를 모아두어 "t 시각에 운행 중인 구간" 을 O(k) 로 조회
+    """
+
+    def __init__(self, df):
+        arrive = _to_seconds(df["ARRIVETIME"])
+        depart = _to_seconds(df["LEFTTIME"])
+        next_arrive = _to_seconds(df["NEXT_ARRIVETIME"])
+
+        # 기존 SQL(NEXT_ARRIVETIME >= ?) 과 동일하게 다음 도착 시각이 없는 행은 제외
+        valid = ~(np.isnan(arrive) | np.isnan(depart) | np.isnan(next_arrive))
+        valid &= next_arrive >= arrive
+        order = np.flatnonzero(valid)[np.argsort(arrive[valid], kind="stable")]
+
+        arrays = {
+            "arrive_sec": arrive[order].astype(np.int32),
+            "depart_sec": depart[order].astype(np.int32),
+            "next_arrive_sec": next_arrive[order].astype(np.int32),
+        }
+        df = df.iloc[order]
+
+        # 출발역/다음역은 같은 역 목록을 공유
+        n = len(df)
+        names = np.concatenate([df["STATION_NM"].to_numpy(dtype=object), df["NEXT_STATION"].to_numpy(dtype=object)])
+        codes, station_names = _factorize(names)
+        arrays["station_code"], arrays["next_station_code"] = codes[:n], codes[n:]
+
+        arrays["train_code"], train_names = _factorize(df["TRAIN_NO"].astype(str).to_numpy())
+        arrays["line_code"], line_names = _factorize(df["LINE_NUM"].astype(str).to_numpy())
+        arrays["week_code"], week_names = _factorize(df["WEEK_TAG"].astype(str).to_numpy())
+        arrays["inout_code"], inout_names = _factorize(df["INOUT_TAG"].astype(str).to_numpy())
+
+        self._set_arrays(arrays, {
+            "stations": station_names, "trains": train_names,
+            "lines": line_names, "weeks": week_names, "inouts": inout_names,
+        })
+        # 시각이 없거나 잘못되어 제외한 원본 행 수
+        self.dropped_rows = int(len(valid) - valid.sum())
+        self._build_buckets()
+        # 파생 배열 (store 없이 만든 인덱스라 저장하지 않고 매번 만듦)
+        self.derived = DerivedArrays()
+
+    def _set_arrays(self, arrays, names):
+        for key, values in arrays.items():
+            setattr(self, key, values)
+        self.station_names = names["stations"]
+        self.train_names = names["trains"]
+        self.line_names = names["lines"]
+        self.week_lookup = {value: code for code, value in enumerate(names["weeks"])}
+        self.inout_lookup = {value: code for code, value in enumerate(names["inouts"])}
+        self.line_lookup = {value: code for code, value in enumerate(self.line_names)}
+        self.station_lat = arrays.get("station_lat")
+        self.station_lon = arrays.get("station_lon")
+
+    def join_stations(self, station_dict):
+        """
+        역 목록에 StationRegistry (또는 {역명: (위도, 경도)}) 좌표를 붙이고, 좌표를 찾지 못한 역 이름 목록 반환
+        """
+        coords = np.array(
+            [station_dict.get(name, (np.nan, np.nan)) for name in self.station_names], dtype=np.float64
+        ).reshape(-1, 2)
+        self.station_lat = coords[:, 0].copy()
+        self.station_lon = coords[:, 1].copy()
+        return [name for name, lat in zip(self.station_names, self.station_lat) if np.isnan(lat)]
+
+    def __len__(self):
+        return len(self.arrive_sec)
+
+    @classmethod
+    def from_sqlite(cls, db_path):
+        """
+        SQLite DB 의 preprocessed_timetable 전체를 한 번 읽어서 인덱스 생성
+        """
+        conn = sqlite3.connect(db_path)
+        try:
+            df = pd.read_sql_query(
+                f"SELECT {', '.join(TIMETABLE_COLUMNS)} FROM preprocessed_timetable", conn
+            )
+        finally:
+            conn.close()
+        return cls(df)
+
+    @classmethod
+    def from_csv(cls, csv_path):
+        """
+        preprocessed_timetable.csv 에서 필요한 컬럼만 범주형으로 읽어서 인덱스 생성
+        """
+        df = pd.read_csv(csv_path, encoding="utf-8-sig", usecols=TIMETABLE_COLUMNS, dtype="category")
+        return cls(df)
+
+    @classmethod
+    def load(cls, store_dir, source=None):
+        """
+        save() 로 저장한 배열을 읽기 전용 mmap 으로 열어서 인덱스 생성 (복사/파싱 없음)
+        source: 원본 DB/CSV 경로 - store 를 이 원본으로 만들었는데 그 뒤에 바뀌었으면 ValueError
+                (호출하는 쪽은 from_sqlite() 등으로 원본을 직접 읽음)
+        """
+        with open(os.path.join(store_dir, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != STORE_VERSION:
+            raise ValueError("timetable store 버전이 맞지 않음 - 다시 빌드 필요")
+        if source is not None and meta.get("source") == os.path.basename(source) and os.path.exists(source):
+            if any(meta.get(key) != value for key, value in source_signature(source).items()):
+                raise ValueError("원본이 timetable store 를 만든 뒤에 바뀜 - 다시 빌드 필요")
+
+        self = cls.__new__(cls)
+        arrays = {
+            name: np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode="r")
+            for name in STORE_ARRAYS + ("bucket_offsets", "bucket_members")
+        }
+        if meta.get("station_coords"):
+            for name in ("station_lat", "station_lon"):
+                arrays[name] = np.load(os.path.join(store_dir, f"{name}.npy"), mmap_mode="r")
+        self._set_arrays(arrays, meta["names"])
+        self.dropped_rows = meta.get("dropped_rows", 0)
+        # PositionEngine / DelayNetwork 등의 파생 배열도 store 디렉토리에 저장해두고 mmap 으로 공유
+        # (meta.json 이 같은 시간표로 만든 배열만 열도록 meta 해시를 key 에 섞음)
+        self.derived = DerivedArrays(store_dir, derived_key(meta))
+        return self
+
+    def save(self, store_dir, extra_meta=None):
+        """
+        정렬된 구간 배열 + 버킷 + 이름 목록을 컬럼별 .npy 와 meta.json 으로 저장
+        """
+        os.makedirs(store_dir, exist_ok=True)
+        # 같은 디렉토리에 다시 빌드하면 이전 시간표로 만든 파생 배열은 버림
+        shutil.rmtree(os.path.join(store_dir, DERIVED_DIR), ignore_errors=True)
+        names = STORE_ARRAYS + ("bucket_offsets", "bucket_members")
+        if self.station_lat is not None:
+            names += ("station_lat", "station_lon")
+        for name in names:
+            np.save(os.path.join(store_dir, f"{name}.npy"), np.ascontiguousarray(getattr(self, name)))
+
+        meta = {
+            "version": STORE_VERSION,
+            "rows": len(self),
+            "dropped_rows": self.dropped_rows,
+            "station_coords": self.station_lat is not None,
+            # 시간표 배열 내용 해시 - 파생 배열 key 에 들어감 (행 수/이름이 같아도 시각이 바뀌면 다시 만듦)
+            "arrays_key": derived_key(*(getattr(self, name) for name in names)),
+            "names": {
+                "stations": self.station_names, "trains": self.train_names, "lines": self.line_names,
+                "weeks": list(self.week_lookup), "inouts": list(self.inout_lookup),
+            },
+        }
+        meta.update(extra_meta or {})
+        with open(os.path.join(store_dir, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        return meta
+
+    def _names(self, names, codes):
+        """
+        코드 배열 → 이름 object 배열 (코드 -1 은 None)
+        """
+        lookup = np.array(list(names) + [None], dtype=object)
+        return lookup[codes]
+
+    @cached_property
+    def train_no(self):
+        return self._names(self.train_names, self.train_code)
+
+    @cached_property
+    def line_num(self):
+        return self._names(self.line_names, self.line_code)
+
+    @cached_property
+    def station_nm(self):
+        return self._names(self.station_names, self.station_code)
+
+    @cached_property
+    def next_station(self):
+        return self._names(self.station_names, self.next_station_code)
+
+    def _build_buckets(self):
+        """
+        각 구간 [arrive_sec, next_arrive_sec] 이 걸치는 모든 1분 버킷에 구간 번호 등록 (CSR 형태)
+        """
+        n = len(self.arrive_sec)
+        if n == 0:
+            self.bucket_offsets = np.zeros(1, dtype=np.int64)
+            self.bucket_members = np.zeros(0, dtype=np.int32)
+            return
+
+        first = self.arrive_sec // BUCKET_SEC
+        last = self.next_arrive_sec // BUCKET_SEC
+        counts = (last - first + 1).astype(np.int64)
+
+        segment = np.repeat(np.arange(n, dtype=np.int32), counts)
+        step = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        bucket = np.repeat(first, counts) + step
+
+        # stable 정렬이라 버킷 안에서는 구간이 시작 시각 순으로 유지됨
+        order = np.argsort(bucket, kind="stable")
+        self.bucket_members = segment[order]
+
+        n_buckets = int(last.max()) + 1
+        self.bucket_offsets = np.zeros(n_buckets + 1, dtype=np.int64)
+        np.cumsum(np.bincount(bucket, minlength=n_buckets), out=self.bucket_offsets[1:])
+
+    def filter_code(self, lookup, value):
+        """
+        필터 값에 해당하는 코드 반환 ("전체"/None 이면 필터 없음, 없는 값이면 -1)
+        """
+        if value is None or value == "전체":
+            return None
+        return lookup.get(value, -1)
+
+    def filter_mask(self, idx, week=None, direction=None, line=None):
+        """
+        idx 구간들에 WEEK_TAG / INOUT_TAG / LINE_NUM 필터를 적용한 bool 마스크
+        """
+        mask = np.ones(len(idx), dtype=bool)
+        for codes, lookup, value in (
+            (self.week_code, self.week_lookup, week),
+            (self.inout_code, self.inout_lookup, direction),
+            (self.line_code, self.line_lookup, line),
+        ):
+            code = self.filter_code(lookup, value)
+            if code is not None:
+                mask &= codes[idx] == code
+        return mask
+
+    def select(self, week=None, direction=None, line=None):
+        """
+        필터에 맞는 전체 구간 번호 배열 반환 (시작 시각 순)
+        """
+        idx = np.arange(len(self), dtype=np.int32)
+        return idx[self.filter_mask(idx, week, direction, line)]
+
+    def active(self, t_sec, week=None, direction=None, line=None):
+        """
+        t_sec 시각에 ARRIVETIME <= t <= NEXT_ARRIVETIME 인 구간 번호 배열 반환 (시작 시각 순)
+        week / direction / line 은 WEEK_TAG / INOUT_TAG / LINE_NUM 필터
+        """
+        bucket = t_sec // BUCKET_SEC
+        if bucket < 0 or bucket + 1 >= len(self.bucket_offsets):
+            return np.zeros(0, dtype=np.int32)
+
+        candidates = self.bucket_members[self.bucket_offsets[bucket]:self.bucket_offsets[bucket + 1]]
+        mask = (self.arrive_sec[candidates] <= t_sec) & (self.next_arrive_sec[candidates] >= t_sec)
+        mask &= self.filter_mask(candidates, week, direction, line)
+        return candidates[mask]
+
+    def overlapping(self, t_start, t_end, week=None, direction=None, line=None):
+        """
+        [t_start, t_end] 와 시간표상 운행 구간이 겹치는 구간 번호 배열 (시작 시각 순)
+        """
+        first = max(t_start // BUCKET_SEC, 0)
+        last = min(t_end // BUCKET_SEC, len(self.bucket_offsets) - 2)
+        if last < first:
+            return np.zeros(0, dtype=np.int32)
+
+        candidates = np.unique(self.bucket_members[self.bucket_offsets[first]:self.bucket_offsets[last + 1]])
+        mask = (self.arrive_sec[candidates] <= t_end) & (self.next_arrive_sec[candidates] >= t_start)
+        mask &= self.filter_mask(candidates, week, direction, line)
+        return candidates[mask]
+
+    def sweep(self, t_start, t_end, step=1, week=None, direction=None, line=None):
+        """
+        t_start ~ t_end 를 step 간격으로 진행하며 각 시각에 운행 중인 구간 번호 배열 yield → (t, idx)
+        시각마다 따로 조회하지 않고 겹치는 구간을 한 번 골라서 시작 시각 순으로 훑음
+        """
+        idx = self.overlapping(t_start, t_end, week, direction, line)
+        for t_sec, live in sweep_active(self.arrive_sec[idx], self.next_arrive_sec[idx], t_start, t_end, step):
+            yield t_sec, idx[live]
@@ -0,0 +1,75 @@
+"""
+원본 시간표 → 컬럼형 timetable store 변환 (한 번만 실행)
+
+    python -m utils.timetable_store --csv data/preprocessed_timetable.csv --out data/timetable_store
+
+- 시각은 int32 초, 역/열차/호선/WEEK_TAG/INOUT_TAG 는 범주 코드 (이름 목록은 meta.json)
+- 역 id 표에는 station.csv 좌표를 붙여서 같이 저장 (좌표를 못 찾은 역은 meta.json 에 기록)
+- 1분 버킷 인덱스까지 미리 저장해두므로 서버는 TimetableIndex.load() 로 mmap 만 열고 바로 사용
+  (파싱/정렬 없음, 여러 worker 가 같은 파일을 열면 OS 페이지 캐시를 공유)
+- 서버를 멈추지 않고 시간표를 바꾸려면 python -m utils.shared_timetable 로 세대별 store 를 발행
+"""
+import argparse
+import os
+
+import pandas as pd
+
+from utils.station_registry import StationRegistry
+from utils.timetable_index import TIMETABLE_COLUMNS, TimetableIndex, source_signature
+
+
+def string_frame_bytes(csv_path):
+    """
+    기존 방식(dtype=str DataFrame)으로 읽었을 때의 메모리 사용량 - 비교용
+    """
+    df = pd.read_csv(csv_path, encoding="utf-8-sig", usecols=TIMETABLE_COLUMNS, dtype=str)
+    return int(df.memory_usage(deep=True).sum()), len(df)
+
+
+def store_bytes(store_dir):
+    return sum(
+        os.path.getsize(os.path.join(store_dir, name))
+        for name in os.listdir(store_dir)
+        if name.endswith(".npy")
+    )
+
+
+def build(timetable, stations, out_dir, source, extra_meta=None):
+    """
+    역 좌표를 붙여서 store 저장 → meta dict 반환
+    """
+    unmatched = timetable.join_stations(stations)
+    return timetable.save(out_dir, {"source": source, "unmatched_stations": unmatched, **(extra_meta or {})})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="시간표를 컬럼형 timetable store 로 변환")
+    parser.add_argument("--csv", default=os.path.join("data", "preprocessed_timetable.csv"))
+    parser.add_argument("--db", help="CSV 대신 SQLite DB 에서 읽기")
+    parser.add_argument("--stations", default=os.path.join("data", "station.csv"))
+    parser.add_argument("--out", default=os.path.join("data", "timetable_store"))
+    args = parser.parse_args()
+
+    df_station = pd.read_csv(args.stations, encoding="utf-8")
+    stations = StationRegistry.from_dataframe(df_station)
+
+    if args.db:
+        source = args.db
+        timetable = TimetableIndex.from_sqlite(args.db)
+    else:
+        source = args.csv
+        timetable = TimetableIndex.from_csv(args.csv)
+    meta = build(timetable, stations, args.out, os.path.basename(source), source_signature(source))
+
+    print(f"📦 {meta['rows']} 구간, 역 {len(timetable.station_names)}개, 열차 {len(timetable.train_names)}대 → {args.out}")
+    print(f"   store 크기: {store_bytes(args.out) / 1e6:.1f} MB")
+    if not args.db:
+        frame_bytes, raw_rows = string_frame_bytes(args.csv)
+        print(f"   dtype=str DataFrame: {frame_bytes / 1e6:.1f} MB ({raw_rows} 행, 시각 누락 {raw_rows - meta['rows']} 행 제외)")
+    if meta["unmatched_stations"]:
+        print(f"⚠️ station.csv 에 좌표가 없는 역 {len(meta['unmatched_stations'])}개: "
+              f"{', '.join(meta['unmatched_stations'][:20])}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+import numpy as np
+
+from utils.derived_arrays import derived_key
+from utils.station_registry import StationRegistry, line_number
+
+
+def route_path(routes, from_station, to_station):
+    """
+    같은 호선의 노선(line_orders 항목)들 중 두 역을 모두 지나는 가장 짧은 경로의 역 목록
+    - 지선/순환선은 노선 항목이 따로 있으므로 두 역이 같이 들어 있는 항목만 후보
+    - 같은 역이 두 번 나오는 노선(순환 구간)은 가장 가까운 쌍을 사용
+    - 찾지 못하면 [출발역, 도착역] (직선)
+    """
+    best = None
+    for stations in routes:
+        starts = [i for i, name in enumerate(stations) if name == from_station]
+        ends = [i for i, name in enumerate(stations) if name == to_station]
+        for i in starts:
+            for j in ends:
+                if best is None or abs(i - j) < abs(best[1] - best[2]):
+                    best = (stations, i, j)
+    if best is None:
+        return [from_station, to_station]
+    stations, i, j = best
+    return stations[i:j + 1] if i <= j else stations[j:i + 1][::-1]
+
+
+class TrackGeometry:
+    """
+    구간(출발역 → 다음역)별 선로 형상 테이블 (서버 시작 시 한 번만 생성)
+    - 꼭짓점: line_orders.json 노선을 따라 두 역 사이에 있는 역 좌표 (지도에 그리는 polyline 과 같은 선)
+    - 꼭짓점마다 누적 거리를 0~1 로 정규화해 두고, 진행률 → 위치는 거리 기준 이진 탐색으로 한 번에 계산
+    - 같은 (호선, 출발역, 다음역) 구간은 형상 하나를 공유
+    """
+
+    def __init__(self, engine, line_orders, station_dict=None):
+        """
+        station_dict: StationRegistry 또는 {역명: (위도, 경도)} - 시간표에 없는 중간역 좌표용
+        양 끝 꼭짓점은 엔진의 구간 좌표를 그대로 써서 정차 위치와 이어지게 함
+        """
+        if isinstance(station_dict, StationRegistry):
+            stations = (station_dict.names, station_dict.lines, station_dict.lat, station_dict.lon)
+        elif station_dict is not None:
+            stations = sorted((name, list(coord)) for name, coord in station_dict.items())
+        else:
+            stations = (engine.station_lat, engine.station_lon)
+        # 시간표 store 가 있으면 store 에 저장해두고 worker 끼리 mmap 공유
+        derived = engine.timetable.derived.load_or_build(
+            "track_geometry", derived_key(line_orders, stations),
+            lambda: self._build(engine, line_orders, station_dict),
+        )
+        self.seg_geom = derived["seg_geom"]
+        self.offsets = derived["offsets"]
+        self.vertex_lat = derived["vertex_lat"]
+        self.vertex_lon = derived["vertex_lon"]
+        self.vertex_cum = derived["vertex_cum"]
+        self._search_key = derived["search_key"]
+
+    @staticmethod
+    def _build(engine, line_orders, station_dict):
+        tt = engine.timetable
+        routes_by_line = {}
+        for route_name, stations in line_orders.items():
+            routes_by_line.setdefault(line_number(route_name), []).append(stations)
+        line_numbers = [line_number(name) for name in tt.line_names]
+
+        known = {
+            name: (lat, lon)
+            for name, lat, lon in zip(engine.station_names, engine.station_lat.tolist(), engine.station_lon.tolist())
+            if not np.isnan(lat)
+        }
+
+        def lookup(name, line):
+            if isinstance(station_dict, StationRegistry):
+                coord = station_dict.get(name, line=line)
+            else:
+                coord = station_dict.get(name) if station_dict is not None else None
+            return coord if coord is not None else known.get(name)
+
+        # 구간 → (호선, 출발역 id, 다음역 id) 형상 번호
+        n_station = len(engine.station_names) + 1
+        key = (tt.line_code.astype(np.int64) * n_station + engine.from_id + 1) * n_station + engine.to_id + 1
+        keys, first, seg_geom = np.unique(key, return_index=True, return_inverse=True)
+
+        lats, lons, cums, counts = [], [], [], []
+        for k, seg in zip(keys.tolist(), first.tolist()):
+            line_code = k // (n_station * n_station)
+            from_id, to_id = int(engine.from_id[seg]), int(engine.to_id[seg])
+            start = (engine.from_lat[seg], engine.from_lon[seg])
+            end = (engine.to_lat[seg], engine.to_lon[seg]) if to_id >= 0 else start
+
+            middle = []
+            if from_id >= 0 and to_id >= 0:
+                line = line_numbers[line_code]
+                names = route_path(
+                    routes_by_line.get(line, ()), engine.station_names[from_id], engine.station_names[to_id]
+                )
+                # 좌표가 없는 중간역은 건너뜀
+                middle = [coord for coord in (lookup(name, line) for name in names[1:-1]) if coord is not None]
+
+            path = np.array([start] + middle + [end], dtype=np.float64)
+            lat, lon = path[:, 0], path[:, 1]
+            # 위도에 따른 경도 축소만 반영한 평면 거리 (구간 안 비율만 쓰므로 충분)
+            dx = np.diff(lon) * np.cos(np.radians(np.nanmean(lat) if not np.isnan(lat).all() else 0.0))
+            dy = np.diff(lat)
+            cum = np.concatenate([[0.0], np.cumsum(np.hypot(dx, dy))])
+            total = cum[-1]
+            cum = cum / total if total > 0 else np.linspace(0.0, 1.0, len(cum))
+
+            lats.append(lat)
+            lons.append(lon)
+            cums.append(cum)
+            counts.append(len(path))
+
+        offsets = np.zeros(len(counts) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        vertex_cum = np.concatenate(cums) if cums else np.zeros(0)
+        return {
+            "seg_geom": seg_geom.astype(np.int32),
+            "offsets": offsets,
+            "vertex_lat": np.concatenate(lats) if lats else np.zeros(0),
+            "vertex_lon": np.concatenate(lons) if lons else np.zeros(0),
+            "vertex_cum": vertex_cum,
+            # 형상 번호 + 정규화 누적 거리 → 전체가 하나의 정렬된 배열 (searchsorted 한 번으로 조회)
+            "search_key": np.repeat(np.arange(len(counts), dtype=np.float64), counts) + vertex_cum,
+        }
+
+    def locate(self, idx, progress):
+        """
+        idx 구간들의 진행률(0~1) → 선로를 따라간 (위도, 경도) 배열
+        """
+        geom = self.seg_geom[idx]
+        lo = self.offsets[geom]
+        hi = self.offsets[geom + 1]
+
+        j = np.searchsorted(self._search_key, geom + progress, side="right") - 1
+        j = np.clip(j, lo, hi - 2)
+        cum_a, cum_b = self.vertex_cum[j], self.vertex_cum[j + 1]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            t = np.where(cum_b > cum_a, (progress - cum_a) / (cum_b - cum_a), 0.0)
+        t = np.clip(t, 0.0, 1.0)
+
+        lat = self.vertex_lat[j] + (self.vertex_lat[j + 1] - self.vertex_lat[j]) * t
+        lon = self.vertex_lon[j] + (self.vertex_lon[j + 1] - self.vertex_lon[j]) * t
+        return lat, lon